@@ -0,0 +1,156 @@
+"""
+Static asset serving for the web UI.
+
+Only an allow-list of files is served. Each file is read once at startup, precompressed
+(gzip, and brotli when the brotli package is installed) and given a strong ETag. Assets
+are also published under content-hashed names (main.<hash>.js) with a one-year immutable
+Cache-Control, and index.html is rewritten to reference those names.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+ASSET_FILES = ("index.html", "main.js", "style.css")
+INDEX_FILE = "index.html"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str
+    encoding: Optional[str]
+
+
+class Asset(NamedTuple):
+    media_type: str
+    variants: Dict[Optional[str], Variant]
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:12]}{ext}"
+
+
+def _build_asset(name: str, body: bytes) -> Tuple[Asset, str]:
+    """
+    Builds the identity, gzip and brotli variants of one file. Compressed variants are
+    kept only when they are smaller. Returns the asset and its content digest.
+    """
+    digest = hashlib.sha256(body).hexdigest()
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+
+    variants = {None: Variant(body, f'"{digest[:32]}"', None)}
+    compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(body, quality=11)
+    for encoding, data in compressed.items():
+        if len(data) < len(body):
+            variants[encoding] = Variant(data, f'"{digest[:32]}-{encoding}"', encoding)
+
+    return Asset(media_type, variants), digest
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    """Codings from an Accept-Encoding header, skipping those with q=0. A malformed q counts as q=1."""
+    accepted = []
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = re.search(r"q\s*=\s*([^\s;]*)", params)
+        if coding and not (q and re.fullmatch(r"0(\.0{0,3})?", q.group(1))):
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+class StaticAssets:
+    """
+    ASGI app serving the allow-listed UI assets from memory.
+    """
+
+    def __init__(self, directory: str, files: Tuple[str, ...] = ASSET_FILES, index: str = INDEX_FILE):
+        self.routes: Dict[str, Tuple[Asset, str]] = {}
+
+        hashed_names = {}
+        for name in files:
+            if name == index:
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                asset, digest = _build_asset(name, f.read())
+            hashed_names[name] = _hashed_name(name, digest)
+            self.routes[f"/{name}"] = (asset, REVALIDATE_CACHE_CONTROL)
+            self.routes[f"/{hashed_names[name]}"] = (asset, IMMUTABLE_CACHE_CONTROL)
+
+        if index in files:
+            with open(os.path.join(directory, index), encoding="utf-8") as f:
+                html = f.read()
+            for name, hashed in hashed_names.items():
+                html = re.sub(rf'(src|href)="(\./|/)?{re.escape(name)}"', rf'\1="./{hashed}"', html)
+            asset, _ = _build_asset(index, html.encode("utf-8"))
+            self.routes["/"] = (asset, REVALIDATE_CACHE_CONTROL)
+            self.routes[f"/{index}"] = (asset, REVALIDATE_CACHE_CONTROL)
+
+        self.hashed_names = hashed_names
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        response = self.get_response(request)
+        await response(scope, receive, send)
+
+    def get_response(self, request: Request) -> Response:
+        route = self.routes.get(request.url.path)
+        if route is None:
+            return PlainTextResponse("Not Found", status_code=404)
+        if request.method not in ("GET", "HEAD"):
+            return PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+
+        asset, cache_control = route
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        variant = asset.variants[None]
+        for encoding in ("br", "gzip"):
+            if encoding in asset.variants and encoding in accepted:
+                variant = asset.variants[encoding]
+                break
+
+        headers = {
+            "ETag": variant.etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, variant.etag):
+            return Response(status_code=304, headers=headers)
+
+        if variant.encoding:
+            headers["Content-Encoding"] = variant.encoding
+        body = b"" if request.method == "HEAD" else variant.body
+        response = Response(body, media_type=asset.media_type, headers=headers)
+        response.headers["Content-Length"] = str(len(variant.body))
+        return response
@@ -0,0 +1,178 @@
+"""
+Benchmark suite for the calculator, split into three layers:
+
+- math:   the sizing helpers and formatters in main.py, plus the columnar engine
+- models: pydantic construction, validation and serialization of PoolResources
+- http:   the full ASGI round-trip through TestClient, like verify_endpoints.py
+
+Every benchmark uses fixed inputs. Results are written as JSON and can be compared
+against a stored baseline, in which case regressions fail the run:
+
+    python bench.py --output baseline.json
+    python bench.py --baseline baseline.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+# Measure the full sizing path, not LRU hits.
+os.environ.setdefault("SIZING_CACHE_SIZE", "0")
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import engine  # noqa: E402
+import main as main_module  # noqa: E402
+from main import (  # noqa: E402
+    ResourceType,
+    _calc_compactor,
+    _calc_frontend_and_querier,
+    _calc_ingestor,
+    _calc_router,
+    _calc_s3,
+    _calc_store,
+    _size_pool,
+    app,
+    calculate_limit_multiplier,
+    format_cpu,
+    format_k8s_resource,
+)
+from models import PoolResources  # noqa: E402
+
+LAYERS = ("math", "models", "http")
+
+DPS = 16667
+SCRAPE_INTERVAL = 60
+RETENTION = 180
+ACTIVE_TS = DPS * SCRAPE_INTERVAL
+TOTAL_S3_BYTES = _calc_s3(ACTIVE_TS, SCRAPE_INTERVAL, 30, 105, 180)
+POOL_PAYLOAD = {"dps": DPS, "scrape_interval": SCRAPE_INTERVAL, "retention": RETENTION}
+POOL_DICT = _size_pool(DPS, SCRAPE_INTERVAL, RETENTION).model_dump(exclude_none=True)
+POOL_MODEL = PoolResources.model_validate(POOL_DICT)
+ENGINE_DPS = np.linspace(1000, 1000000, 10000).astype(np.int64)
+
+
+def _fast_responses(func: Callable[[], object]) -> Callable[[], object]:
+    def wrapped():
+        main_module.FAST_RESPONSES = True
+        try:
+            return func()
+        finally:
+            main_module.FAST_RESPONSES = False
+    return wrapped
+
+
+def _benchmarks() -> List[Tuple[str, str, Callable[[], object]]]:
+    client = TestClient(app)
+
+    return [
+        ("math", "calc_router", lambda: _calc_router(DPS)),
+        ("math", "calc_ingestor", lambda: _calc_ingestor(DPS, ACTIVE_TS)),
+        ("math", "calc_s3", lambda: _calc_s3(ACTIVE_TS, SCRAPE_INTERVAL, 30, 105, 180)),
+        ("math", "calc_compactor", lambda: _calc_compactor(DPS, ACTIVE_TS)),
+        ("math", "calc_store", lambda: _calc_store(ACTIVE_TS, TOTAL_S3_BYTES)),
+        ("math", "calc_frontend_and_querier", lambda: _calc_frontend_and_querier(DPS, ACTIVE_TS, RETENTION)),
+        ("math", "size_pool", lambda: _size_pool(DPS, SCRAPE_INTERVAL, RETENTION)),
+        ("math", "limit_multiplier_cpu", lambda: calculate_limit_multiplier(1.3, 0.25, ResourceType.CPU)),
+        ("math", "limit_multiplier_memory",
+         lambda: calculate_limit_multiplier(1.4, 12 * 1024**3, ResourceType.MEMORY)),
+        ("math", "format_cpu", lambda: format_cpu(2.675)),
+        ("math", "format_k8s_resource", lambda: format_k8s_resource(12.3 * 1024**3)),
+        ("math", "engine_size_pool_10k", lambda: engine.size_pool(ENGINE_DPS, SCRAPE_INTERVAL, RETENTION)),
+        ("models", "pool_resources_validate", lambda: PoolResources.model_validate(POOL_DICT)),
+        ("models", "pool_resources_dump", lambda: POOL_MODEL.model_dump(exclude_none=True)),
+        ("models", "pool_resources_dump_json", lambda: POOL_MODEL.model_dump_json(exclude_none=True)),
+        ("http", "collector_resources",
+         lambda: client.post("/api/calculate/collector_resources", json={"dps": DPS})),
+        ("http", "pool_resources", lambda: client.post("/api/calculate/pool_resources", json=POOL_PAYLOAD)),
+        ("http", "pool_resources_fast",
+         _fast_responses(lambda: client.post("/api/calculate/pool_resources", json=POOL_PAYLOAD))),
+    ]
+
+
+def _measure(func: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "min_us": min(runs),
+        "median_us": statistics.median(runs),
+    }
+
+
+def run(layers: List[str], repeat: int, min_time: float) -> Dict[str, object]:
+    results = {}
+    for layer, name, func in _benchmarks():
+        if layer not in layers:
+            continue
+        results[f"{layer}.{name}"] = {"layer": layer, **_measure(func, repeat, min_time)}
+        print(f"{layer}.{name:<32} {results[f'{layer}.{name}']['median_us']:>12.2f} us", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], threshold: float) -> List[str]:
+    """
+    Returns one message per benchmark whose median is more than `threshold`
+    (relative) slower than the baseline.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median_us"] / base["median_us"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {base['median_us']:.2f} us -> {result['median_us']:.2f} us ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--layer", action="append", choices=LAYERS,
+                        help="layer to run (repeatable); defaults to all layers")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    parser.add_argument("--output", help="write results JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative slowdown of the median that counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.layer or list(LAYERS), args.repeat, args.min_time)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against baseline.", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+Fits a coefficient profile to usage observed on real clusters.
+
+Reads samples as CSV or JSONL, one per component of a cluster at one point in time:
+
+    component,dps,active_series,cpu,memory,disk
+    ingestor,250000,7500000,23.1,118Gi,41Gi
+    store,250000,7500000,4800m,19Gi,
+
+component is router, ingestor, compactor or store. active_series may be replaced by
+scrape_interval, in which case dps * scrape_interval series are assumed. cpu, memory and
+disk are the component's total usage summed over its replicas, as cores or millicores
+("4800m") and bytes or Ki/Mi/Gi/Ti quantities; empty cells are skipped.
+
+Each coefficient group is solved with least squares over all samples at once. Rows are
+weighted by their observed value, so the fit minimizes relative rather than absolute
+error and small clusters count as much as large ones. Usage is compared with the
+model's demand before headroom (ingestor and store memory, ingestor disk), so the
+headroom factors keep their meaning. Groups with fewer than MIN_SAMPLES samples, or
+whose fit is out of range, keep their current values.
+
+    python calibrate.py usage.csv --name prod-eu --version 3 -o profiles/prod-eu.json
+    COEFFICIENT_PROFILES=profiles uvicorn main:app
+
+The report on stderr lists every fitted coefficient next to its current value.
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from pydantic import ValidationError
+
+import coefficients
+from coefficients import CoefficientProfile, Coefficients
+from sizing import K8S_UNIT_BYTES, parse_cpu, parse_k8s_resource
+
+COMPONENTS = ("router", "ingestor", "compactor", "store")
+MIN_SAMPLES = 3
+# As in _calc_ingestor: the PVC holds 2h of WAL and 4h of completed blocks.
+INGESTOR_WAL_SECONDS = 7200
+INGESTOR_BLOCK_SECONDS = 4 * 3600
+GIB = 1024 ** 3
+
+
+class Samples(NamedTuple):
+    """Observed usage of one component, one entry per sample; NaN where not observed."""
+    dps: np.ndarray
+    series: np.ndarray
+    cpu: np.ndarray
+    memory: np.ndarray
+    disk: np.ndarray
+
+
+class Fit(NamedTuple):
+    component: str
+    target: str
+    samples: int
+    # coefficient -> (current value, fitted value); empty when the group was not fitted
+    values: Dict[str, tuple]
+    rms_error: Optional[float]
+    note: Optional[str] = None
+
+
+def _quantity(value, parse: Callable[[str], float]) -> float:
+    if value is None or value == "":
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return float(parse(value.strip()))
+
+
+def _parse_memory(value: str) -> float:
+    if value[-2:] not in K8S_UNIT_BYTES:
+        raise ValueError(f"invalid memory quantity {value!r}")
+    return parse_k8s_resource(value)
+
+
+def _read_rows(stream, fmt: str) -> Iterator[dict]:
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_samples(stream, fmt: str) -> Dict[str, Samples]:
+    """Reads samples into columns per component. Raises ValueError on the first bad row."""
+    columns: Dict[str, List[List[float]]] = {name: [] for name in COMPONENTS}
+    for number, row in enumerate(_read_rows(stream, fmt), start=1):
+        try:
+            component = row.get("component")
+            if component not in columns:
+                raise ValueError(f"component must be one of {', '.join(COMPONENTS)}, got {component!r}")
+            dps = float(row["dps"])
+            if row.get("active_series") not in (None, ""):
+                series = float(row["active_series"])
+            elif row.get("scrape_interval") not in (None, ""):
+                series = dps * float(row["scrape_interval"])
+            else:
+                raise ValueError("needs active_series or scrape_interval")
+            columns[component].append([
+                dps,
+                series,
+                _quantity(row.get("cpu"), parse_cpu),
+                _quantity(row.get("memory"), _parse_memory),
+                _quantity(row.get("disk"), _parse_memory),
+            ])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"sample {number}: {e}") from None
+    return {
+        name: Samples(*np.array(rows, dtype=np.float64).reshape(-1, 5).T)
+        for name, rows in columns.items()
+    }
+
+
+def _solve(design: np.ndarray, observed: np.ndarray):
+    """
+    Least squares of design @ beta ~= observed, with each row divided by its observed
+    value. Returns beta and the RMS relative error of the fit.
+    """
+    weighted = design / observed[:, None]
+    beta = np.linalg.lstsq(weighted, np.ones(len(observed)), rcond=None)[0]
+    relative = weighted @ beta - 1
+    return beta, float(np.sqrt(np.mean(relative ** 2)))
+
+
+def _decades(series: np.ndarray) -> np.ndarray:
+    """log10 of thousands of series, floored at 10k series, as _compactor_cpu_and_memory."""
+    return np.log10(np.maximum(10, series / 1000))
+
+
+def _store_index_bytes(series: np.ndarray, c: Coefficients) -> np.ndarray:
+    """Vectorized _store_index_cache_bytes."""
+    scale = np.minimum(1.0, series / 5000000)
+    return series * (c.store_max_bytes_per_series
+                     - scale * (c.store_max_bytes_per_series - c.store_min_bytes_per_series))
+
+
+# (component, target, design columns, coefficients from beta). The designs are the model's
+# demand before headroom, linear in the coefficients solved for.
+FITS = (
+    ("router", "cpu",
+     lambda s, c: [s.dps],
+     lambda b, c: {"router_cpu_per_dps": b[0]}),
+    ("ingestor", "cpu",
+     lambda s, c: [s.dps * c.ingestor_query_cpu_overhead],
+     lambda b, c: {"ingestor_cpu_per_dps": b[0]}),
+    ("ingestor", "memory",
+     lambda s, c: [s.series],
+     lambda b, c: {"ingestor_bytes_per_series": b[0]}),
+    ("ingestor", "disk",
+     lambda s, c: [s.dps * (INGESTOR_WAL_SECONDS * c.ingestor_wal_bytes_per_sample
+                            + INGESTOR_BLOCK_SECONDS * c.ingestor_block_bytes_per_sample)],
+     lambda b, c: {"ingestor_wal_bytes_per_sample": c.ingestor_wal_bytes_per_sample * b[0],
+                   "ingestor_block_bytes_per_sample": c.ingestor_block_bytes_per_sample * b[0]}),
+    ("compactor", "cpu",
+     lambda s, c: [np.ones_like(s.series), _decades(s.series)],
+     lambda b, c: {"compactor_cpu_base": b[0], "compactor_cpu_per_decade": b[1]}),
+    ("compactor", "memory",
+     lambda s, c: [np.full_like(s.series, GIB), _decades(s.series) * GIB],
+     lambda b, c: {"compactor_memory_base_gb": b[0], "compactor_memory_gb_per_decade": b[1]}),
+    ("store", "cpu",
+     lambda s, c: [s.series],
+     lambda b, c: {"store_series_per_core": 1 / b[0]}),
+    ("store", "memory",
+     lambda s, c: [np.ones_like(s.series), _store_index_bytes(s.series, c)],
+     lambda b, c: {"store_baseline_bytes": b[0],
+                   "store_max_bytes_per_series": c.store_max_bytes_per_series * b[1],
+                   "store_min_bytes_per_series": c.store_min_bytes_per_series * b[1]}),
+)
+
+
+def fit(samples: Dict[str, Samples], base: Coefficients = coefficients.DEFAULT_COEFFICIENTS):
+    """
+    Fits every coefficient group with enough samples, starting from base. Returns the
+    fitted Coefficients and a Fit per group.
+    """
+    fitted = base.model_dump()
+    fits: List[Fit] = []
+    for component, target, design, solved in FITS:
+        observed_all = getattr(samples[component], target)
+        mask = np.isfinite(observed_all) & (observed_all > 0)
+        subset = Samples(*(column[mask] for column in samples[component]))
+        observed = observed_all[mask]
+        columns = design(subset, base)
+        if len(observed) < max(MIN_SAMPLES, len(columns) + 1):
+            fits.append(Fit(component, target, len(observed), {}, None, "too few samples"))
+            continue
+
+        beta, rms_error = _solve(np.column_stack(columns), observed)
+        values = {name: float(value) for name, value in solved(beta, base).items()}
+        try:
+            Coefficients.model_validate({**fitted, **values})
+        except ValidationError as e:
+            fields = ", ".join(str(error["loc"][0]) for error in e.errors())
+            fits.append(Fit(component, target, len(observed), {}, rms_error, f"out of range: {fields}"))
+            continue
+        fitted.update(values)
+        fits.append(Fit(component, target, len(observed),
+                        {name: (getattr(base, name), value) for name, value in values.items()}, rms_error))
+    return Coefficients.model_validate(fitted), fits
+
+
+def report(fits: Sequence[Fit]) -> str:
+    """Human-readable comparison of current and fitted coefficients."""
+    lines = []
+    for f in fits:
+        header = f"{f.component} {f.target}: {f.samples} samples"
+        if f.rms_error is not None:
+            header += f", {f.rms_error:.1%} RMS relative error"
+        if f.note is not None:
+            header += f"; kept ({f.note})"
+        lines.append(header)
+        for name, (current, value) in f.values.items():
+            change = f"{value / current - 1:+.1%}" if current else "new"
+            lines.append(f"    {name:<34} {current:>14.6g} -> {value:<14.6g} {change}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="samples file; '-' or omitted reads stdin")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="input format; defaults to csv for *.csv files and jsonl otherwise")
+    parser.add_argument("--name", required=True, help="profile name")
+    parser.add_argument("--version", required=True, help="profile version; bump it on every refit")
+    parser.add_argument("--description", default="", help="profile description")
+    parser.add_argument("--base", help="profile to start from, as name or name@version (default: built-in)")
+    parser.add_argument("-o", "--output", help="profile file to write; defaults to <name>.json")
+    args = parser.parse_args(argv)
+
+    try:
+        base = coefficients.resolve(args.base).coefficients
+    except ValueError as e:
+        parser.error(str(e))
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    source = sys.stdin if args.input == "-" else open(args.input, newline="")
+    try:
+        samples = read_samples(source, fmt)
+    except ValueError as e:
+        print(f"{args.input}: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    fitted, fits = fit(samples, base)
+    print(report(fits), file=sys.stderr)
+    if not any(f.values for f in fits):
+        print("No coefficient group could be fitted; no profile written.", file=sys.stderr)
+        return 1
+    try:
+        profile = CoefficientProfile(name=args.name, version=args.version, description=args.description,
+                                     coefficients=fitted)
+    except ValidationError as e:
+        parser.error(str(e))
+    output = args.output or f"{args.name}.json"
+    coefficients.write_profile(output, profile)
+    print(f"Wrote {profile.label} to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
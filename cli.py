@@ -0,0 +1,274 @@
+"""
+Offline sizing from the command line, without the web stack.
+
+Reads pool and collector requests as JSONL or CSV, from a file or stdin, and writes
+one JSON result per line in input order. Rows with scrape_interval or retention are
+pools, rows with only dps are collectors. Invalid rows are written as
+{"index": ..., "errors": [...]}, like the batch endpoint, and make the exit code 1.
+
+    python cli.py pools.jsonl > sizing.jsonl
+    python cli.py --format csv --workers 4 < pools.csv
+    python cli.py --output-format parquet -o sizing.parquet pools.csv
+
+With --output-format arrow or parquet, pool results are written as flat columns (see
+export.py) with an "index" column of input row numbers. Rejected rows then go to
+stderr, and collector rows and rows with a query load are rejected.
+
+Rows may name a coefficient profile in a "coefficients" field or column, as the API
+does; profiles are read from the COEFFICIENT_PROFILES directory. Columnar output
+writes one record batch per profile and chunk, so follow the "index" column rather
+than the row order there.
+
+Pools are sized in chunks through the columnar engine. Modules are imported on first
+use, so a small input starts in a fraction of the time it takes to import main.py.
+"""
+import argparse
+import sys
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+CHUNK_SIZE = 4096
+FORMATS = ("jsonl", "csv")
+OUTPUT_FORMATS = ("jsonl", "arrow", "parquet")
+
+Row = Union[str, Dict[str, Any]]
+
+
+def _read_rows(stream, fmt: str) -> Iterator[Row]:
+    """
+    Yields raw JSON lines (decoded by the workers) or CSV rows as dicts. Empty CSV
+    cells are dropped, so a missing value fails validation as a missing field.
+    """
+    if fmt == "csv":
+        import csv
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if value not in (None, "")}
+    else:
+        for line in stream:
+            if line.strip():
+                yield line
+
+
+def _chunks(rows: Iterable[Row], size: int) -> Iterator[Tuple[int, List[Row]]]:
+    """Groups rows into (index of the first row, rows) chunks."""
+    chunk: List[Row] = []
+    start = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield start, chunk
+            start += size
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+def _parse_chunk(start: int, rows: List[Row], collectors: bool) -> Tuple[List[bytes], List[Tuple[int, Any]], int]:
+    """
+    Validates one chunk. Returns an output line per row (filled in for collectors and
+    rejected rows), the (row, PoolRequest) pairs left to size, and the rejected count.
+    collectors=False is columnar output, which rejects collectors and query loads.
+    """
+    from pydantic import ValidationError
+    from pydantic_core import from_json, to_json
+
+    from models import CollectorRequest, PoolBatchError, PoolRequest
+    from sizing import _size_collector
+
+    lines: List[bytes] = [b""] * len(rows)
+    pools: List[Tuple[int, Any]] = []
+    rejected = 0
+    for i, row in enumerate(rows):
+        try:
+            data = from_json(row) if isinstance(row, str) else row
+            if isinstance(data, dict) and ("scrape_interval" in data or "retention" in data):
+                pool = PoolRequest.model_validate(data)
+                if collectors or pool.query is None:
+                    pools.append((i, pool))
+                    continue
+                errors = [{"type": "unsupported", "loc": ["query"],
+                           "msg": "Query loads are only supported in jsonl output"}]
+                lines[i] = to_json(PoolBatchError(index=start + i, errors=errors))
+                rejected += 1
+                continue
+            collector = CollectorRequest.model_validate(data)
+            if collectors:
+                lines[i] = to_json(_size_collector(collector.dps))
+                continue
+            errors = [{"type": "unsupported", "loc": [],
+                       "msg": "Collector rows are only supported in jsonl output"}]
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False)
+        except ValueError as e:
+            errors = [{"type": "json_invalid", "loc": [], "msg": f"Invalid JSON: {e}"}]
+        lines[i] = to_json(PoolBatchError(index=start + i, errors=errors))
+        rejected += 1
+    return lines, pools, rejected
+
+
+def _by_profile(pools: List[Tuple[int, Any]]) -> Iterator[Tuple[Any, List[Tuple[int, Any]]]]:
+    """Groups (row, PoolRequest) pairs by coefficient profile, yielding (coefficients, pairs)."""
+    import coefficients
+
+    groups: Dict[Optional[str], List[Tuple[int, Any]]] = {}
+    for i, req in pools:
+        groups.setdefault(req.coefficients, []).append((i, req))
+    for selector, group in groups.items():
+        yield coefficients.resolve(selector).coefficients, group
+
+
+def _size_pools(pools: List[Tuple[int, Any]], coefficients: Any) -> Dict[str, Any]:
+    import engine
+    return engine.size_pool(
+        [req.dps for _, req in pools],
+        [req.scrape_interval for _, req in pools],
+        [req.retention for _, req in pools],
+        coefficients=coefficients,
+    )
+
+
+def _size_chunk(chunk: Tuple[int, List[Row]]) -> Tuple[bytes, int]:
+    """
+    Sizes one chunk and returns its output lines plus the number of rejected rows.
+    Runs in worker processes, so it only takes and returns picklable values.
+    """
+    from pydantic_core import to_json
+
+    start, rows = chunk
+    lines, pools, rejected = _parse_chunk(start, rows, collectors=True)
+    # Pools with a query load go through the scalar path, which models the query tier.
+    loaded = [(i, req) for i, req in pools if req.query is not None]
+    if loaded:
+        from sizing import _size_pool
+        for coefficients, group in _by_profile(loaded):
+            for i, req in group:
+                lines[i] = to_json(_size_pool(req.dps, req.scrape_interval, req.retention, req.query, coefficients),
+                                   exclude_none=True)
+        pools = [(i, req) for i, req in pools if req.query is None]
+    if pools:
+        import engine
+        for coefficients, group in _by_profile(pools):
+            for (i, _), record in zip(group, engine.iter_pool_resources(_size_pools(group, coefficients))):
+                lines[i] = to_json(record)
+
+    return b"\n".join(lines) + b"\n", rejected
+
+
+def _size_chunk_columns(chunk: Tuple[int, List[Row]]) -> Tuple[List[Dict[str, Any]], bytes, int]:
+    """
+    Columnar counterpart of _size_chunk: returns the flat columns of the chunk's pools,
+    one block per coefficient profile, with an "index" column holding each row's input
+    index, plus the error lines of rejected rows and their count.
+    """
+    import numpy as np
+
+    import export
+
+    start, rows = chunk
+    lines, pools, rejected = _parse_chunk(start, rows, collectors=False)
+    errors = b"".join(line + b"\n" for line in lines if line)
+    blocks = []
+    for coefficients, group in _by_profile(pools):
+        columns = {"index": np.array([start + i for i, _ in group], dtype=np.int64)}
+        columns.update(export.flatten(_size_pools(group, coefficients)))
+        blocks.append(columns)
+    return blocks, errors, rejected
+
+
+def _size_all(chunks: Iterable[Tuple[int, List[Row]]], workers: int,
+              size_chunk: Callable[[Tuple[int, List[Row]]], Any] = _size_chunk) -> Iterator[Any]:
+    """
+    Sizes chunks in order. With several workers, at most two chunks per worker are
+    in flight, so memory stays bounded however long the input is.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield size_chunk(chunk)
+        return
+
+    import multiprocessing
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(size_chunk, (chunk,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def _write_columnar(chunks: Iterable[Tuple[int, List[Row]]], args) -> int:
+    """
+    Writes pool results as an Arrow IPC stream or Parquet file. Rejected rows go to
+    stderr as JSON lines. Returns the rejected count.
+    """
+    import export
+
+    rejected = [0]
+
+    def columns() -> Iterator[Dict[str, Any]]:
+        for blocks, errors, chunk_rejected in _size_all(chunks, args.workers, _size_chunk_columns):
+            if errors:
+                sys.stderr.buffer.write(errors)
+            rejected[0] += chunk_rejected
+            yield from blocks
+
+    if args.output is None:
+        for data in export.iter_arrow_stream(columns()):
+            sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    else:
+        export.write(args.output, args.output_format, columns())
+    return rejected[0]
+
+
+def _write_jsonl(chunks: Iterable[Tuple[int, List[Row]]], args) -> int:
+    """Writes one JSON result per row to --output or stdout. Returns the rejected count."""
+    sink = sys.stdout.buffer if args.output is None else open(args.output, "wb")
+    rejected = 0
+    try:
+        for block, chunk_rejected in _size_all(chunks, args.workers):
+            sink.write(block)
+            rejected += chunk_rejected
+        sink.flush()
+    finally:
+        if args.output is not None:
+            sink.close()
+    return rejected
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="input file; '-' or omitted reads stdin")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="input format; defaults to csv for *.csv files and jsonl otherwise")
+    parser.add_argument("-o", "--output", help="write results to this file instead of stdout")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="jsonl",
+                        help="jsonl, or flat columns as an Arrow IPC stream or Parquet file (needs pyarrow)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for sizing")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows sized per engine pass")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    if args.output_format == "parquet" and args.output is None:
+        parser.error("--output-format parquet needs -o/--output")
+    source = sys.stdin if args.input == "-" else open(args.input, newline="")
+
+    try:
+        chunks = _chunks(_read_rows(source, fmt), max(1, args.chunk_size))
+        if args.output_format != "jsonl":
+            rejected = _write_columnar(chunks, args)
+        else:
+            rejected = _write_jsonl(chunks, args)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if rejected:
+        print(f"{rejected} rows rejected", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
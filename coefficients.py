@@ -0,0 +1,151 @@
+"""
+Coefficient profiles of the sizing model.
+
+Every per-unit constant of the _calc_* functions (CPU per dps, bytes per series, the
+compactor's log10 factors, ...) is a field of Coefficients. The built-in "default" profile
+holds the model's stock values. Further profiles are JSON files in the COEFFICIENT_PROFILES
+directory, loaded once on first use:
+
+    {"name": "prod-eu", "version": "3", "description": "fitted to eu clusters",
+     "coefficients": {"ingestor_bytes_per_series": 15974.4}}
+
+A profile only lists the coefficients it changes; the rest keep their default values.
+Requests select a profile by name, or pin one as "name@version". calibrate.py fits
+profiles to observed usage.
+
+Only pydantic is needed, so sizing.py and engine.py can import this module.
+"""
+import json
+import os
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+PROFILE_NAME_PATTERN = "^[A-Za-z0-9_.-]+$"
+DEFAULT_PROFILE_NAME = "default"
+
+
+class Coefficients(BaseModel):
+    # Receive router
+    router_cpu_per_dps: float = Field(1 / 25000, gt=0)
+    router_memory_per_pod: float = Field(2 * 1024 * 1024 * 1024, description="bytes", gt=0)
+    router_max_cpu_per_pod: float = Field(4, gt=0)
+    router_min_replicas: int = Field(2, ge=1)
+    # Receive ingestor
+    ingestor_cpu_per_dps: float = Field(1 / 12000, gt=0)
+    ingestor_query_cpu_overhead: float = Field(1.2, ge=1)
+    ingestor_bytes_per_series: float = Field(12 * 1024, gt=0)
+    ingestor_memory_headroom: float = Field(1.75, ge=1)
+    ingestor_wal_bytes_per_sample: float = Field(30, gt=0)
+    ingestor_block_bytes_per_sample: float = Field(2, gt=0)
+    ingestor_disk_headroom: float = Field(1.2, ge=1)
+    # Object storage, before the cardinality compression curve
+    s3_raw_bytes_per_sample: float = Field(6, gt=0)
+    s3_5m_bytes_per_series_day: float = Field(3000, gt=0)
+    s3_1h_bytes_per_series_day: float = Field(300, gt=0)
+    # Compactor: memory and CPU grow with log10(thousands of series)
+    compactor_bytes_per_sample: float = Field(1.5, gt=0)
+    compactor_memory_base_gb: float = Field(2, gt=0)
+    compactor_memory_gb_per_decade: float = Field(5, ge=0)
+    compactor_cpu_base: float = Field(2, gt=0)
+    compactor_cpu_per_decade: float = Field(1.2, ge=0)
+    compactor_max_cpu: float = Field(8, gt=0)
+    # Store gateway: index bytes per series fall from max to min up to 5M series
+    store_baseline_bytes: float = Field(2 * 1024**3, ge=0)
+    store_max_bytes_per_series: float = Field(2000, gt=0)
+    store_min_bytes_per_series: float = Field(1400, gt=0)
+    store_memory_headroom: float = Field(1.4, ge=1)
+    store_series_per_core: float = Field(1500000, gt=0)
+    # Query frontend and querier, from the hot working set scale
+    frontend_cpu_base: float = Field(1, gt=0)
+    frontend_memory_base_gb: float = Field(1.5, gt=0)
+    frontend_memory_gb_per_scale: float = Field(2.0, ge=0)
+    querier_cpu_base: float = Field(2, gt=0)
+    querier_cpu_per_scale: float = Field(0.7, ge=0)
+    querier_memory_base_gb: float = Field(2, gt=0)
+    querier_series_per_gb: float = Field(2000000, gt=0)
+    querier_memory_gb_per_scale: float = Field(1.5, ge=0)
+    querier_max_series_per_replica: float = Field(4000000, gt=0)
+
+    class Config:
+        frozen = True
+        extra = "forbid"
+
+
+class CoefficientProfile(BaseModel):
+    name: str = Field(..., pattern=PROFILE_NAME_PATTERN)
+    version: str = Field(..., description="bumped whenever the coefficients change", min_length=1)
+    description: str = ""
+    coefficients: Coefficients = Field(default_factory=Coefficients)
+
+    class Config:
+        frozen = True
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}@{self.version}"
+
+
+DEFAULT_COEFFICIENTS = Coefficients()
+DEFAULT_PROFILE = CoefficientProfile(name=DEFAULT_PROFILE_NAME, version="1",
+                                     description="stock coefficients of the sizing model")
+
+_profiles: Optional[Dict[str, CoefficientProfile]] = None
+
+
+def read_profile(path: str) -> CoefficientProfile:
+    """Reads one profile file; coefficients it leaves out keep their default values."""
+    with open(path) as f:
+        profile = CoefficientProfile.model_validate(json.load(f))
+    if profile.name == DEFAULT_PROFILE_NAME:
+        raise ValueError(f"{path}: the {DEFAULT_PROFILE_NAME!r} profile is built in and cannot be replaced")
+    return profile
+
+
+def write_profile(path: str, profile: CoefficientProfile) -> None:
+    """Writes a profile file holding only the coefficients that differ from the default."""
+    changed = {name: value for name, value in profile.coefficients.model_dump().items()
+               if value != getattr(DEFAULT_COEFFICIENTS, name)}
+    with open(path, "w") as f:
+        json.dump({"name": profile.name, "version": profile.version, "description": profile.description,
+                   "coefficients": changed}, f, indent=2)
+        f.write("\n")
+
+
+def load_profiles(directory: Optional[str]) -> Dict[str, CoefficientProfile]:
+    """Replaces the loaded profiles with the *.json files of directory (None: default only)."""
+    global _profiles
+    profiles = {DEFAULT_PROFILE_NAME: DEFAULT_PROFILE}
+    if directory:
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            profile = read_profile(os.path.join(directory, filename))
+            if profile.name in profiles:
+                raise ValueError(f"{directory}: profile {profile.name!r} is defined twice")
+            profiles[profile.name] = profile
+    _profiles = profiles
+    return profiles
+
+
+def profiles() -> Dict[str, CoefficientProfile]:
+    """Loaded profiles by name, reading COEFFICIENT_PROFILES on first use."""
+    if _profiles is None:
+        return load_profiles(os.getenv("COEFFICIENT_PROFILES") or None)
+    return _profiles
+
+
+def resolve(selector: Optional[str]) -> CoefficientProfile:
+    """
+    Profile for a request's "name" or "name@version"; None is the default profile.
+    Raises ValueError for unknown names and versions that are not loaded.
+    """
+    if selector is None:
+        return DEFAULT_PROFILE
+    name, _, version = selector.partition("@")
+    profile = profiles().get(name)
+    if profile is None:
+        raise ValueError(f"unknown coefficient profile {name!r}; loaded: {', '.join(sorted(profiles()))}")
+    if version and version != profile.version:
+        raise ValueError(f"coefficient profile {name!r} is at version {profile.version!r}, not {version!r}")
+    return profile
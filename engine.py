@@ -0,0 +1,502 @@
+"""
+Columnar sizing engine.
+
+Runs the pool sizing math from sizing.py over NumPy arrays of dps, scrape_interval and
+retention, so that many scenarios are sized in one pass. Every step mirrors its scalar
+counterpart operation for operation (same constants, same evaluation order), which keeps
+both paths bit-identical; verify_engine.py checks that parity.
+"""
+import math
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from coefficients import DEFAULT_COEFFICIENTS, Coefficients
+from sizing import (
+    COMPACTOR_CPU_LIMIT_MULTIPLIER,
+    COMPACTOR_LARGEST_BLOCK_DAYS,
+    COMPACTOR_MEMORY_LIMIT_MULTIPLIER,
+    INGESTOR_MAX_SERIES_PER_REPLICA,
+    STORE_CPU_LIMIT_MULTIPLIER,
+    STORE_MEMORY_LIMIT_MULTIPLIER,
+)
+
+Columns = Dict[str, np.ndarray]
+
+# PoolResources field order, so records serialize exactly like the scalar path.
+COMPONENTS = ("query", "query_frontend", "receiver_router", "receiver_ingestor", "store", "compactor")
+STORAGE_COMPONENTS = ("receiver_ingestor", "store", "compactor")
+
+CPU_UNITS = np.array(["", "m"])
+MEMORY_UNITS = np.array(["Ki", "Mi", "Gi"])
+MEMORY_DIVISORS = np.array([1024, 1024 * 1024, 1024 * 1024 * 1024], dtype=np.float64)
+# Formatting dedupes through a dense table only while the key range stays below
+# this multiple of the input size; past that, rendering everything is cheaper.
+DENSE_KEY_FACTOR = 4
+
+
+def _libm(func, values: np.ndarray, *args) -> np.ndarray:
+    """
+    Applies a math-module function element-wise. NumPy's SIMD log10/power can differ
+    from libm in the last ulp, so the transcendental steps go through math instead.
+    Only the distinct inputs are evaluated: grids repeat them across the axes they do
+    not depend on.
+    """
+    unique, inverse = np.unique(values, return_inverse=True)
+    extra = [repeat(arg) for arg in args]
+    results = np.fromiter(map(func, unique.tolist(), *extra), dtype=np.float64, count=unique.size)
+    return results[inverse.reshape(values.shape)]
+
+
+# Helpers
+def cpu_quantity(cores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of format_cpu, split into integer values and a unit index
+    (0 = cores, 1 = millicores).
+    """
+    cores = np.asarray(cores, dtype=np.float64)
+    is_min = cores <= 0.1
+    is_whole = cores == np.floor(cores)
+    values = np.where(is_min, 100, np.where(is_whole, cores, np.trunc(cores * 1000)))
+    units = (is_min | ~is_whole).astype(np.int8)
+    return values.astype(np.int64), units
+
+
+def memory_quantity(bytes_val: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of format_k8s_resource, split into integer values and a unit index
+    into MEMORY_UNITS.
+    """
+    bytes_val = np.asarray(bytes_val, dtype=np.float64)
+    units = (bytes_val >= 1024 * 1024).astype(np.int8)
+    units += bytes_val >= 1024 * 1024 * 1024
+    values = np.ceil(bytes_val / MEMORY_DIVISORS[units])
+    empty = bytes_val <= 0
+    values[empty] = 0
+    units[empty] = 2
+    return values.astype(np.int64), units
+
+
+def _quantity_strings(values: np.ndarray, units: np.ndarray, suffixes: np.ndarray) -> np.ndarray:
+    """
+    Builds the quantity strings. Rounded quantities usually repeat heavily across
+    scenarios; when the key range is small enough for a dense lookup table, only the
+    distinct (value, unit) pairs are rendered and then gathered.
+    """
+    keys = values * len(suffixes) + units
+    if keys.size == 0 or keys.max() >= DENSE_KEY_FACTOR * keys.size:
+        return _render_quantities(values, units, suffixes)
+    dictionary, indices = quantity_codes(values, units, suffixes)
+    return dictionary[indices]
+
+
+def _quantity_list(values: np.ndarray, units: np.ndarray, suffixes: np.ndarray) -> List[str]:
+    """
+    The quantity strings as a list in which equal quantities share one str object, so
+    per-row output costs a reference instead of a new string per element.
+    """
+    dictionary, indices = quantity_codes(values, units, suffixes)
+    return np.array(dictionary.tolist(), dtype=object)[indices].tolist()
+
+
+def quantity_codes(values: np.ndarray, units: np.ndarray, suffixes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dictionary encoding of the quantity strings: the distinct strings, in (value, unit)
+    order, and the index of each element's string among them.
+    """
+    keys = values * len(suffixes) + units
+    if keys.size == 0 or keys.max() >= DENSE_KEY_FACTOR * keys.size:
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+    else:
+        present = np.zeros(keys.max() + 1, dtype=bool)
+        present[keys] = True
+        unique_keys = np.flatnonzero(present)
+        inverse = (np.cumsum(present) - 1)[keys]
+
+    unique_values, unique_units = np.divmod(unique_keys, len(suffixes))
+    return _render_quantities(unique_values, unique_units, suffixes), inverse
+
+
+def _render_quantities(values: np.ndarray, units: np.ndarray, suffixes: np.ndarray) -> np.ndarray:
+    """
+    Renders non-negative integers plus a unit suffix straight into the UCS-4 buffer of
+    a fixed-width str array. NumPy's int-to-str cast costs ~250ns per element; writing
+    the digits directly, grouped by digit count, is an order of magnitude cheaper.
+    """
+    max_digits = len(str(int(values.max(initial=0))))
+    ndigits = np.ones(values.shape, dtype=np.int64)
+    for power in range(1, max_digits):
+        ndigits += values >= 10 ** power
+
+    suffix_width = max(len(suffix) for suffix in suffixes)
+    suffix_chars = np.zeros((len(suffixes), suffix_width), dtype=np.uint32)
+    for i, suffix in enumerate(suffixes):
+        suffix_chars[i, :len(suffix)] = [ord(char) for char in suffix]
+
+    width = max_digits + suffix_width
+    chars = np.zeros((values.size, width), dtype=np.uint32)
+    for count in range(1, max_digits + 1):
+        rows = np.flatnonzero(ndigits == count)
+        if rows.size == 0:
+            continue
+        remainder = values[rows]
+        block = np.empty((rows.size, count + suffix_width), dtype=np.uint32)
+        for column in range(count - 1, -1, -1):
+            remainder, digit = np.divmod(remainder, 10)
+            block[:, column] = digit + ord("0")
+        block[:, count:] = suffix_chars[units[rows]]
+        chars[rows, :count + suffix_width] = block
+
+    return chars.view(f"U{width}").ravel()
+
+
+def format_cpu(cores: np.ndarray) -> np.ndarray:
+    """Array version of sizing.format_cpu."""
+    return _quantity_strings(*cpu_quantity(cores), CPU_UNITS)
+
+
+def format_k8s_resource(bytes_val: np.ndarray) -> np.ndarray:
+    """Array version of sizing.format_k8s_resource."""
+    return _quantity_strings(*memory_quantity(bytes_val), MEMORY_UNITS)
+
+
+def _cpu_limit_multiplier(base_multiplier: float, cores: np.ndarray) -> np.ndarray:
+    """Array version of calculate_limit_multiplier for ResourceType.CPU."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low = 1 + (np.maximum(cores * (base_multiplier - 1), 0.3) / cores)
+    return np.where(cores < 0.5, low, base_multiplier)
+
+
+def _memory_limit_multiplier(base_multiplier: float, memory_bytes: np.ndarray) -> np.ndarray:
+    """Array version of calculate_limit_multiplier for ResourceType.MEMORY."""
+    memory_gb = memory_bytes / (1024 ** 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low = 1 + (np.maximum(memory_bytes * (base_multiplier - 1), 1 * 1024 ** 3) / memory_bytes)
+    high = 1 + ((base_multiplier - 1) * 0.7)
+    return np.where(memory_gb < 2, low, np.where(memory_gb > 100, high, base_multiplier))
+
+
+def create_resources(cpu: np.ndarray, memory_bytes: np.ndarray, replicas: np.ndarray,
+                     cpu_limit_multiplier: float = 1.0,
+                     memory_limit_multiplier: float = 1.0) -> Columns:
+    """
+    Array version of sizing.create_resources, returning raw cores/bytes columns.
+    """
+    n = np.shape(replicas)[0]
+    cpu = np.broadcast_to(np.asarray(cpu, dtype=np.float64), (n,))
+    memory_bytes = np.broadcast_to(np.asarray(memory_bytes, dtype=np.float64), (n,))
+
+    return {
+        "cpu": cpu,
+        "memory": memory_bytes,
+        "cpu_limit": cpu * _cpu_limit_multiplier(cpu_limit_multiplier, cpu),
+        "memory_limit": memory_bytes * _memory_limit_multiplier(memory_limit_multiplier, memory_bytes),
+        "replicas": np.asarray(replicas, dtype=np.int64),
+    }
+
+
+def create_resources_with_storage(cpu: np.ndarray, memory_bytes: np.ndarray, replicas: np.ndarray,
+                                  storage_bytes: np.ndarray,
+                                  cpu_limit_multiplier: float = 1.0,
+                                  memory_limit_multiplier: float = 1.0) -> Columns:
+    """
+    Array version of sizing.create_resources_with_storage.
+    """
+    res = create_resources(cpu, memory_bytes, replicas, cpu_limit_multiplier, memory_limit_multiplier)
+    res["storage"] = np.asarray(storage_bytes, dtype=np.float64)
+    return res
+
+
+def calc_router(DPS: np.ndarray, c: Coefficients = DEFAULT_COEFFICIENTS) -> Columns:
+    """Array version of sizing._calc_router."""
+    total_cpu = DPS * c.router_cpu_per_dps
+    replicas = np.maximum(np.ceil(total_cpu / c.router_max_cpu_per_pod), c.router_min_replicas)
+    cpu_per_pod = total_cpu / replicas
+
+    return create_resources(
+        cpu_per_pod,
+        c.router_memory_per_pod,
+        replicas,
+        cpu_limit_multiplier=1.3,
+        memory_limit_multiplier=1.15
+    )
+
+
+def calc_ingestor(DPS: np.ndarray, ACTIVE_TS: np.ndarray, c: Coefficients = DEFAULT_COEFFICIENTS) -> Columns:
+    """Array version of sizing._calc_ingestor."""
+    BLOCK_HOURS = 4
+    MAX_SERIES_PER_REPLICA = INGESTOR_MAX_SERIES_PER_REPLICA
+    MIN_PVC_BYTES = 5 * 1024**3
+
+    cpu = DPS * c.ingestor_cpu_per_dps * c.ingestor_query_cpu_overhead
+    memory = ACTIVE_TS * c.ingestor_bytes_per_series * c.ingestor_memory_headroom
+
+    wal_bytes = DPS * 7200 * c.ingestor_wal_bytes_per_sample
+    block_bytes = DPS * BLOCK_HOURS * 3600 * c.ingestor_block_bytes_per_sample
+    disk_bytes = np.maximum((wal_bytes + block_bytes) * c.ingestor_disk_headroom, MIN_PVC_BYTES)
+
+    replicas = np.ceil(ACTIVE_TS / MAX_SERIES_PER_REPLICA)
+
+    return create_resources_with_storage(
+        cpu,
+        memory,
+        replicas,
+        storage_bytes=disk_bytes,
+        cpu_limit_multiplier=1.25,
+        memory_limit_multiplier=1.4
+    )
+
+
+def calc_s3(ACTIVE_TS: np.ndarray, SCRAPE_INTERVAL: np.ndarray,
+            RET_RAW_DAYS: np.ndarray, RET_5M_DAYS: np.ndarray, RET_1H_DAYS: np.ndarray,
+            c: Coefficients = DEFAULT_COEFFICIENTS) -> np.ndarray:
+    """Array version of sizing._calc_s3. Returns total bytes."""
+    scale_factor = np.minimum(1.0, (ACTIVE_TS - 200000) / 1800000)
+    scale_multiplier = np.where(ACTIVE_TS < 200000, 1.0, 0.599 - (scale_factor * 0.0806))
+
+    samples_per_day = 86400 / SCRAPE_INTERVAL
+    raw_bytes_per_series_per_day = samples_per_day * c.s3_raw_bytes_per_sample * scale_multiplier
+    downsample_5m_per_series_per_day = c.s3_5m_bytes_per_series_day * scale_multiplier
+    downsample_1h_per_series_per_day = c.s3_1h_bytes_per_series_day * scale_multiplier
+
+    s3_raw = ACTIVE_TS * raw_bytes_per_series_per_day   * RET_RAW_DAYS
+    s3_5m  = ACTIVE_TS * downsample_5m_per_series_per_day * RET_5M_DAYS
+    s3_1h  = ACTIVE_TS * downsample_1h_per_series_per_day * RET_1H_DAYS
+
+    return s3_raw + s3_5m + s3_1h
+
+
+def calc_compactor(DPS: np.ndarray, ACTIVE_TS: np.ndarray, c: Coefficients = DEFAULT_COEFFICIENTS) -> Columns:
+    """Array version of sizing._calc_compactor."""
+    daily_gen_bytes = DPS * 86400 * c.compactor_bytes_per_sample
+    scratch_bytes = daily_gen_bytes * (2 * COMPACTOR_LARGEST_BLOCK_DAYS)
+
+    series_log = _libm(math.log10, np.maximum(10, ACTIVE_TS / 1000))
+    ram_gb = c.compactor_memory_base_gb + (series_log * c.compactor_memory_gb_per_decade)
+    cpu    = np.maximum(0.1, np.minimum(c.compactor_max_cpu,
+                                        c.compactor_cpu_base + (series_log * c.compactor_cpu_per_decade)))
+    ram_bytes = ram_gb * 1024**3
+
+    return create_resources_with_storage(
+        cpu,
+        ram_bytes,
+        np.ones_like(ram_bytes),
+        storage_bytes=scratch_bytes,
+        cpu_limit_multiplier=COMPACTOR_CPU_LIMIT_MULTIPLIER,
+        memory_limit_multiplier=COMPACTOR_MEMORY_LIMIT_MULTIPLIER
+    )
+
+
+def calc_store(ACTIVE_TS: np.ndarray, total_s3_bytes: np.ndarray, c: Coefficients = DEFAULT_COEFFICIENTS) -> Columns:
+    """Array version of sizing._calc_store."""
+    base_bytes_per_series = c.store_max_bytes_per_series
+    min_bytes_per_series  = c.store_min_bytes_per_series
+
+    series_scale = np.minimum(1.0, ACTIVE_TS / 5000000)
+    bytes_per_series = base_bytes_per_series - (
+        series_scale * (base_bytes_per_series - min_bytes_per_series)
+    )
+
+    index_cache_bytes = ACTIVE_TS * bytes_per_series
+    ram       = (c.store_baseline_bytes + index_cache_bytes) * c.store_memory_headroom
+    cpu       = np.maximum(0.1, ACTIVE_TS / c.store_series_per_core)
+    pvc_ratio = 0.10 - np.minimum(0.05, ACTIVE_TS / 10000000 * 0.05)
+    pvc       = total_s3_bytes * pvc_ratio
+
+    return create_resources_with_storage(
+        cpu,
+        ram,
+        np.ones_like(ram),
+        storage_bytes=pvc,
+        cpu_limit_multiplier=STORE_CPU_LIMIT_MULTIPLIER,
+        memory_limit_multiplier=STORE_MEMORY_LIMIT_MULTIPLIER
+    )
+
+
+def calc_frontend_and_querier(DPS: np.ndarray, ACTIVE_TS: np.ndarray, RETENTION: np.ndarray,
+                              c: Coefficients = DEFAULT_COEFFICIENTS) -> Tuple[Columns, Columns]:
+    """Array version of sizing._calc_frontend_and_querier."""
+    hot_weights = [
+        (1,  0.55),
+        (2,  0.25),
+        (4,  0.15),
+        (23, 0.05),
+    ]
+    # Buckets past the retention contribute used == 0, which adds an exact 0.0,
+    # so no per-element break is needed.
+    remaining = np.minimum(RETENTION, 30)
+    weighted_days = np.zeros(np.shape(DPS), dtype=np.float64)
+    for days, weight in hot_weights:
+        used = np.minimum(days, np.maximum(remaining, 0))
+        weighted_days += used * weight
+        remaining = remaining - used
+
+    hot_samples       = DPS * 86400 * weighted_days
+    working_set_scale = 1.3 * _libm(pow, hot_samples / 1e9, 0.5)
+
+    # Frontend
+    frontend_replicas = np.maximum(1, np.ceil(working_set_scale / 3))
+    frontend_cpu      = c.frontend_cpu_base + (working_set_scale / 3)
+    frontend_ram      = (c.frontend_memory_base_gb + working_set_scale * c.frontend_memory_gb_per_scale) * 1024**3
+
+    frontend_res = create_resources(
+        frontend_cpu,
+        frontend_ram,
+        frontend_replicas,
+        cpu_limit_multiplier=1.1,
+        memory_limit_multiplier=1.4
+    )
+
+    # Querier
+    querier_replicas = np.maximum(
+        np.maximum(1, np.ceil(working_set_scale / 2)),
+        np.ceil(ACTIVE_TS / c.querier_max_series_per_replica)
+    )
+    querier_cpu = c.querier_cpu_base + (working_set_scale * c.querier_cpu_per_scale)
+    querier_ram = (c.querier_memory_base_gb + (ACTIVE_TS / c.querier_series_per_gb)
+                   + (working_set_scale * c.querier_memory_gb_per_scale)) * 1024**3
+
+    querier_res = create_resources(
+        querier_cpu,
+        querier_ram,
+        querier_replicas,
+        cpu_limit_multiplier=1.2,
+        memory_limit_multiplier=1.45
+    )
+
+    return frontend_res, querier_res
+
+
+def retention_windows(RETENTION: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Raw, 5m and 1h retention in days, as computed by sizing._size_pool."""
+    RET_RAW_DAYS = np.minimum(30, RETENTION)
+    RET_5M_DAYS  = RET_RAW_DAYS + (RETENTION - RET_RAW_DAYS + 1) // 2
+    RET_1H_DAYS  = RETENTION
+    return RET_RAW_DAYS, RET_5M_DAYS, RET_1H_DAYS
+
+
+def size_pool(dps: Any, scrape_interval: Any, retention: Any,
+              active_ts: Optional[Any] = None,
+              coefficients: Coefficients = DEFAULT_COEFFICIENTS) -> Dict[str, Any]:
+    """
+    Sizes every scenario in the (broadcast) input arrays. Returns a dict with one
+    Columns entry per component (raw cores/bytes/replicas), plus "s3", the input
+    columns and the retention windows.
+
+    active_ts overrides dps * scrape_interval for callers that model cardinality
+    separately from the ingest rate.
+    """
+    c = coefficients
+    DPS, SCRAPE_INTERVAL, RETENTION = np.broadcast_arrays(
+        np.asarray(dps, dtype=np.int64),
+        np.asarray(scrape_interval, dtype=np.int64),
+        np.asarray(retention, dtype=np.int64),
+    )
+    DPS, SCRAPE_INTERVAL, RETENTION = np.atleast_1d(DPS, SCRAPE_INTERVAL, RETENTION)
+    ACTIVE_TS = DPS * SCRAPE_INTERVAL if active_ts is None else np.asarray(active_ts)
+    RET_RAW_DAYS, RET_5M_DAYS, RET_1H_DAYS = retention_windows(RETENTION)
+
+    total_s3_bytes            = calc_s3(ACTIVE_TS, SCRAPE_INTERVAL, RET_RAW_DAYS, RET_5M_DAYS, RET_1H_DAYS, c)
+    frontend_res, querier_res = calc_frontend_and_querier(DPS, ACTIVE_TS, RETENTION, c)
+
+    return {
+        "dps": DPS,
+        "scrape_interval": SCRAPE_INTERVAL,
+        "retention": RETENTION,
+        "active_ts": ACTIVE_TS,
+        "query": querier_res,
+        "query_frontend": frontend_res,
+        "receiver_router": calc_router(DPS, c),
+        "receiver_ingestor": calc_ingestor(DPS, ACTIVE_TS, c),
+        "store": calc_store(ACTIVE_TS, total_s3_bytes, c),
+        "compactor": calc_compactor(DPS, ACTIVE_TS, c),
+        "s3": total_s3_bytes,
+        "ret_raw_days": RET_RAW_DAYS,
+        "ret_5m_days": RET_5M_DAYS,
+        "ret_1h_days": RET_1H_DAYS,
+    }
+
+
+def percentiles(cols: Dict[str, Any], q: Any) -> Dict[str, Any]:
+    """
+    Per-field percentiles of a size_pool result, returned in the same shape with one row
+    per entry of q. Every field is ranked on its own with method="higher", so each value
+    is an actual sample that formats like the scalar path, but a row is generally not
+    one coherent scenario.
+    """
+    q = np.asarray(q, dtype=np.float64)
+
+    def pick(values: np.ndarray) -> np.ndarray:
+        return np.percentile(values, q, method="higher").astype(values.dtype)
+
+    out = {key: pick(np.asarray(cols[key])) for key in (
+        "dps", "scrape_interval", "retention", "active_ts", "s3", "ret_raw_days", "ret_5m_days", "ret_1h_days"
+    )}
+    for name in COMPONENTS:
+        out[name] = {field: pick(values) for field, values in cols[name].items()}
+    return out
+
+
+def format_pool(cols: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Formats every quantity of a size_pool result array-wide. Keys are dotted
+    PoolResources paths, e.g. "store.limits.memory".
+    """
+    out = {}
+    for name in COMPONENTS:
+        res = cols[name]
+        out[f"{name}.requests.memory"] = format_k8s_resource(res["memory"])
+        out[f"{name}.requests.cpu"]    = format_cpu(res["cpu"])
+        out[f"{name}.limits.memory"]   = format_k8s_resource(res["memory_limit"])
+        out[f"{name}.limits.cpu"]      = format_cpu(res["cpu_limit"])
+        if "storage" in res:
+            out[f"{name}.storage"] = format_k8s_resource(res["storage"])
+    out["s3"] = format_k8s_resource(cols["s3"])
+    return out
+
+
+def iter_pool_resources(cols: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields one PoolResources-shaped dict per scenario, with the same keys and key
+    order as PoolResources.model_dump(exclude_none=True).
+    """
+    def cpu(values: np.ndarray) -> List[str]:
+        return _quantity_list(*cpu_quantity(values), CPU_UNITS)
+
+    def memory(values: np.ndarray) -> List[str]:
+        return _quantity_list(*memory_quantity(values), MEMORY_UNITS)
+
+    # Per component, a lazy iterator of (memory, cpu, memory limit, cpu limit, replicas[, storage]) rows.
+    components = []
+    for name in COMPONENTS:
+        res = cols[name]
+        fields = [memory(res["memory"]), cpu(res["cpu"]), memory(res["memory_limit"]), cpu(res["cpu_limit"]),
+                  res["replicas"].tolist()]
+        if name in STORAGE_COMPONENTS:
+            fields.append(memory(res["storage"]))
+        components.append(zip(*fields))
+
+    retention = [cols[key] for key in ("ret_raw_days", "ret_5m_days", "ret_1h_days")]
+    days = [f"{d}d" for d in range(max(int(r.max(initial=0)) for r in retention) + 1)]
+    retention = zip(*(r.tolist() for r in retention))
+
+    for dps, s3, (ret_raw, ret_5m, ret_1h), *rows in zip(cols["dps"].tolist(), memory(cols["s3"]), retention,
+                                                         *components):
+        record = {"dps": dps}
+        for name, row in zip(COMPONENTS, rows):
+            component = {
+                "requests": {"memory": row[0], "cpu": row[1]},
+                "limits": {"memory": row[2], "cpu": row[3]},
+                "replicas": row[4],
+            }
+            if len(row) > 5:
+                component["storage"] = row[5]
+            record[name] = component
+        record["s3"] = s3
+        record["data_retention"] = {
+            "raw_data": days[ret_raw],
+            "downsample_5m": days[ret_5m],
+            "downsample_1h": days[ret_1h],
+        }
+        yield record
@@ -0,0 +1,186 @@
+"""
+Columnar export of pool sizing results as Apache Arrow or Parquet.
+
+flatten() turns a size_pool result into flat columns, one per quantity:
+"store.limits.memory_bytes" and "store.limits.cpu_millicores" hold the numbers, and
+"store.limits.memory" and "store.limits.cpu" hold the exact Kubernetes strings of the
+JSON responses, dictionary-encoded. The numeric columns are the formatted quantities converted back, so both
+columns always agree. pandas and polars load these columns without parsing, e.g.
+pyarrow.ipc.open_stream(body).read_pandas().
+
+pyarrow is optional and is imported on first use. Only the Arrow and Parquet writers
+need it.
+"""
+import importlib.util
+import io
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Union
+
+import numpy as np
+
+import engine
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MEMORY_UNIT_BYTES = np.array([1024, 1024 ** 2, 1024 ** 3], dtype=np.int64)
+QUANTITIES = (
+    ("requests.memory", "memory", "memory"),
+    ("requests.cpu", "cpu", "cpu"),
+    ("limits.memory", "memory_limit", "memory"),
+    ("limits.cpu", "cpu_limit", "cpu"),
+)
+
+
+def available() -> bool:
+    """True when pyarrow is installed."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Arrow and Parquet output require pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+class Strings(NamedTuple):
+    """Dictionary-encoded string column: distinct strings and one index per row."""
+    dictionary: np.ndarray
+    indices: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def decode(self) -> np.ndarray:
+        return self.dictionary[self.indices]
+
+
+Column = Union[np.ndarray, Strings]
+
+
+def _cpu_columns(cores: np.ndarray) -> Dict[str, Column]:
+    values, units = engine.cpu_quantity(cores)
+    return {
+        "cpu_millicores": np.where(units == 1, values, values * 1000),
+        "cpu": Strings(*engine.quantity_codes(values, units, engine.CPU_UNITS)),
+    }
+
+
+def _memory_columns(bytes_val: np.ndarray) -> Dict[str, Column]:
+    values, units = engine.memory_quantity(bytes_val)
+    return {
+        "memory_bytes": values * MEMORY_UNIT_BYTES[units],
+        "memory": Strings(*engine.quantity_codes(values, units, engine.MEMORY_UNITS)),
+    }
+
+
+def flatten(cols: Dict[str, Any]) -> Dict[str, Column]:
+    """
+    Flat numeric and string columns of a size_pool result, in PoolResources order and
+    preceded by the inputs. Quantity strings repeat heavily, so they are kept
+    dictionary-encoded; Strings.decode() expands them.
+    """
+    out: Dict[str, Column] = {key: cols[key] for key in ("dps", "scrape_interval", "retention")}
+    for name in engine.COMPONENTS:
+        res = cols[name]
+        for path, field, kind in QUANTITIES:
+            prefix = path.rsplit(".", 1)[0]
+            converted = _memory_columns(res[field]) if kind == "memory" else _cpu_columns(res[field])
+            for suffix, values in converted.items():
+                out[f"{name}.{prefix}.{suffix}"] = values
+        out[f"{name}.replicas"] = res["replicas"]
+        if name in engine.STORAGE_COMPONENTS:
+            storage = _memory_columns(res["storage"])
+            out[f"{name}.storage_bytes"] = storage["memory_bytes"]
+            out[f"{name}.storage"] = storage["memory"]
+    s3 = _memory_columns(cols["s3"])
+    out["s3_bytes"] = s3["memory_bytes"]
+    out["s3"] = s3["memory"]
+    out["data_retention.raw_data_days"] = cols["ret_raw_days"]
+    out["data_retention.downsample_5m_days"] = cols["ret_5m_days"]
+    out["data_retention.downsample_1h_days"] = cols["ret_1h_days"]
+    return out
+
+
+def record_batch(columns: Dict[str, Column]):
+    """
+    Arrow record batch of flat columns. String columns become dictionary arrays, which
+    pandas reads as categoricals.
+    """
+    pa = _pyarrow()
+    arrays = []
+    for values in columns.values():
+        if isinstance(values, Strings):
+            arrays.append(pa.DictionaryArray.from_arrays(
+                pa.array(values.indices.astype(np.int32)), pa.array(values.dictionary, type=pa.string())))
+        else:
+            arrays.append(pa.array(values))
+    return pa.RecordBatch.from_arrays(arrays, names=list(columns))
+
+
+def _empty_columns() -> Dict[str, Column]:
+    """Zero-row columns, so an empty result still carries the schema."""
+    return flatten(engine.size_pool(np.zeros(0, dtype=np.int64), 1, 1))
+
+
+def iter_arrow_stream(chunks: Iterable[Dict[str, Column]]) -> Iterator[bytes]:
+    """
+    Encodes flat column chunks as an Arrow IPC stream, yielding the bytes of each
+    record batch as soon as it is written.
+    """
+    pa = _pyarrow()
+    sink = io.BytesIO()
+    writer = None
+    for columns in chunks:
+        batch = record_batch(columns)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield _drain(sink)
+    if writer is None:
+        writer = pa.ipc.new_stream(sink, record_batch(_empty_columns()).schema)
+    writer.close()
+    yield _drain(sink)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def write(path: str, fmt: str, chunks: Iterable[Dict[str, Column]]) -> int:
+    """
+    Writes flat column chunks to an Arrow IPC stream ("arrow") or Parquet ("parquet")
+    file. Returns the number of rows written.
+    """
+    # Fail before the output file is created when pyarrow is missing.
+    _pyarrow()
+    rows = [0]
+
+    def counted() -> Iterator[Dict[str, Column]]:
+        for columns in chunks:
+            rows[0] += len(columns["dps"])
+            yield columns
+
+    if fmt == "arrow":
+        with open(path, "wb") as f:
+            for data in iter_arrow_stream(counted()):
+                f.write(data)
+        return rows[0]
+
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for columns in counted():
+            batch = record_batch(columns)
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema)
+            writer.write_batch(batch)
+        if writer is None:
+            writer = pq.ParquetWriter(path, record_batch(_empty_columns()).schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows[0]
@@ -0,0 +1,145 @@
+"""
+Local load test for the calculator endpoints.
+
+Opens --concurrency keep-alive HTTP/1.1 connections to a running server and sends
+requests back to back on each of them for --duration seconds. It then reports
+throughput, latency percentiles and errors. Only the standard library is used, so
+the client itself adds as little overhead as possible:
+
+    python serve.py --workers 4 &
+    python loadtest.py --endpoint mixed --concurrency 64 --duration 20
+
+Requests cycle through --distinct dps values, so the sizing caches see a realistic
+mix of hits and misses rather than one hot key.
+"""
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+ENDPOINTS = {
+    "pool": "/api/calculate/pool_resources",
+    "collector": "/api/calculate/collector_resources",
+}
+PERCENTILES = (50, 95, 99)
+
+
+def _payloads(endpoint: str, distinct: int) -> List[Tuple[str, bytes]]:
+    """Pre-encoded (path, body) pairs; 'mixed' alternates pool and collector requests."""
+    payloads = []
+    for i in range(distinct):
+        dps = 1000 + i * 37
+        if endpoint in ("pool", "mixed"):
+            body = {"dps": dps, "scrape_interval": 60, "retention": 180}
+            payloads.append((ENDPOINTS["pool"], json.dumps(body).encode()))
+        if endpoint in ("collector", "mixed"):
+            payloads.append((ENDPOINTS["collector"], json.dumps({"dps": dps}).encode()))
+    return payloads
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    """Reads one response with a Content-Length body and returns its status code."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _connection(host: str, port: int, payloads: List[Tuple[str, bytes]], offset: int,
+                      deadline: float, latencies: List[float], errors: Dict[str, int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            path, body = payloads[i % len(payloads)]
+            i += 1
+            request = (f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                       f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+    finally:
+        writer.close()
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+async def run(url: str, endpoint: str, concurrency: int, duration: float, warmup: float,
+              distinct: int) -> Dict[str, object]:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    payloads = _payloads(endpoint, distinct)
+
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(_connection(host, port, payloads, i * 7919, deadline, [], {})
+                               for i in range(concurrency)))
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_connection(host, port, payloads, i * 7919, deadline, latencies, errors)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result: Dict[str, object] = {
+        "url": url,
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+    }
+    if latencies:
+        result["latency_ms"] = {f"p{q}": _percentile(latencies, q) * 1000 for q in PERCENTILES}
+        result["latency_ms"]["mean"] = statistics.fmean(latencies) * 1000
+        result["latency_ms"]["max"] = latencies[-1] * 1000
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server base URL")
+    parser.add_argument("--endpoint", choices=("pool", "collector", "mixed"), default="pool")
+    parser.add_argument("--concurrency", type=int, default=32, help="keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before the run")
+    parser.add_argument("--distinct", type=int, default=10000, help="distinct dps values to cycle through")
+    parser.add_argument("--output", help="also write the results JSON to this file")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args.url, args.endpoint, args.concurrency, args.duration, args.warmup,
+                             max(1, args.distinct)))
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 1 if result["errors"] or not result["requests"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
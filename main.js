@@ -66,43 +66,82 @@ function setMode(mode) {
     }
 }
 
-async function calculate() {
-    try {
-        const dps = Math.min(1000000, Math.max(1, parseInt(document.getElementById('dps').value) || 0));
-        const interval = Math.min(300, Math.max(1, parseInt(document.getElementById('interval').value) || 60));
-        const retention = Math.min(730, Math.max(1, parseInt(document.getElementById('retention').value) || 30));
+const DEBOUNCE_MS = 150;
+const RESULT_CACHE_SIZE = 200;
+
+// Results by "dps|interval|retention", in insertion order so the oldest entry is evicted first.
+const resultCache = new Map();
+let inFlight = null;
+let debounceTimer = null;
+
+function readInputs() {
+    const dps = Math.min(1000000, Math.max(1, parseInt(document.getElementById('dps').value) || 0));
+    const interval = Math.min(300, Math.max(1, parseInt(document.getElementById('interval').value) || 60));
+    const retention = Math.min(730, Math.max(1, parseInt(document.getElementById('retention').value) || 30));
+    return { dps, interval, retention, key: `${dps}|${interval}|${retention}` };
+}
 
-        const payloadCollector = {
-            dps: dps
-        };
+// GET variants return an ETag, so the browser revalidates repeats with If-None-Match.
+async function fetchResults({ dps, interval, retention }, signal) {
+    const collectorParams = new URLSearchParams({ dps });
+    const poolParams = new URLSearchParams({ dps, scrape_interval: interval, retention });
+    const [resCollector, resPool] = await Promise.all([
+        fetch(`/api/calculate/collector_resources?${collectorParams}`, { signal }),
+        fetch(`/api/calculate/pool_resources?${poolParams}`, { signal })
+    ]);
+
+    if (!resCollector.ok || !resPool.ok) {
+        throw new Error('Calculation failed');
+    }
+    return { collector: await resCollector.json(), pool: await resPool.json() };
+}
 
-        const payloadPool = {
-            dps: dps,
-            scrape_interval: interval,
-            retention: retention
-        };
+async function calculate() {
+    clearTimeout(debounceTimer);
+    const inputs = readInputs();
+
+    // Only the latest input matters, cached or not; drop the request it supersedes so
+    // its results cannot render over these.
+    if (inFlight) {
+        inFlight.abort();
+        inFlight = null;
+    }
 
-        const [resCollector, resPool] = await Promise.all([
-            fetch('/api/calculate/collector_resources', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payloadCollector)
-            }),
-            fetch('/api/calculate/pool_resources', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(payloadPool)
-            })
-        ]);
-
-        if (!resCollector.ok || !resPool.ok) {
-            console.error('Calculation failed');
+    let results = resultCache.get(inputs.key);
+    if (!results) {
+        const controller = new AbortController();
+        inFlight = controller;
+        try {
+            results = await fetchResults(inputs, controller.signal);
+        } catch (e) {
+            if (e.name !== 'AbortError') console.error("Calculation Error:", e);
             return;
+        } finally {
+            if (inFlight === controller) inFlight = null;
         }
+        // Superseded after the response arrived but before this continuation ran.
+        if (controller.signal.aborted) return;
 
-        const dataCollector = await resCollector.json();
-        const dataPool = await resPool.json();
+        resultCache.set(inputs.key, results);
+        if (resultCache.size > RESULT_CACHE_SIZE) {
+            resultCache.delete(resultCache.keys().next().value);
+        }
+    }
+    render(results.collector, results.pool, inputs.interval);
+}
+
+// Cached inputs render at once; anything else waits until the input settles.
+function scheduleCalculate() {
+    clearTimeout(debounceTimer);
+    if (resultCache.has(readInputs().key)) {
+        calculate();
+    } else {
+        debounceTimer = setTimeout(calculate, DEBOUNCE_MS);
+    }
+}
 
+function render(dataCollector, dataPool, interval) {
+    try {
         // Helper to normalize data: map 'storage' -> 'pvc', 'ephemeralStorage' -> 'pvc'
         // Helper to parse CPU string ("1", "500m") to float
         const parseCpu = (cpuStr) => {
@@ -253,16 +292,14 @@ async function calculate() {
         });
 
     } catch (e) {
-        console.error("Calculation Error:", e);
+        console.error("Render Error:", e);
     }
 }
 
 const inputs = document.querySelectorAll('input, select');
 inputs.forEach(input => {
     if (!input.id.startsWith('est')) {
-        input.addEventListener('input', () => {
-            calculate();
-        });
+        input.addEventListener('input', scheduleCalculate);
     }
 });
 
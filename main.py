@@ -1,21 +1,175 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+import heapq
 import math
-from enum import Enum
-from typing import Tuple
+import os
+from operator import attrgetter
+import statistics
+from typing import Annotated, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from pydantic import ValidationError
+from pydantic_core import to_json
 from models import (
+    MAX_DPS,
     CollectorRequest,
+    PoolQueryParams,
     PoolRequest,
+    QueryLoad,
+    PoolBatchError,
+    PoolSweepRequest,
+    ProjectionRequest,
+    MaxDpsRequest,
+    MaxDps,
+    ResourceTotals,
+    HashringRequest,
+    HashringPlan,
+    HashringReplica,
+    HashringSkew,
+    TenantLoad,
+    NodePlanRequest,
+    NodePlan,
+    NodeTypePlan,
+    UnschedulablePods,
+    StoreShardRequest,
+    StoreShardPlan,
+    StoreTier,
+    CompactorShardRequest,
+    CompactorShardPlan,
+    CompactionStep,
+    Distribution,
+    MonteCarloRequest,
+    MonteCarloResult,
+    MonteCarloPercentiles,
+    AutoscalingRequest,
+    AutoscalingPlan,
+    AutoscaledComponent,
+    FleetDiffRequest,
+    FleetDiff,
+    FleetDiffEntry,
+    BasicResources,
+    Resources,
+    PoolProjection,
+    ProjectionPoint,
+    ThresholdCrossing,
+    SizingCacheStats,
     CollectorResources,
     PoolResources,
-    DataRetention,
-    Resources,
-    ResourcesWithStorage,
-    BasicResources
 )
-
-DEFAULT_EPHEMERAL_STORAGE = "512Mi"
+import coefficients
+import engine
+import export
+from export import ARROW_STREAM_MEDIA_TYPE
+# The sizing helpers live in sizing.py; they are re-exported here for existing callers.
+from sizing import (  # noqa: F401
+    DEFAULT_EPHEMERAL_STORAGE,
+    COMPACTOR_CPU_LIMIT_MULTIPLIER,
+    COMPACTOR_LARGEST_BLOCK_DAYS,
+    COMPACTOR_MEMORY_LIMIT_MULTIPLIER,
+    INGESTOR_MAX_SERIES_PER_REPLICA,
+    K8S_UNIT_BYTES,
+    STORE_CPU_LIMIT_MULTIPLIER,
+    STORE_MEMORY_LIMIT_MULTIPLIER,
+    ResourceType,
+    _calc_compactor,
+    _calc_frontend_and_querier,
+    _calc_ingestor,
+    _calc_query_path,
+    _calc_router,
+    _calc_s3,
+    _calc_store,
+    _compactor_cpu_and_memory,
+    _s3_bytes_per_series_day,
+    _size_collector,
+    _size_pool,
+    _store_index_cache_bytes,
+    _store_pvc_ratio,
+    calculate_limit_multiplier,
+    create_resources,
+    create_resources_with_storage,
+    format_cpu,
+    format_k8s_resource,
+    parse_cpu,
+    parse_k8s_resource,
+)
+from assets import REVALIDATE_CACHE_CONTROL, StaticAssets, etag_matches
+from cache import LRUCache
+from coefficients import DEFAULT_COEFFICIENTS, DEFAULT_PROFILE, CoefficientProfile, Coefficients
+from table import FINGERPRINT_SOURCES, SizingTable, sizing_fingerprint
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import MetricsMiddleware, current_timings, render_metrics, stage, timed_handler
+import profiling
+from profiling import ProfileStore, ProfilingMiddleware
+
+MAX_POOL_BATCH_SIZE = 10000
+MAX_SWEEP_POINTS = 50_000_000
+SWEEP_CHUNK_SIZE = 4096
+# Rows per Arrow record batch of a sweep; larger batches suit columnar readers.
+ARROW_BATCH_SIZE = 65536
+# Projections longer than this return change points only unless asked otherwise.
+PROJECTION_FULL_HORIZON_MONTHS = 12
+# Upper end of the max-dps search; pools that fit beyond this are reported at the cap.
+MAX_SOLVER_DPS = 1_000_000_000
+# Largest hashring planned, by its lower bound of ingestor replicas; every replica and
+# shard is built and returned individually.
+MAX_HASHRING_REPLICAS = 10_000
+# Nodes without room probed per deployment before new nodes are opened, which keeps
+# node packing at O(pods log nodes) even when most nodes are nearly full.
+NODE_PACK_PROBE_LIMIT = 16
+MONTE_CARLO_PERCENTILES = (50, 90, 99)
+# Store shard planner: compacted blocks span the compactor's largest range, and a store
+# loads each block's index-header with --block-sync-concurrency parallel S3 reads.
+STORE_BLOCK_DAYS = COMPACTOR_LARGEST_BLOCK_DAYS
+INDEX_HEADER_BYTES_PER_SERIES = 24
+INDEX_HEADER_BLOCK_SECONDS = 0.2
+INDEX_HEADER_BYTES_PER_SECOND = 100 * 1024**2
+STORE_BLOCK_SYNC_CONCURRENCY = 20
+# Compactor shard planner: one concurrency slot downloads, merges, writes and uploads
+# COMPACTOR_BYTES_PER_SECOND of source blocks and merges the indexes of
+# COMPACTOR_SERIES_PER_SECOND series. Each slot past the first holds another index.
+COMPACTOR_BYTES_PER_SECOND = 64 * 1024**2
+COMPACTOR_SERIES_PER_SECOND = 100000
+COMPACTOR_SLOT_BYTES_PER_SERIES = 256
+# (step, hours of data read per block, resolution read, downsampling pass)
+COMPACTION_STEPS = (
+    ("2h-8h", 8, "raw", False),
+    ("8h-2d", 48, "raw", False),
+    ("2d-14d", COMPACTOR_LARGEST_BLOCK_DAYS * 24, "raw", False),
+    ("downsample-5m", 48, "raw", True),
+    ("downsample-1h", COMPACTOR_LARGEST_BLOCK_DAYS * 24, "5m", True),
+)
+# Stateless components an HPA can scale, and the hourly buckets of a traffic curve.
+AUTOSCALED_COMPONENTS = ("receiver_router", "query", "query_frontend")
+BUCKET_MINUTES = 60
+# Sampled dps is clipped to the request bound so tail draws of wide distributions stay
+# within the engine's int64 range.
+MAX_SAMPLED_DPS = MAX_DPS
+# Likewise for sampled active series: the most a PoolRequest can yield (MAX_DPS at a 300s
+# scrape interval), however large the churn draw.
+MAX_SAMPLED_SERIES = MAX_DPS * 300
+
+# Opt-in: return models built by this module without FastAPI re-validating them
+# against response_model. The OpenAPI schema is unaffected.
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "0") == "1"
+
+# Identifies the sizing code, response models and handlers in ETags, so a deploy that
+# changes results or their shape changes the tags.
+ETAG_SOURCES = FINGERPRINT_SOURCES + ("models.py", "main.py")
+SIZING_VERSION = sizing_fingerprint(ETAG_SOURCES)[:16]
+
+# Results for repeated inputs; sized by SIZING_CACHE_SIZE / SIZING_CACHE_TTL. Entries are
+# models, not response bodies: a hit saves the sizing math, while FastAPI still validates
+# and serializes it for POST unless FAST_RESPONSES is set.
+pool_cache = LRUCache.from_env("SIZING_CACHE")
+collector_cache = LRUCache.from_env("SIZING_CACHE")
+
+# Optional precomputed grid built by table.py; grid-aligned pool requests are read from it.
+pool_table = SizingTable(os.environ["SIZING_TABLE"]) if os.getenv("SIZING_TABLE") else None
+
+# Admin-gated request profiling; disabled unless PROFILE_TOKEN is set.
+profile_store = ProfileStore.from_env()
 
 app = FastAPI(
     title="Thanos Resource Calculator",
@@ -29,378 +183,1208 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware, store=profile_store, timings=current_timings)
+app.add_middleware(MetricsMiddleware)
 
+# Handlers whose sizing work takes milliseconds (batch, projection, planners, Monte Carlo)
+# are plain `def`, so FastAPI runs them in its threadpool instead of on the event loop.
+# Single-pool and collector sizing stay `async`: they take less time than a thread hop.
 
-class ResourceType(Enum):
-    CPU = "cpu"
-    MEMORY = "memory"
 
+class ModelJSONResponse(Response):
+    """
+    JSON response for pydantic models (or lists of them) that were already validated
+    when they were built; serialized directly by pydantic-core.
+    """
+    media_type = "application/json"
 
-# Helpers
-def format_k8s_resource(bytes_val: float) -> str:
-    """Formats bytes to K8s resource string (Ki, Mi, Gi) matching regex ^[0-9]+[KMG]i$"""
-    if bytes_val <= 0:
-        return "0Gi"
+    def __init__(self, content: Any, exclude_none: bool = False, **kwargs):
+        self.exclude_none = exclude_none
+        super().__init__(content, **kwargs)
 
-    if bytes_val < 1024 * 1024:
-        val = math.ceil(bytes_val / 1024)
-        return f"{val}Ki"
-    elif bytes_val < 1024 * 1024 * 1024:
-        val = math.ceil(bytes_val / (1024 * 1024))
-        return f"{val}Mi"
-    else:
-        val = math.ceil(bytes_val / (1024 * 1024 * 1024))
-        return f"{val}Gi"
+    def render(self, content: Any) -> bytes:
+        with stage("serialize"):
+            return to_json(content, exclude_none=self.exclude_none)
 
 
-def format_cpu(cores: float) -> str:
-    """Formats CPU to '1' (if whole number) or '100m' (if fractional)."""
-    if cores <= 0.1:
-        return "100m"  # fallback minimum
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError) -> Response:
+    """
+    FastAPI's default 422 response, except that echoed inputs holding NaN or infinity
+    render as null instead of failing the JSON encoding.
+    """
+    body = to_json({"detail": jsonable_encoder(exc.errors())}, inf_nan_mode="null")
+    return Response(body, status_code=422, media_type="application/json")
+
+
+def _respond(content: Any, exclude_none: bool = False) -> Any:
+    """
+    Returns content as-is for FastAPI to validate and serialize, or, with
+    FAST_RESPONSES, as a ModelJSONResponse that skips the second validation.
+    """
+    if FAST_RESPONSES:
+        return ModelJSONResponse(content, exclude_none=exclude_none)
+    return content
 
-    # Handle int directly or float that is equivalent to int
-    if isinstance(cores, int) or cores.is_integer():
-        return str(int(cores))
 
-    # Fractional - return in millicores
-    millicores = int(cores * 1000)
-    return f"{millicores}m"
+def _cached_collector(dps: int) -> CollectorResources:
+    key = (dps,)
+    # Profiled requests skip the cache so the profile shows the sizing work.
+    res = None if profiling.active() else collector_cache.get(key)
+    if res is None:
+        res = _size_collector(dps)
+        collector_cache.set(key, res)
+    return res
 
 
-def calculate_limit_multiplier(base_multiplier: float, resource_value: float,
-                                resource_type: ResourceType) -> float:
+@app.post("/api/calculate/collector_resources", response_model=CollectorResources)
+@timed_handler
+async def calculate_collector(req: CollectorRequest):
     """
-    Adjusts buffer multiplier based on resource scale.
-    - Very low resources: add minimum absolute buffer
-    - Very high resources: reduce percentage buffer (diminishing returns)
+    Calculates the resources required for the collector.
     """
-    if resource_type == ResourceType.CPU:
-        if resource_value < 0.5:
-            min_buffer = 0.3
-            percentage_buffer = resource_value * (base_multiplier - 1)
-            actual_buffer = max(percentage_buffer, min_buffer)
-            return 1 + (actual_buffer / resource_value)
+    return _respond(_cached_collector(req.dps))
 
-    elif resource_type == ResourceType.MEMORY:
-        memory_gb = resource_value / (1024 ** 3)
 
-        if memory_gb < 2:
-            min_buffer_bytes = 1 * 1024 ** 3
-            percentage_buffer = resource_value * (base_multiplier - 1)
-            actual_buffer = max(percentage_buffer, min_buffer_bytes)
-            return 1 + (actual_buffer / resource_value)
+def _sizing_etag(kind: str, *key: int) -> str:
+    """
+    Strong ETag for a sizing result. Results depend only on the inputs and the sizing
+    code, so the tag is built from those and a match skips sizing altogether.
+    """
+    return f'"{kind}-{SIZING_VERSION}-{"-".join(map(str, key))}"'
 
-        elif memory_gb > 100:
-            reduced_multiplier = 1 + ((base_multiplier - 1) * 0.7)
-            return reduced_multiplier
 
-    return base_multiplier
+def _conditional_response(request: Request, etag: str, build: Callable[[], Any],
+                          exclude_none: bool = False) -> Response:
+    """
+    Answers 304 when If-None-Match matches etag, else serializes build()'s result.
+    Either way the response carries the ETag and must be revalidated before reuse.
+    """
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return ModelJSONResponse(build(), exclude_none=exclude_none, headers=headers)
 
 
-def create_resources(cpu: float, memory_bytes: float, replicas: int,
-                     cpu_limit_multiplier: float = 1.0,
-                     memory_limit_multiplier: float = 1.0) -> Resources:
+@app.get("/api/calculate/collector_resources", response_model=CollectorResources)
+@timed_handler
+async def get_collector(request: Request, req: Annotated[CollectorRequest, Query()]):
     """
-    Creates a Resources object with calculated requests and limits.
+    GET variant of calculate_collector with ETag / If-None-Match support, so browsers
+    and shared caches can revalidate repeated inputs without a new calculation.
     """
-    cpu_str = format_cpu(cpu)
-    memory_str = format_k8s_resource(memory_bytes)
-
-    # Apply edge case adjustments
-    adjusted_cpu_mult = calculate_limit_multiplier(cpu_limit_multiplier, cpu, ResourceType.CPU)
-    adjusted_mem_mult = calculate_limit_multiplier(memory_limit_multiplier, memory_bytes, ResourceType.MEMORY)
+    etag = _sizing_etag("collector", req.dps)
+    return _conditional_response(request, etag, lambda: _cached_collector(req.dps))
 
-    # Calculate limit values
-    cpu_limit = cpu * adjusted_cpu_mult
-    memory_limit = memory_bytes * adjusted_mem_mult
 
-    # Validation: ensure limits >= requests
-    assert cpu_limit >= cpu, f"CPU limit ({cpu_limit}) must be >= request ({cpu})"
-    assert memory_limit >= memory_bytes, f"Memory limit ({memory_limit}) must be >= request ({memory_bytes})"
+def _table_or_size_pool(dps: int, scrape_interval: int, retention: int, query: Optional[QueryLoad] = None,
+                        profile: CoefficientProfile = DEFAULT_PROFILE) -> PoolResources:
+    """
+    Reads a grid-aligned pool from pool_table when one is loaded, else sizes it live.
+    Pools with a query load or another coefficient profile are always sized live; the
+    table only covers the base inputs under the default profile.
+    """
+    if pool_table is not None and query is None and profile is DEFAULT_PROFILE:
+        with stage("table", dps):
+            res = pool_table.lookup(dps, scrape_interval, retention)
+        if res is not None:
+            return res
+    return _size_pool(dps, scrape_interval, retention, query, profile.coefficients)
 
-    requests = BasicResources(cpu=cpu_str, memory=memory_str)
-    limits = BasicResources(
-        cpu=format_cpu(cpu_limit),
-        memory=format_k8s_resource(memory_limit)
-    )
 
-    return Resources(
-        requests=requests,
-        limits=limits,
-        replicas=replicas
-    )
+def _cached_pool(dps: int, scrape_interval: int, retention: int, query: Optional[QueryLoad] = None,
+                 profile: CoefficientProfile = DEFAULT_PROFILE) -> PoolResources:
+    # QueryLoad is frozen, so it hashes by value as part of the key; profiles by name@version.
+    key = (dps, scrape_interval, retention, query, profile.label)
+    res = None if profiling.active() else pool_cache.get(key)
+    if res is None:
+        res = _table_or_size_pool(dps, scrape_interval, retention, query, profile)
+        pool_cache.set(key, res)
+    return res
 
 
-def create_resources_with_storage(cpu: float, memory_bytes: float, replicas: int,
-                                  storage_bytes: float,
-                                  cpu_limit_multiplier: float = 1.0,
-                                  memory_limit_multiplier: float = 1.0) -> ResourcesWithStorage:
+@app.post("/api/calculate/pool_resources", response_model=PoolResources, response_model_exclude_none=True)
+@timed_handler
+async def calculate_pool(req: PoolRequest):
     """
-    Delegates to create_resources and adds storage to produce a ResourcesWithStorage object.
+    Orchestrates per-component sizing and assembles the final PoolResources response.
     """
-    res = create_resources(cpu, memory_bytes, replicas, cpu_limit_multiplier, memory_limit_multiplier)
-    return ResourcesWithStorage(
-        requests=res.requests,
-        limits=res.limits,
-        replicas=res.replicas,
-        storage=format_k8s_resource(storage_bytes)
-    )
+    return _respond(_cached_pool(req.dps, req.scrape_interval, req.retention, req.query,
+                                 coefficients.resolve(req.coefficients)), exclude_none=True)
 
 
-@app.post("/api/calculate/collector_resources", response_model=CollectorResources)
-async def calculate_collector(req: CollectorRequest):
+@app.get("/api/calculate/pool_resources", response_model=PoolResources, response_model_exclude_none=True)
+@timed_handler
+async def get_pool(request: Request, req: Annotated[PoolQueryParams, Query()]):
     """
-    Calculates the resources required for the collector.
+    GET variant of calculate_pool with ETag / If-None-Match support. A query load does
+    not fit in a query string, so pools sized for one are POST-only.
     """
-    dps = req.dps
-
-    # Estimate OTel Collector resources from DPS using linear scaling:
-    # ~1 CPU per 25k samples/sec and ~1 GiB RAM per 5k samples/sec, plus a 512 MiB base footprint.
-    otel_cpu = dps / 25000
-    otel_ram_bytes = (512 * 1024 * 1024) + ((dps / 5000) * 1024 * 1024 * 1024)
+    key = (req.dps, req.scrape_interval, req.retention)
+    profile = coefficients.resolve(req.coefficients)
+    # Default-profile tags keep their old form, so caches stay warm across this change.
+    kind = "pool" if profile is DEFAULT_PROFILE else f"pool-{profile.label}"
+    return _conditional_response(request, _sizing_etag(kind, *key),
+                                 lambda: _cached_pool(*key, profile=profile), exclude_none=True)
+
+
+@app.post("/api/calculate/pool_resources/batch",
+          response_model=List[Union[PoolResources, PoolBatchError]],
+          response_model_exclude_none=True)
+@timed_handler
+def calculate_pool_batch(reqs: List[Any]):
+    """
+    Sizes many pools in one call. Each item is validated on its own; an invalid item
+    yields a PoolBatchError at the same position instead of failing the whole batch.
+    Batch items bypass pool_cache so one large batch cannot flush the hot presets.
+    """
+    if len(reqs) > MAX_POOL_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch holds {len(reqs)} items, the maximum is {MAX_POOL_BATCH_SIZE}"
+        )
 
-    otel_resources = create_resources(
-        otel_cpu,
-        otel_ram_bytes,
-        1,
-        cpu_limit_multiplier=1.2,
-        memory_limit_multiplier=1.3
-    )
+    results: List[Union[PoolResources, PoolBatchError]] = []
+    for index, item in enumerate(reqs):
+        try:
+            req = PoolRequest.model_validate(item)
+        except ValidationError as e:
+            results.append(PoolBatchError(
+                index=index,
+                errors=e.errors(include_url=False, include_context=False)
+            ))
+            continue
+        results.append(_table_or_size_pool(req.dps, req.scrape_interval, req.retention, req.query,
+                                           coefficients.resolve(req.coefficients)))
 
-    return CollectorResources(
-        requests=otel_resources.requests,
-        limits=otel_resources.limits,
-        replicas=1,
-        dps=dps,
-        ephemeral_storage=DEFAULT_EPHEMERAL_STORAGE
-    )
+    return _respond(results, exclude_none=True)
 
 
-def _calc_router(DPS: int) -> Resources:
+def _storage_boundary(previous_bytes: int, current_bytes: int) -> Optional[int]:
     """
-    Router: 1 core per 25k DPS, 2 GiB RAM/pod, min 2 replicas HA, cap 4 CPU/pod.
+    Largest power-of-two GiB size strictly above the smaller and at most the larger of
+    the two values, i.e. the disk size tier crossed between them; None if no tier is crossed.
     """
-    ROUTER_CPU_PER_DPS = 1 / 25000
-    ROUTER_MEMORY_PER_POD = 2 * 1024 * 1024 * 1024
-    ROUTER_MIN_REPLICAS = 2
-    MAX_CPU_PER_POD = 4
+    low, high = sorted((previous_bytes, current_bytes))
+    if high < 1024 ** 3:
+        return None
+    boundary = 1024 ** 3 * 2 ** int(math.log2(high / 1024 ** 3))
+    if boundary > high:
+        boundary //= 2
+    return boundary if low < boundary else None
 
-    total_cpu = DPS * ROUTER_CPU_PER_DPS
-    replicas = max(math.ceil(total_cpu / MAX_CPU_PER_POD), ROUTER_MIN_REPLICAS)
-    cpu_per_pod = total_cpu / replicas
 
-    return create_resources(
-        cpu_per_pod,
-        ROUTER_MEMORY_PER_POD,
-        replicas,
-        cpu_limit_multiplier=1.3,
-        memory_limit_multiplier=1.15
-    )
+def _threshold_crossings(previous: PoolResources, current: PoolResources) -> List[ThresholdCrossing]:
+    """
+    Replica count changes, plus PVC and S3 sizes crossing a power-of-two GiB tier.
+    """
+    crossings = []
+    for name in engine.COMPONENTS:
+        prev_res, cur_res = getattr(previous, name), getattr(current, name)
+        if prev_res.replicas != cur_res.replicas:
+            crossings.append(ThresholdCrossing(
+                field=f"{name}.replicas", previous=prev_res.replicas, current=cur_res.replicas
+            ))
+        if name in engine.STORAGE_COMPONENTS:
+            boundary = _storage_boundary(parse_k8s_resource(prev_res.storage), parse_k8s_resource(cur_res.storage))
+            if boundary is not None:
+                crossings.append(ThresholdCrossing(
+                    field=f"{name}.storage", previous=prev_res.storage, current=cur_res.storage,
+                    threshold=format_k8s_resource(boundary)
+                ))
+
+    boundary = _storage_boundary(parse_k8s_resource(previous.s3), parse_k8s_resource(current.s3))
+    if boundary is not None:
+        crossings.append(ThresholdCrossing(
+            field="s3", previous=previous.s3, current=current.s3, threshold=format_k8s_resource(boundary)
+        ))
+    return crossings
+
+
+@app.post("/api/calculate/pool_resources/projection", response_model=PoolProjection,
+          response_model_exclude_none=True)
+@timed_handler
+def calculate_pool_projection(req: ProjectionRequest):
+    """
+    Projects pool sizing month by month under compound DPS growth and marks the months
+    where a replica count, PVC or S3 size crosses a threshold.
+    """
+    pool = req.pool
+    c = coefficients.resolve(pool.coefficients).coefficients
+    change_points_only = req.change_points_only
+    if change_points_only is None:
+        change_points_only = req.horizon_months > PROJECTION_FULL_HORIZON_MONTHS
+
+    points = []
+    previous = None
+    for month in range(req.horizon_months + 1):
+        dps = max(1, math.ceil(round(pool.dps * (1 + req.monthly_growth_rate) ** month, 6)))
+
+        # Only DPS moves between steps; when it rounds to last month's value the
+        # whole snapshot carries over unchanged.
+        if previous is not None and dps == previous.dps:
+            resources, crossings = previous, []
+        else:
+            resources = _size_pool(dps, pool.scrape_interval, pool.retention, pool.query, c)
+            crossings = _threshold_crossings(previous, resources) if previous is not None else []
+
+        if not change_points_only or month in (0, req.horizon_months) or crossings:
+            points.append(ProjectionPoint(month=month, dps=dps, crossings=crossings, resources=resources))
+        previous = resources
+
+    return _respond(PoolProjection(
+        monthly_growth_rate=req.monthly_growth_rate,
+        horizon_months=req.horizon_months,
+        change_points_only=change_points_only,
+        points=points
+    ), exclude_none=True)
+
+
+def _pool_usage(res: PoolResources) -> Dict[str, Dict[str, int]]:
+    """
+    Per-component totals of requests × replicas, in millicores and bytes, keyed by
+    budget entry and then by PoolResources field.
+    """
+    usage = {"cpu": {}, "memory": {}, "pvc": {}, "s3": {"s3": parse_k8s_resource(res.s3)}}
+    for name in engine.COMPONENTS:
+        component = getattr(res, name)
+        usage["cpu"][name] = round(parse_cpu(component.requests.cpu) * 1000) * component.replicas
+        usage["memory"][name] = parse_k8s_resource(component.requests.memory) * component.replicas
+        if name in engine.STORAGE_COMPONENTS:
+            usage["pvc"][name] = parse_k8s_resource(component.storage) * component.replicas
+    return usage
+
+
+def _exceeded(usage: Dict[str, Dict[str, int]], limits: Dict[str, int]) -> Optional[str]:
+    """First budget entry the usage exceeds, or None if the pool fits."""
+    for resource, limit in limits.items():
+        if sum(usage[resource].values()) > limit:
+            return resource
+    return None
+
+
+@app.post("/api/calculate/max_dps", response_model=MaxDps, response_model_exclude_none=True)
+@timed_handler
+def calculate_max_dps(req: MaxDpsRequest):
+    """
+    Finds the largest dps whose pool fits the budget, by doubling to an upper bound and
+    bisecting. Totals are monotonic in dps apart from small steps where a replica count
+    changes, so the result is a dps that fits while dps + 1 does not.
+    """
+    budget = req.budget
+    c = coefficients.resolve(req.coefficients).coefficients
+    limits = {}
+    if budget.cpu is not None:
+        limits["cpu"] = round(parse_cpu(budget.cpu) * 1000)
+    for resource in ("memory", "pvc", "s3"):
+        if getattr(budget, resource) is not None:
+            limits[resource] = parse_k8s_resource(getattr(budget, resource))
+
+    def evaluate(dps: int) -> Tuple[PoolResources, Dict[str, Dict[str, int]], Optional[str]]:
+        res = _size_pool(dps, req.scrape_interval, req.retention, coefficients=c)
+        usage = _pool_usage(res)
+        return res, usage, _exceeded(usage, limits)
+
+    fit = evaluate(1)
+    if fit[2] is not None:
+        raise HTTPException(status_code=422, detail=f"budget too small: {fit[2]} is exceeded at dps=1")
+
+    low, fail = 1, None
+    high = 2
+    while fail is None and low < MAX_SOLVER_DPS:
+        high = min(high, MAX_SOLVER_DPS)
+        attempt = evaluate(high)
+        if attempt[2] is None:
+            low, fit = high, attempt
+            high *= 2
+        else:
+            fail = attempt
+
+    if fail is not None:
+        while high - low > 1:
+            mid = (low + high) // 2
+            attempt = evaluate(mid)
+            if attempt[2] is None:
+                low, fit = mid, attempt
+            else:
+                high, fail = mid, attempt
+
+    res, usage, _ = fit
+    limiting_resource = limiting_component = None
+    if fail is not None:
+        limiting_resource = fail[2]
+        contributions = fail[1][limiting_resource]
+        limiting_component = max(contributions, key=contributions.get)
+
+    return _respond(MaxDps(
+        dps=low,
+        scrape_interval=req.scrape_interval,
+        retention=req.retention,
+        limiting_resource=limiting_resource,
+        limiting_component=limiting_component,
+        usage=ResourceTotals(
+            cpu=format_cpu(sum(usage["cpu"].values()) / 1000),
+            memory=format_k8s_resource(sum(usage["memory"].values())),
+            pvc=format_k8s_resource(sum(usage["pvc"].values())),
+            s3=res.s3
+        ),
+        resources=res
+    ), exclude_none=True)
+
+
+def _pack_hashring(tenants: Sequence[TenantLoad], replication_factor: int,
+                   cap: int) -> Tuple[List[int], List[float], List[Dict[str, None]], int]:
+    """
+    Assigns tenants to ingestor replicas by worst-fit decreasing. Tenants above the cap
+    are split into equal shards first. Each shard goes to the replication_factor least
+    loaded replicas that still have room, taken from a min-heap, and new replicas are
+    opened only when those are full. Returns per-replica series, dps and tenant names
+    (an ordered set), plus the number of split tenants.
+    """
+    shards = []
+    split_tenants = 0
+    for tenant in tenants:
+        series = tenant.dps * tenant.scrape_interval
+        count = math.ceil(series / cap)
+        if count > 1:
+            split_tenants += 1
+        base, remainder = divmod(series, count)
+        for i in range(count):
+            shard_series = base + (1 if i < remainder else 0)
+            shards.append((shard_series, tenant.dps * shard_series / series, tenant.name))
+    shards.sort(key=lambda shard: shard[0], reverse=True)
+
+    series_by: List[int] = []
+    dps_by: List[float] = []
+    tenants_by: List[Dict[str, None]] = []
+    heap: List[Tuple[int, int]] = []
+    heappop, heappush = heapq.heappop, heapq.heappush
+    for shard_series, shard_dps, name in shards:
+        # The heap top is the least loaded replica, so once it is full all others are too.
+        max_load = cap - shard_series
+        taken = []
+        while heap and heap[0][0] <= max_load and len(taken) < replication_factor:
+            taken.append(heappop(heap))
+        for _ in range(replication_factor - len(taken)):
+            taken.append((0, len(series_by)))
+            series_by.append(0)
+            dps_by.append(0.0)
+            tenants_by.append({})
+        for load, index in taken:
+            series_by[index] += shard_series
+            dps_by[index] += shard_dps
+            tenants_by[index][name] = None
+            heappush(heap, (load + shard_series, index))
+
+    return series_by, dps_by, tenants_by, split_tenants
+
+
+@app.post("/api/plan/hashring", response_model=HashringPlan)
+@timed_handler
+def plan_hashring(req: HashringRequest):
+    """
+    Plans a multi-tenant receive hashring: packs tenants onto ingestor replicas under the
+    per-replica series cap and replication factor, then sizes each replica on its own load.
+    """
+    cap = INGESTOR_MAX_SERIES_PER_REPLICA
+    c = coefficients.resolve(req.coefficients).coefficients
+    total_series = sum(tenant.dps * tenant.scrape_interval for tenant in req.tenants)
+    total_dps = sum(tenant.dps for tenant in req.tenants)
+    min_replicas = max(req.replication_factor, math.ceil(total_series * req.replication_factor / cap))
+    if min_replicas > MAX_HASHRING_REPLICAS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Hashring needs at least {min_replicas} replicas, the maximum is {MAX_HASHRING_REPLICAS}"
+        )
 
+    with stage("hashring_pack", total_dps):
+        series_by, dps_by, tenants_by, split_tenants = _pack_hashring(req.tenants, req.replication_factor, cap)
+
+    with stage("ingestor", total_dps):
+        replicas = []
+        for index, (series, dps, names) in enumerate(zip(series_by, dps_by, tenants_by)):
+            res = _calc_ingestor(dps, series, c)
+            replicas.append(HashringReplica(
+                replica=index,
+                series=series,
+                dps=math.ceil(round(dps, 6)),
+                tenants=list(names),
+                requests=res.requests,
+                limits=res.limits,
+                storage=res.storage
+            ))
+
+    mean_series = statistics.fmean(series_by)
+    return _respond(HashringPlan(
+        replication_factor=req.replication_factor,
+        total_series=total_series,
+        split_tenants=split_tenants,
+        min_replicas=min_replicas,
+        replicas=replicas,
+        skew=HashringSkew(
+            min_series=min(series_by),
+            max_series=max(series_by),
+            mean_series=mean_series,
+            stddev_series=statistics.pstdev(series_by, mean_series),
+            max_to_mean=max(series_by) / mean_series
+        )
+    ))
 
-def _calc_ingestor(DPS: int, ACTIVE_TS: float) -> ResourcesWithStorage:
+
+def _pack_nodes(deployments: Sequence[Tuple[int, str, int, int, int]], cpu_alloc: int,
+                mem_alloc: int) -> Tuple[int, int, List[UnschedulablePods]]:
+    """
+    Packs deployments of (pool, component, millicores, memory bytes, replicas) onto
+    identical nodes, with every replica of a deployment on a different node. Deployments
+    go largest first; each takes its replicas from the least loaded nodes (by dominant
+    resource share) popped off a min-heap, skipping at most NODE_PACK_PROBE_LIMIT nodes
+    without room before opening new ones. Returns nodes used, pods placed and the pods
+    that do not fit an empty node.
+    """
+    def dominant_share(cpu: int, memory: int) -> float:
+        return max(cpu / cpu_alloc, memory / mem_alloc)
+
+    node_cpu: List[int] = []
+    node_mem: List[int] = []
+    heap: List[Tuple[float, int]] = []
+    placed = 0
+    unschedulable = []
+    schedulable = []
+    for deployment in deployments:
+        pool, component, cpu, memory, replicas = deployment
+        if cpu > cpu_alloc or memory > mem_alloc:
+            unschedulable.append(UnschedulablePods(pool=pool, component=component, replicas=replicas))
+        else:
+            schedulable.append(deployment)
+    schedulable.sort(key=lambda d: dominant_share(d[2], d[3]), reverse=True)
+
+    for _, _, cpu, memory, replicas in schedulable:
+        taken, skipped = [], []
+        while heap and len(taken) < replicas and len(skipped) < NODE_PACK_PROBE_LIMIT:
+            entry = heapq.heappop(heap)
+            index = entry[1]
+            if node_cpu[index] + cpu <= cpu_alloc and node_mem[index] + memory <= mem_alloc:
+                taken.append(index)
+            else:
+                skipped.append(entry)
+        for _ in range(replicas - len(taken)):
+            taken.append(len(node_cpu))
+            node_cpu.append(0)
+            node_mem.append(0)
+        for index in taken:
+            node_cpu[index] += cpu
+            node_mem[index] += memory
+            heapq.heappush(heap, (dominant_share(node_cpu[index], node_mem[index]), index))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        placed += replicas
+
+    return len(node_cpu), placed, unschedulable
+
+
+@app.post("/api/plan/nodes", response_model=NodePlan, response_model_exclude_none=True)
+@timed_handler
+def plan_nodes(req: NodePlanRequest):
     """
-    Ingestor: CPU = DPS/12k + 20% query overhead, RAM = 12 KiB/series + 75% headroom,
-    PVC covers WAL (2h) + blocks (4h), sharded at 4M series/replica, min 5 Gi PVC.
+    Turns pool sizing into a node count per node shape by packing every replica of every
+    component onto nodes, with anti-affinity between replicas of the same component.
     """
-    BYTES_PER_SERIES = 12 * 1024
-    # Receiver keeps 6h of local data; the head block covers the first 2h,
-    # leaving 4h worth of completed blocks on disk (receiver_retention_hours - head_hours).
-    BLOCK_HOURS = 4
-    CPU_PER_DPS_INGEST = 1 / 12000
-    MAX_SERIES_PER_REPLICA = 4000000
-    MIN_PVC_BYTES = 5 * 1024**3
+    deployments = []
+    for pool_index, pool in enumerate(req.pools):
+        for name in engine.COMPONENTS:
+            component = getattr(pool, name)
+            deployments.append((
+                pool_index,
+                name,
+                round(parse_cpu(component.requests.cpu) * 1000),
+                parse_k8s_resource(component.requests.memory),
+                component.replicas
+            ))
+
+    plans = []
+    for shape in req.nodes:
+        cpu_alloc = round((parse_cpu(shape.cpu) - parse_cpu(shape.overhead_cpu)) * 1000)
+        mem_alloc = parse_k8s_resource(shape.memory) - parse_k8s_resource(shape.overhead_memory)
+        if cpu_alloc <= 0 or mem_alloc <= 0:
+            raise HTTPException(status_code=422,
+                                detail=f"node shape {shape.name}: no CPU or memory left after overhead")
+        with stage("node_pack"):
+            nodes, pods, unschedulable = _pack_nodes(deployments, cpu_alloc, mem_alloc)
+
+        unplaced = {(u.pool, u.component) for u in unschedulable}
+        placed = [d for d in deployments if (d[0], d[1]) not in unplaced]
+        cpu_requested = sum(d[2] * d[4] for d in placed)
+        mem_requested = sum(d[3] * d[4] for d in placed)
+        plans.append(NodeTypePlan(
+            name=shape.name,
+            nodes=nodes,
+            pods=pods,
+            cpu_requested=format_cpu(cpu_requested / 1000),
+            memory_requested=format_k8s_resource(mem_requested),
+            cpu_utilization=cpu_requested / (nodes * cpu_alloc) if nodes else 0.0,
+            memory_utilization=mem_requested / (nodes * mem_alloc) if nodes else 0.0,
+            unschedulable=unschedulable
+        ))
+
+    candidates = [plan for plan in plans if not plan.unschedulable]
+    recommended = min(
+        candidates, key=lambda plan: (plan.nodes, -(plan.cpu_utilization + plan.memory_utilization)), default=None
+    )
+    return _respond(NodePlan(
+        recommended=recommended.name if recommended is not None else None,
+        plans=plans
+    ), exclude_none=True)
 
-    cpu = DPS * CPU_PER_DPS_INGEST * 1.2        # +20% query cost
-    memory = ACTIVE_TS * BYTES_PER_SERIES * 1.75  # +75% query headroom
 
-    wal_bytes = DPS * 7200 * 30
-    block_bytes = DPS * BLOCK_HOURS * 3600 * 2
-    disk_bytes = max((wal_bytes + block_bytes) * 1.2, MIN_PVC_BYTES)
+def _index_load_seconds(blocks: int, header_bytes: float) -> float:
+    """Index-header load time: per-block request latency, parallelized, plus transfer time."""
+    return math.ceil(blocks / STORE_BLOCK_SYNC_CONCURRENCY) * INDEX_HEADER_BLOCK_SECONDS \
+        + header_bytes / INDEX_HEADER_BYTES_PER_SECOND
 
-    replicas = math.ceil(ACTIVE_TS / MAX_SERIES_PER_REPLICA)
 
-    return create_resources_with_storage(
-        cpu,
-        memory,
-        replicas,
-        storage_bytes=disk_bytes,
-        cpu_limit_multiplier=1.25,
-        memory_limit_multiplier=1.4
-    )
+def _store_tiers(ret_raw: int, ret_5m: int, retention: int) -> List[Tuple[str, List[str], int, int]]:
+    """
+    (name, resolutions, newest day, oldest day) of each non-empty time tier, lined up
+    with the raw, 5m and 1h retention windows of _size_pool.
+    """
+    tiers = [
+        ("raw", ["raw", "5m", "1h"], 0, ret_raw),
+        ("5m", ["5m", "1h"], ret_raw, ret_5m),
+        ("1h", ["1h"], ret_5m, retention),
+    ]
+    return [tier for tier in tiers if tier[3] > tier[2]]
 
 
-def _calc_s3(ACTIVE_TS: float, SCRAPE_INTERVAL: int,
-             RET_RAW_DAYS: int, RET_5M_DAYS: int, RET_1H_DAYS: int) -> float:
+@app.post("/api/plan/store_shards", response_model=StoreShardPlan)
+@timed_handler
+def plan_store_shards(req: StoreShardRequest):
+    """
+    Splits the store gateway into time tiers (--min-time/--max-time) lined up with the
+    retention windows, and each tier into hash shards over __block_id. Each tier takes
+    the fewest shards that keep the memory request and the index-header load time
+    within bounds. Memory, CPU and PVC are the single store's demand, split by each
+    tier's share of blocks or bytes, so one shard per tier adds up to the unsharded
+    store plus one baseline per extra pod.
     """
-    S3 storage: models storage efficiency gains as cardinality grows (baseline <200k series,
-    up to ~15% compression gain at 2M+ series). Returns total bytes.
+    pool = req.pool
+    c = coefficients.resolve(pool.coefficients).coefficients
+    active_ts = pool.dps * pool.scrape_interval
+    max_memory = parse_k8s_resource(req.max_memory_per_shard)
+    daily_bytes = dict(zip(("raw", "5m", "1h"), _s3_bytes_per_series_day(active_ts, pool.scrape_interval, c)))
+    index_cache_bytes = _store_index_cache_bytes(active_ts, c)
+    pvc_ratio = _store_pvc_ratio(active_ts)
+    ret_raw = min(30, pool.retention)
+    ret_5m = ret_raw + max(0, math.ceil((pool.retention - ret_raw) / 2))
+    tiers = _store_tiers(ret_raw, ret_5m, pool.retention)
+
+    with stage("store", pool.dps):
+        blocks_by = [len(resolutions) * math.ceil((oldest - newest) / STORE_BLOCK_DAYS)
+                     for _, resolutions, newest, oldest in tiers]
+        total_blocks = sum(blocks_by)
+        total_s3 = _calc_s3(active_ts, pool.scrape_interval, ret_raw, ret_5m, pool.retention, c)
+        unsharded = _calc_store(active_ts, total_s3, c)
+        unsharded_load = _index_load_seconds(total_blocks, active_ts * INDEX_HEADER_BYTES_PER_SERIES * total_blocks)
+
+        plans = []
+        notes = []
+        for (name, resolutions, newest, oldest), blocks in zip(tiers, blocks_by):
+            share = blocks / total_blocks
+            tier_s3 = active_ts * sum(daily_bytes[r] for r in resolutions) * (oldest - newest)
+            header_bytes = active_ts * INDEX_HEADER_BYTES_PER_SERIES * blocks
+
+            def memory(shards: int) -> float:
+                return (c.store_baseline_bytes + index_cache_bytes * share / shards) * c.store_memory_headroom
+
+            def load(shards: int) -> float:
+                return _index_load_seconds(math.ceil(blocks / shards), header_bytes / shards)
+
+            # Hash sharding splits blocks, so more shards than blocks cannot help.
+            max_shards = max(1, min(req.max_shards_per_tier, blocks))
+            shards = 1
+            while shards < max_shards and (memory(shards) > max_memory or load(shards) > req.max_index_load_seconds):
+                shards += 1
+            limited_by = None
+            if memory(shards) > max_memory:
+                limited_by = "memory"
+            elif load(shards) > req.max_index_load_seconds:
+                limited_by = "index_load"
+            if limited_by is not None:
+                notes.append(f"The {name} tier exceeds max {limited_by.replace('_', ' ')} at {shards} shards; "
+                             "raise max_shards_per_tier or the bound.")
+
+            shard = create_resources_with_storage(
+                max(0.1, active_ts / c.store_series_per_core * share / shards),
+                memory(shards),
+                req.replicas_per_shard,
+                storage_bytes=tier_s3 * pvc_ratio / shards,
+                cpu_limit_multiplier=STORE_CPU_LIMIT_MULTIPLIER,
+                memory_limit_multiplier=STORE_MEMORY_LIMIT_MULTIPLIER
+            )
+            plans.append(StoreTier(
+                name=name,
+                resolutions=resolutions,
+                min_time=f"-{oldest}d",
+                max_time=f"-{newest}d" if newest else None,
+                blocks=blocks,
+                s3=format_k8s_resource(tier_s3),
+                shards=shards,
+                limited_by=limited_by,
+                shard=shard,
+                index_header_size=format_k8s_resource(header_bytes / shards),
+                index_load_seconds=round(load(shards), 3)
+            ))
+
+    min_shard_memory = c.store_baseline_bytes * c.store_memory_headroom
+    if min_shard_memory > max_memory:
+        notes.append(f"A store shard needs at least {format_k8s_resource(min_shard_memory)} before any index data.")
+
+    pods = [(tier.shard, tier.shards * tier.shard.replicas) for tier in plans]
+    return _respond(StoreShardPlan(
+        unsharded=unsharded,
+        unsharded_index_load_seconds=round(unsharded_load, 3),
+        tiers=plans,
+        total_replicas=sum(count for _, count in pods),
+        totals=ResourceTotals(
+            cpu=format_cpu(sum(round(parse_cpu(res.requests.cpu) * 1000) * count for res, count in pods) / 1000),
+            memory=format_k8s_resource(sum(parse_k8s_resource(res.requests.memory) * count for res, count in pods)),
+            pvc=format_k8s_resource(sum(parse_k8s_resource(res.storage) * count for res, count in pods)),
+            s3=format_k8s_resource(total_s3)
+        ),
+        restart_seconds=max(tier.index_load_seconds for tier in plans),
+        notes=notes
+    ))
+
+
+def _compaction_work(dps: float, series: float, scrape_interval: int,
+                     c: Coefficients = DEFAULT_COEFFICIENTS) -> List[Tuple[str, int, bool, float, float]]:
     """
-    if ACTIVE_TS < 200000:
-        scale_multiplier = 1.0
-    else:
-        scale_factor = min(1.0, (ACTIVE_TS - 200000) / 1800000)
-        scale_multiplier = 0.599 - (scale_factor * 0.0806)
+    (step, hours per block, downsampling pass, block bytes read, seconds on one slot) of
+    each compaction level and downsampling pass of one compactor holding dps and series.
+    5m blocks are smaller than raw ones by the S3 model's ratio.
+    """
+    raw_per_day, downsample_5m_per_day, _ = _s3_bytes_per_series_day(dps * scrape_interval, scrape_interval, c)
+    resolution_ratio = {"raw": 1.0, "5m": downsample_5m_per_day / raw_per_day}
+    work = []
+    for name, hours, resolution, downsampling in COMPACTION_STEPS:
+        block_bytes = dps * 3600 * hours * c.compactor_bytes_per_sample * resolution_ratio[resolution]
+        seconds = block_bytes / COMPACTOR_BYTES_PER_SECOND + series / COMPACTOR_SERIES_PER_SECOND
+        work.append((name, hours, downsampling, block_bytes, seconds))
+    return work
+
+
+@app.post("/api/plan/compactor_shards", response_model=CompactorShardPlan)
+@timed_handler
+def plan_compactor_shards(req: CompactorShardRequest):
+    """
+    Splits the compactor into relabel- or tenant-sharded instances, each holding an
+    even share of the pool's series. A shard runs its compaction levels with
+    --compact.concurrency slots, then its downsampling passes with
+    --downsample.concurrency slots. The planner takes the fewest shards whose daily work
+    fits in max_utilization of the day and whose longest single block fits in
+    max_compaction_hours; concurrency cannot split one block. Scratch space holds the
+    sources and output of the shard's largest block per compaction slot, so one shard at
+    concurrency 1 is the pool's compactor.
+    """
+    pool = req.pool
+    c = coefficients.resolve(pool.coefficients).coefficients
+    active_ts = pool.dps * pool.scrape_interval
+    slots = max(req.compact_concurrency, req.downsample_concurrency)
+
+    def busy_seconds(hours: int, downsampling: bool, seconds: float) -> float:
+        concurrency = req.downsample_concurrency if downsampling else req.compact_concurrency
+        return 24 / hours * seconds / concurrency
+
+    def utilization(work) -> float:
+        return sum(busy_seconds(hours, downsampling, seconds)
+                   for _, hours, downsampling, _, seconds in work) / 86400
+
+    def longest_hours(work) -> float:
+        return max(seconds for *_, seconds in work) / 3600
+
+    with stage("compactor", pool.dps):
+        unsharded = _calc_compactor(pool.dps, active_ts, c)
+        unsharded_work = _compaction_work(pool.dps, active_ts, pool.scrape_interval, c)
+        shards, work = 1, unsharded_work
+        while shards < req.max_shards and (utilization(work) > req.max_utilization
+                                           or longest_hours(work) > req.max_compaction_hours):
+            shards += 1
+            work = _compaction_work(pool.dps / shards, active_ts / shards, pool.scrape_interval, c)
+
+        notes = []
+        limited_by = None
+        if utilization(work) > req.max_utilization:
+            limited_by = "utilization"
+            notes.append(f"Each shard is busy {utilization(work):.0%} of the day at max_shards={shards}; raise "
+                         "max_shards or the concurrency.")
+        elif longest_hours(work) > req.max_compaction_hours:
+            limited_by = "compaction_time"
+            notes.append(f"The longest compaction takes {longest_hours(work):.1f}h at max_shards={shards}; "
+                         "raise max_shards or max_compaction_hours.")
+
+        steps = [
+            CompactionStep(
+                name=name,
+                blocks_per_day=round(24 / hours, 4),
+                block_size=format_k8s_resource(block_bytes),
+                seconds_per_block=round(seconds, 3),
+                blocks_per_hour=round((req.downsample_concurrency if downsampling else req.compact_concurrency)
+                                      * 3600 / seconds, 3),
+                busy_hours_per_day=round(busy_seconds(hours, downsampling, seconds) / 3600, 3)
+            )
+            for name, hours, downsampling, block_bytes, seconds in work
+        ]
+        cpu, ram_bytes = _compactor_cpu_and_memory(active_ts / shards, c)
+        largest_block_bytes = pool.dps / shards * 86400 * c.compactor_bytes_per_sample * COMPACTOR_LARGEST_BLOCK_DAYS
+        shard = create_resources_with_storage(
+            max(cpu, slots),
+            ram_bytes + (slots - 1) * active_ts / shards * COMPACTOR_SLOT_BYTES_PER_SERIES,
+            1,
+            storage_bytes=pool.dps / shards * 86400 * c.compactor_bytes_per_sample
+            * (2 * COMPACTOR_LARGEST_BLOCK_DAYS) * req.compact_concurrency,
+            cpu_limit_multiplier=COMPACTOR_CPU_LIMIT_MULTIPLIER,
+            memory_limit_multiplier=COMPACTOR_MEMORY_LIMIT_MULTIPLIER
+        )
+        ret_raw = min(30, pool.retention)
+        ret_5m = ret_raw + max(0, math.ceil((pool.retention - ret_raw) / 2))
+        total_s3 = _calc_s3(active_ts, pool.scrape_interval, ret_raw, ret_5m, pool.retention, c)
+
+    return _respond(CompactorShardPlan(
+        unsharded=unsharded,
+        unsharded_utilization=round(utilization(unsharded_work), 4),
+        shards=shards,
+        limited_by=limited_by,
+        shard=shard,
+        steps=steps,
+        utilization=round(utilization(work), 4),
+        longest_compaction_hours=round(longest_hours(work), 3),
+        largest_block_size=format_k8s_resource(largest_block_bytes),
+        totals=ResourceTotals(
+            cpu=format_cpu(round(parse_cpu(shard.requests.cpu) * 1000) * shards / 1000),
+            memory=format_k8s_resource(parse_k8s_resource(shard.requests.memory) * shards),
+            pvc=format_k8s_resource(parse_k8s_resource(shard.storage) * shards),
+            s3=format_k8s_resource(total_s3)
+        ),
+        notes=notes
+    ))
+
+
+def _draw(dist: Distribution, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Draws size samples from a request distribution."""
+    if dist.kind == "normal":
+        return rng.normal(dist.mean, dist.stddev, size)
+    if dist.kind == "lognormal":
+        # Parameterized by the mean and stddev of the distribution itself, not of its log.
+        ratio = dist.stddev / dist.mean
+        # ratio ** 2 overflows for extreme ratios, where log1p(ratio ** 2) == 2 * log(ratio).
+        sigma2 = math.log1p(ratio ** 2) if ratio < 1e150 else 2 * (math.log(dist.stddev) - math.log(dist.mean))
+        return rng.lognormal(math.log(dist.mean) - sigma2 / 2, math.sqrt(sigma2), size)
+    return rng.choice(np.asarray(dist.samples, dtype=np.float64), size)
+
+
+@app.post("/api/calculate/pool_resources/monte_carlo", response_model=MonteCarloResult,
+          response_model_exclude_none=True)
+@timed_handler
+def calculate_pool_monte_carlo(req: MonteCarloRequest):
+    """
+    Sizes a pool under uncertain dps (and optionally series churn): draws samples, sizes
+    them all in one columnar engine pass and returns per-field P50/P90/P99.
+    """
+    rng = np.random.default_rng(req.seed)
+    dps = np.clip(np.ceil(_draw(req.dps, req.samples, rng)), 1, MAX_SAMPLED_DPS).astype(np.int64)
+    active_ts = None
+    if req.churn is not None:
+        churn = np.maximum(_draw(req.churn, req.samples, rng), 0)
+        active_ts = np.minimum(dps * req.scrape_interval * (1 + churn), MAX_SAMPLED_SERIES)
+
+    with stage("engine"):
+        cols = engine.size_pool(dps, req.scrape_interval, req.retention, active_ts=active_ts,
+                                coefficients=coefficients.resolve(req.coefficients).coefficients)
+    with stage("percentiles"):
+        p50, p90, p99 = engine.iter_pool_resources(engine.percentiles(cols, MONTE_CARLO_PERCENTILES))
+
+    return _respond(MonteCarloResult(
+        samples=req.samples,
+        percentiles=MonteCarloPercentiles(p50=p50, p90=p90, p99=p99)
+    ), exclude_none=True)
+
+
+def _autoscale(pod: Resources, total_cpu: np.ndarray, replicas: np.ndarray, max_cpu_utilization: int,
+               scale_up_minutes: float) -> AutoscaledComponent:
+    """
+    HPA settings of one component, from its CPU demand and replica floor per bucket and
+    the pod sized for its peak bucket. The CPU target leaves room for the steepest
+    bucket-to-bucket rise (the curve wraps around) to play out while new pods start;
+    each bucket then runs enough pods to hold its demand at that target.
+    """
+    pod_cpu = parse_cpu(pod.requests.cpu)
+    pod_memory = parse_k8s_resource(pod.requests.memory)
+    rise = float(np.max(np.roll(total_cpu, -1) / total_cpu)) ** (scale_up_minutes / BUCKET_MINUTES)
+    target = max(1, min(max_cpu_utilization, math.floor(100 / max(1.0, rise))))
+    # Rounded before ceil so float noise in the millicore round trip cannot add a pod.
+    needed = np.maximum(replicas, np.ceil(np.round(total_cpu / (pod_cpu * target / 100), 6))).astype(np.int64)
+    max_replicas = int(needed.max())
+    freed = float(np.mean(max_replicas - needed))
+    return AutoscaledComponent(
+        pod=pod.model_copy(update={"replicas": max_replicas}),
+        min_replicas=int(needed.min()),
+        max_replicas=max_replicas,
+        target_cpu_utilization=target,
+        replicas=needed.tolist(),
+        # format_cpu never returns less than 100m, so a component with nothing to free reads "0".
+        reclaimable=BasicResources(cpu=format_cpu(freed * pod_cpu) if freed else "0",
+                                   memory=format_k8s_resource(freed * pod_memory)),
+        reclaimable_share=round(freed / max_replicas, 4)
+    )
 
-    samples_per_day = 86400 / SCRAPE_INTERVAL
-    raw_bytes_per_series_per_day = samples_per_day * 6 * scale_multiplier
-    downsample_5m_per_series_per_day = 3000 * scale_multiplier
-    downsample_1h_per_series_per_day = 300 * scale_multiplier
 
-    s3_raw = ACTIVE_TS * raw_bytes_per_series_per_day   * RET_RAW_DAYS
-    s3_5m  = ACTIVE_TS * downsample_5m_per_series_per_day * RET_5M_DAYS
-    s3_1h  = ACTIVE_TS * downsample_1h_per_series_per_day * RET_1H_DAYS
+@app.post("/api/plan/autoscaling", response_model=AutoscalingPlan)
+@timed_handler
+def plan_autoscaling(req: AutoscalingRequest):
+    """
+    Sizes the router, querier and query frontend for every hourly bucket of a dps (and
+    optionally qps) curve, then turns the per-bucket needs into HPA settings: the pod
+    sized for the component's peak, min/max replicas and a CPU target. The ingest side
+    is sized in one columnar engine pass over all buckets; a query load runs the scalar
+    query path per bucket. Stateful components (ingestors, store, compactor) are not
+    autoscaled and stay sized for the peak.
+    """
+    dps = np.asarray(req.dps, dtype=np.int64)
+    coeffs = coefficients.resolve(req.coefficients).coefficients
+    load = req.query
+    if req.qps is not None and load is None:
+        load = QueryLoad(qps=req.qps[0])
+    loads = [None] * len(dps) if load is None else [
+        load if req.qps is None else load.model_copy(update={"qps": qps}) for qps in req.qps]
+
+    with stage("engine"):
+        cols = engine.size_pool(dps, req.scrape_interval, req.retention, coefficients=coeffs)
+    demand = {}
+    for name in AUTOSCALED_COMPONENTS:
+        # Demand in the millicores the pods would request, as parse_cpu reads them back.
+        values, units = engine.cpu_quantity(cols[name]["cpu"])
+        demand[name] = (np.where(units == 1, values / 1000, values) * cols[name]["replicas"], cols[name]["replicas"])
+    if load is not None:
+        with stage("frontend_querier"):
+            paths = [_calc_query_path(int(d), req.scrape_interval, int(d) * req.scrape_interval, req.retention,
+                                      bucket, coeffs)
+                     for d, bucket in zip(req.dps, loads)]
+        for name, index in (("query_frontend", 0), ("query", 1)):
+            resources = [path[index] for path in paths]
+            replicas = np.array([res.replicas for res in resources], dtype=np.int64)
+            cpu = np.array([parse_cpu(res.requests.cpu) for res in resources])
+            demand[name] = (cpu * replicas, replicas)
+
+    components = {}
+    pools = {}
+    for name in AUTOSCALED_COMPONENTS:
+        total_cpu, replicas = demand[name]
+        peak = int(np.argmax(total_cpu))
+        if peak not in pools:
+            pools[peak] = _size_pool(req.dps[peak], req.scrape_interval, req.retention, loads[peak], coeffs)
+        with stage("hpa"):
+            components[name] = _autoscale(getattr(pools[peak], name), total_cpu, replicas,
+                                          req.max_cpu_utilization, req.scale_up_minutes)
+
+    notes = []
+    for name, component in components.items():
+        if component.target_cpu_utilization < req.max_cpu_utilization:
+            notes.append(f"{name}: traffic rises fast enough that the CPU target drops to "
+                         f"{component.target_cpu_utilization}% to absorb it during the {req.scale_up_minutes:g}-minute "
+                         "scale-up.")
+        if component.min_replicas == component.max_replicas:
+            notes.append(f"{name}: the curve never needs fewer than max_replicas; an HPA saves nothing.")
+
+    freed = {name: c.max_replicas - float(np.mean(c.replicas)) for name, c in components.items()}
+    reclaimable_cpu = sum(freed[name] * parse_cpu(c.pod.requests.cpu) for name, c in components.items())
+    reclaimable_memory = sum(freed[name] * parse_k8s_resource(c.pod.requests.memory) for name, c in components.items())
+    peak_cpu = sum(parse_cpu(c.pod.requests.cpu) * c.max_replicas for c in components.values())
+    return _respond(AutoscalingPlan(
+        buckets=len(dps),
+        peak_bucket=int(np.argmax(dps)),
+        **components,
+        reclaimable=BasicResources(cpu=format_cpu(reclaimable_cpu) if reclaimable_cpu else "0",
+                                   memory=format_k8s_resource(reclaimable_memory)),
+        reclaimable_share=round(reclaimable_cpu / peak_cpu, 4),
+        notes=notes
+    ))
+
+
+def _parse_quantities(values: List[str], parse: Callable[[str], float]) -> np.ndarray:
+    """
+    Parses Kubernetes quantity strings into floats, each distinct string once; the
+    deployments of a fleet repeat a handful of sizes.
+    """
+    parsed = {value: parse(value) for value in set(values)}
+    return np.fromiter(map(parsed.__getitem__, values), dtype=np.float64, count=len(values))
+
 
-    return s3_raw + s3_5m + s3_1h
+def _resource_columns(pools: Sequence[PoolResources], strings: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Per-pod millicores and bytes and the replicas of PoolResources-shaped deployments,
+    in columns keyed like export.flatten's; strings=True adds the quantity strings.
+    """
+    out = {}
+    for name in engine.COMPONENTS:
+        keys = [f"{name}.{path}" for path in ("requests.cpu", "requests.memory", "limits.cpu", "limits.memory")]
+        if name in engine.STORAGE_COMPONENTS:
+            keys.append(f"{name}.storage")
+        for key in keys:
+            values = list(map(attrgetter(key), pools))
+            if key.endswith(".cpu"):
+                out[f"{key}_millicores"] = np.round(_parse_quantities(values, parse_cpu) * 1000)
+            else:
+                out[f"{key}_bytes"] = _parse_quantities(values, parse_k8s_resource)
+            if strings:
+                out[key] = np.array(values, dtype=object)
+        out[f"{name}.replicas"] = np.fromiter(map(attrgetter(f"{name}.replicas"), pools), dtype=np.float64,
+                                              count=len(pools))
+    return out
+
+
+@app.post("/api/plan/fleet_diff", response_model=FleetDiff, response_model_exclude_none=True)
+@timed_handler
+def plan_fleet_diff(req: FleetDiffRequest):
+    """
+    Compares what every cluster of a fleet runs with its recommended sizing and ranks the
+    components whose total CPU, memory or PVC requests differ by more than the tolerance.
+    Recommendations come from one columnar engine pass per coefficient profile (pools
+    with a query load take the scalar path) and stay numeric; response models are built
+    only for the flagged components that are returned.
+    """
+    n = len(req.clusters)
+    recommended: Dict[str, np.ndarray] = {}
+
+    def scatter(rows: List[int], columns: Dict[str, Any]) -> None:
+        for key, values in columns.items():
+            if key.split(".", 1)[0] not in engine.COMPONENTS:
+                continue
+            if isinstance(values, export.Strings):
+                values = values.decode()
+            if key not in recommended:
+                recommended[key] = np.empty(n, dtype=object if values.dtype.kind in "OU" else np.float64)
+            recommended[key][rows] = values
+
+    groups: Dict[Optional[str], List[int]] = {}
+    loaded = []
+    for index, cluster in enumerate(req.clusters):
+        if cluster.pool.query is None:
+            groups.setdefault(cluster.pool.coefficients, []).append(index)
+        else:
+            loaded.append(index)
+    with stage("engine", n):
+        for selector, rows in groups.items():
+            pools = [req.clusters[index].pool for index in rows]
+            cols = engine.size_pool([pool.dps for pool in pools], [pool.scrape_interval for pool in pools],
+                                    [pool.retention for pool in pools],
+                                    coefficients=coefficients.resolve(selector).coefficients)
+            scatter(rows, export.flatten(cols))
+    if loaded:
+        with stage("query_path", len(loaded)):
+            pools = [req.clusters[index].pool for index in loaded]
+            scatter(loaded, _resource_columns([
+                _size_pool(pool.dps, pool.scrape_interval, pool.retention, pool.query,
+                           coefficients.resolve(pool.coefficients).coefficients)
+                for pool in pools
+            ], strings=True))
+    with stage("parse", n):
+        current = _resource_columns([cluster.current for cluster in req.clusters])
+
+    flagged = []
+    diffs = {}
+    excess_cpu = excess_memory = shortfall_cpu = shortfall_memory = 0.0
+    with stage("diff", n):
+        for order, name in enumerate(engine.COMPONENTS):
+            fields = ["requests.cpu_millicores", "requests.memory_bytes", "limits.cpu_millicores",
+                      "limits.memory_bytes"]
+            if name in engine.STORAGE_COMPONENTS:
+                fields.append("storage_bytes")
+            delta = {}
+            relative = []
+            for field in fields:
+                current_total = current[f"{name}.{field}"] * current[f"{name}.replicas"]
+                recommended_total = recommended[f"{name}.{field}"] * recommended[f"{name}.replicas"]
+                delta[field] = current_total - recommended_total
+                if not field.startswith("limits."):
+                    relative.append(delta[field] / recommended_total)
+            relative = np.stack(relative)
+            outside = np.abs(relative) > req.tolerance
+            deviation = np.abs(relative).max(axis=0)
+            rows = np.flatnonzero(outside.any(axis=0))
+            diffs[name] = (delta, relative, deviation)
+            flagged.extend((-deviation[row], row, order) for row in rows.tolist())
+
+            cpu, memory = delta["requests.cpu_millicores"][rows], delta["requests.memory_bytes"][rows]
+            excess_cpu += cpu[cpu > 0].sum()
+            shortfall_cpu -= cpu[cpu < 0].sum()
+            excess_memory += memory[memory > 0].sum()
+            shortfall_memory -= memory[memory < 0].sum()
+
+    flagged.sort()
+    entries = []
+    for _, row, order in flagged[:req.max_entries]:
+        name = engine.COMPONENTS[order]
+        delta, relative, deviation = diffs[name]
+        over = bool((relative[:, row] > req.tolerance).any())
+        under = bool((relative[:, row] < -req.tolerance).any())
+        storage = name in engine.STORAGE_COMPONENTS
+        entries.append(FleetDiffEntry(
+            cluster=req.clusters[row].name,
+            component=name,
+            direction="mixed" if over and under else "over" if over else "under",
+            deviation=round(float(deviation[row]), 4),
+            current_replicas=int(current[f"{name}.replicas"][row]),
+            recommended_replicas=int(recommended[f"{name}.replicas"][row]),
+            recommended=BasicResources(cpu=recommended[f"{name}.requests.cpu"][row],
+                                       memory=recommended[f"{name}.requests.memory"][row]),
+            recommended_storage=recommended[f"{name}.storage"][row] if storage else None,
+            cpu_delta=float(delta["requests.cpu_millicores"][row]) / 1000,
+            memory_delta=int(delta["requests.memory_bytes"][row]),
+            cpu_limit_delta=float(delta["limits.cpu_millicores"][row]) / 1000,
+            memory_limit_delta=int(delta["limits.memory_bytes"][row]),
+            storage_delta=int(delta["storage_bytes"][row]) if storage else None
+        ))
+
+    return _respond(FleetDiff(
+        clusters=n,
+        components=n * len(engine.COMPONENTS),
+        flagged=len(flagged),
+        excess=BasicResources(cpu=format_cpu(excess_cpu / 1000) if excess_cpu else "0",
+                              memory=format_k8s_resource(excess_memory)),
+        shortfall=BasicResources(cpu=format_cpu(shortfall_cpu / 1000) if shortfall_cpu else "0",
+                                 memory=format_k8s_resource(shortfall_memory)),
+        entries=entries
+    ), exclude_none=True)
+
+
+@app.get("/api/cache/stats", response_model=SizingCacheStats)
+async def cache_stats():
+    """
+    Hit, miss and eviction counters of the sizing result caches.
+    """
+    return SizingCacheStats(pool=pool_cache.stats(), collector=collector_cache.stats())
 
 
-def _calc_compactor(DPS: int, ACTIVE_TS: float) -> ResourcesWithStorage:
+@app.get("/api/coefficients", response_model=List[CoefficientProfile])
+async def list_coefficient_profiles():
     """
-    Compactor: scratch = 28 days of daily-generated bytes, RAM/CPU scale log10
-    with active series (base 2 GB/2 CPU, CPU capped at 8).
+    Loaded coefficient profiles, the built-in default first, with every coefficient
+    they size with.
     """
-    daily_gen_bytes = DPS * 86400 * 1.5
-    scratch_bytes = daily_gen_bytes * 28
+    return list(coefficients.profiles().values())
 
-    series_in_thousands = max(10, ACTIVE_TS / 1000)
-    ram_gb = 2 + (math.log10(series_in_thousands) * 5)
-    cpu    = max(0.1, min(8, 2 + (math.log10(series_in_thousands) * 1.2)))
-    ram_bytes = ram_gb * 1024**3
 
-    return create_resources_with_storage(
-        cpu,
-        ram_bytes,
-        1,
-        storage_bytes=scratch_bytes,
-        cpu_limit_multiplier=1.3,
-        memory_limit_multiplier=1.5
-    )
+def _require_admin(request: Request) -> None:
+    if not profile_store.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not profile_store.authorized(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token is required")
 
 
-def _calc_store(ACTIVE_TS: float, total_s3_bytes: float) -> ResourcesWithStorage:
+@app.get("/api/admin/profiles/{profile_id}", response_class=FileResponse, include_in_schema=False)
+async def download_profile(request: Request, profile_id: str):
     """
-    Store Gateway: RAM = 2 GB baseline + per-series index metadata (2 KB→1.4 KB)
-    + 40% headroom. CPU = 1 core/1.5M series. PVC = 5–10% of S3 total.
+    pstats dump of a profiled request, for snakeviz, flameprof or `python -m pstats`.
     """
-    base_bytes_per_series = 2000
-    min_bytes_per_series  = 1400
+    _require_admin(request)
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
 
-    series_scale = min(1.0, ACTIVE_TS / 5000000)
-    bytes_per_series = base_bytes_per_series - (
-        series_scale * (base_bytes_per_series - min_bytes_per_series)
-    )
 
-    index_cache_bytes = ACTIVE_TS * bytes_per_series
-    baseline_bytes    = 2 * 1024**3
-    ram       = (baseline_bytes + index_cache_bytes) * 1.4
-    cpu       = max(0.1, ACTIVE_TS / 1500000)
-    pvc_ratio = 0.10 - min(0.05, ACTIVE_TS / 10000000 * 0.05)
-    pvc       = total_s3_bytes * pvc_ratio
-
-    return create_resources_with_storage(
-        cpu,
-        ram,
-        1,
-        storage_bytes=pvc,
-        cpu_limit_multiplier=1.2,
-        memory_limit_multiplier=1.35
-    )
+@app.get("/api/admin/profiles/{profile_id}/summary", include_in_schema=False)
+async def profile_summary(request: Request, profile_id: str):
+    """
+    Request, stage breakdown and top functions by cumulative time of a profiled request.
+    """
+    _require_admin(request)
+    path = profile_store.path(profile_id, ".json")
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return FileResponse(path, media_type="application/json")
 
 
-def _calc_frontend_and_querier(DPS: int, ACTIVE_TS: float,
-                                RETENTION: int) -> Tuple[Resources, Resources]:
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
     """
-    Frontend & Querier share hot-window weighted sample count and working_set_scale.
-    Frontend: result-cache heavy, ~1 CPU + scale/3, 1.5 GB + 2× scale RAM.
-    Querier: heavier execution, 2 CPU + 0.7× scale, 2 GB + cardinality + 1.5× scale RAM.
+    Prometheus metrics in text exposition format.
     """
-    # Hot-window weighting
-    hot_weights = [
-        (1,  0.55),   # 1 day  → 55% of queries
-        (2,  0.25),   # +2 days → 25%
-        (4,  0.15),   # +4 days → 15%
-        (23, 0.05),   # remainder up to 30d → 5%
-    ]
-    remaining = min(RETENTION, 30)
-    weighted_days = 0.0
-    for days, weight in hot_weights:
-        if remaining <= 0:
-            break
-        used = min(days, remaining)
-        weighted_days += used * weight
-        remaining -= used
-
-    hot_samples       = DPS * 86400 * weighted_days
-    working_set_scale = 1.3 * (hot_samples / 1e9) ** 0.5
-
-    # Frontend
-    frontend_replicas = max(1, math.ceil(working_set_scale / 3))
-    frontend_cpu      = 1 + (working_set_scale / 3)
-    frontend_ram      = (1.5 + working_set_scale * 2.0) * 1024**3
-
-    frontend_res = create_resources(
-        frontend_cpu,
-        frontend_ram,
-        frontend_replicas,
-        cpu_limit_multiplier=1.1,
-        memory_limit_multiplier=1.4
-    )
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
-    # Querier
-    querier_replicas = max(
-        1,
-        math.ceil(working_set_scale / 2),
-        math.ceil(ACTIVE_TS / 4000000)
-    )
-    querier_cpu = 2 + (working_set_scale * 0.7)
-    querier_ram = (2 + (ACTIVE_TS / 2000000) + (working_set_scale * 1.5)) * 1024**3
-
-    querier_res = create_resources(
-        querier_cpu,
-        querier_ram,
-        querier_replicas,
-        cpu_limit_multiplier=1.2,
-        memory_limit_multiplier=1.45
-    )
 
-    return frontend_res, querier_res
+def _axis_take(axis: Sequence[int], idx: np.ndarray) -> np.ndarray:
+    if isinstance(axis, range):
+        return axis.start + idx * axis.step
+    return np.asarray(axis, dtype=np.int64)[idx]
 
 
-@app.post("/api/calculate/pool_resources", response_model=PoolResources, response_model_exclude_none=True)
-async def calculate_pool(req: PoolRequest):
+def _iter_sweep_chunks(dps_axis: Sequence[int], interval_axis: Sequence[int], retention_axis: Sequence[int],
+                       chunk_size: int = SWEEP_CHUNK_SIZE,
+                       c: Coefficients = DEFAULT_COEFFICIENTS) -> Iterator[Dict[str, Any]]:
     """
-    Orchestrates per-component sizing and assembles the final PoolResources response.
+    Walks the sweep grid in fixed-size chunks (dps varies fastest) and sizes each
+    chunk with the columnar engine, so memory stays flat regardless of grid size.
+    """
+    n_dps, n_ret = len(dps_axis), len(retention_axis)
+    total = n_dps * n_ret * len(interval_axis)
+
+    for chunk_start in range(0, total, chunk_size):
+        idx = np.arange(chunk_start, min(chunk_start + chunk_size, total), dtype=np.int64)
+        rest, dps_idx = np.divmod(idx, n_dps)
+        interval_idx, retention_idx = np.divmod(rest, n_ret)
+        yield engine.size_pool(_axis_take(dps_axis, dps_idx), _axis_take(interval_axis, interval_idx),
+                               _axis_take(retention_axis, retention_idx), coefficients=c)
+
+
+def _iter_sweep_lines(dps_axis: Sequence[int], interval_axis: Sequence[int], retention_axis: Sequence[int],
+                      c: Coefficients = DEFAULT_COEFFICIENTS) -> Iterator[bytes]:
+    for cols in _iter_sweep_chunks(dps_axis, interval_axis, retention_axis, c=c):
+        lines = [
+            to_json({"scrape_interval": s, "retention": r, **record})
+            for s, r, record in zip(cols["scrape_interval"].tolist(), cols["retention"].tolist(),
+                                    engine.iter_pool_resources(cols))
+        ]
+        lines.append(b"")
+        yield b"\n".join(lines)
+
+
+@app.post("/api/calculate/pool_resources/sweep", response_class=StreamingResponse,
+          responses={200: {"content": {"application/x-ndjson": {}, ARROW_STREAM_MEDIA_TYPE: {}},
+                           "description": "One JSON object per grid point: PoolResources plus "
+                                          "the scrape_interval and retention that produced it. "
+                                          f"With Accept: {ARROW_STREAM_MEDIA_TYPE}, an Arrow IPC "
+                                          "stream of flat numeric and string columns instead."},
+                     406: {"description": "Arrow output was requested but pyarrow is not installed"}})
+async def calculate_pool_sweep(req: PoolSweepRequest, request: Request):
     """
-    DPS             = req.dps
-    SCRAPE_INTERVAL = req.scrape_interval
-    ACTIVE_TS       = DPS * SCRAPE_INTERVAL
-    RETENTION       = req.retention
-    RET_RAW_DAYS    = min(30, RETENTION)
-    RET_5M_DAYS     = RET_RAW_DAYS + max(0, math.ceil((RETENTION - RET_RAW_DAYS) / 2))
-    RET_1H_DAYS     = RETENTION
-
-    router_res                = _calc_router(DPS)
-    ingestor_res              = _calc_ingestor(DPS, ACTIVE_TS)
-    total_s3_bytes            = _calc_s3(ACTIVE_TS, SCRAPE_INTERVAL, RET_RAW_DAYS, RET_5M_DAYS, RET_1H_DAYS)
-    compactor_res             = _calc_compactor(DPS, ACTIVE_TS)
-    store_res                 = _calc_store(ACTIVE_TS, total_s3_bytes)
-    frontend_res, querier_res = _calc_frontend_and_querier(DPS, ACTIVE_TS, RETENTION)
-
-    return PoolResources(
-        receiver_router=router_res,
-        query=querier_res,
-        query_frontend=frontend_res,
-        receiver_ingestor=ingestor_res,
-        store=store_res,
-        compactor=compactor_res,
-        s3=format_k8s_resource(total_s3_bytes),
-        dps=DPS,
-        data_retention=DataRetention(
-            raw_data=f"{RET_RAW_DAYS}d",
-            downsample_5m=f"{RET_5M_DAYS}d",
-            downsample_1h=f"{RET_1H_DAYS}d"
+    Sizes every point of a dps x scrape_interval x retention grid and streams the
+    results as NDJSON, one line per point, or as Arrow record batches.
+    """
+    dps_axis = req.dps.as_sequence()
+    interval_axis = req.scrape_interval.as_sequence()
+    retention_axis = req.retention.as_sequence()
+    c = coefficients.resolve(req.coefficients).coefficients
+
+    total = req.dps.size() * req.scrape_interval.size() * req.retention.size()
+    if total > MAX_SWEEP_POINTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Sweep covers {total} points, the maximum is {MAX_SWEEP_POINTS}"
         )
+
+    if ARROW_STREAM_MEDIA_TYPE in request.headers.get("accept", ""):
+        if not export.available():
+            raise HTTPException(status_code=406, detail="Arrow output requires pyarrow on the server")
+        chunks = _iter_sweep_chunks(dps_axis, interval_axis, retention_axis, ARROW_BATCH_SIZE, c)
+        return StreamingResponse(export.iter_arrow_stream(export.flatten(cols) for cols in chunks),
+                                 media_type=ARROW_STREAM_MEDIA_TYPE)
+
+    return StreamingResponse(
+        _iter_sweep_lines(dps_axis, interval_axis, retention_axis, c),
+        media_type="application/x-ndjson"
     )
 
 
-app.mount("/", StaticFiles(directory=".", html=True), name="static")
+static_assets = StaticAssets(directory=os.path.dirname(os.path.abspath(__file__)))
+app.mount("/", static_assets, name="static")
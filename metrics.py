@@ -0,0 +1,254 @@
+"""
+Prometheus metrics and Server-Timing headers.
+
+Requests are counted and timed per endpoint by MetricsMiddleware. Sizing code wraps each
+step in stage(), which feeds a per-stage histogram and the Server-Timing header of the
+current request. Endpoints decorated with timed_handler also get a "serialize" stage:
+the time between the handler returning and the response starting, which is where
+FastAPI validates and serializes the response_model. Sync handlers decorated with it are
+also profiled in their worker thread when the request is profiled (see profiling.py).
+
+Only the standard library is used, so the sizing code can be timed outside the server.
+"""
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from profiling import profile_thread
+
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> (per-bucket counts, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+                label_str = _format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_str} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "thanos_calculator_http_requests_total",
+    "HTTP requests handled, by endpoint and status code.",
+    ("method", "path", "status"),
+))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "thanos_calculator_http_request_duration_seconds",
+    "Time from receiving a request until its response was fully sent, by endpoint.",
+    ("method", "path"),
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "thanos_calculator_stage_duration_seconds",
+    "Time spent in each sizing stage, by order of magnitude of the input DPS.",
+    ("stage", "dps_range"),
+))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def dps_range(dps: Optional[int]) -> str:
+    """Order-of-magnitude bucket for a DPS value, e.g. 16667 -> "1e4"."""
+    if dps is None or dps < 1:
+        return "none"
+    return f"1e{len(str(int(dps))) - 1}"
+
+
+class RequestTimings:
+    """Per-request stage durations, summed by stage name, in insertion order."""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.handler_end: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def header(self, total: float) -> str:
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.durations.items()]
+        parts.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Stage timings of the request being handled, if any."""
+    return _current_timings.get()
+
+
+@contextmanager
+def stage(name: str, dps: Optional[int] = None) -> Iterator[None]:
+    """Times the wrapped block as one sizing stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe((name, dps_range(dps)), elapsed)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+def _mark_handler_end() -> None:
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.handler_end = time.perf_counter()
+
+
+def timed_handler(func: Callable) -> Callable:
+    """
+    Marks when an endpoint returns, so MetricsMiddleware can attribute the time until
+    the response starts to a "serialize" stage. Keeps the signature FastAPI inspects.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _mark_handler_end()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            with profile_thread():
+                return func(*args, **kwargs)
+        finally:
+            _mark_handler_end()
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: counts and times requests per route template and adds a
+    Server-Timing header with the stages recorded while handling the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status[0] = message["status"]
+                if timings.handler_end is not None and "serialize" not in timings.durations:
+                    elapsed = now - timings.handler_end
+                    STAGE_DURATION.observe(("serialize", "none"), elapsed)
+                    timings.add("serialize", elapsed)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(now - start).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "static"
+            REQUEST_DURATION.observe((scope["method"], path), time.perf_counter() - start)
+            REQUESTS.inc((scope["method"], path, str(status[0])))
+            _current_timings.reset(token)
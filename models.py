@@ -1,8 +1,28 @@
-from pydantic import BaseModel, Field
+from typing import Annotated, Any, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+from pydantic import AfterValidator, BaseModel, Field, model_validator
+
+import coefficients
 
 RESOURCE_PATTERN = "^[0-9]+[KMG]i$"
 CPU_PATTERN = "^([0-9]+)m?$"
+BUDGET_PATTERN = "^[0-9]+[KMGT]i$"
 TIME_WINDOW_REGEX = "^[0-9]+[hmdy]$"
+# Largest dps a request may ask for; up to here the int64 math of engine.py cannot overflow,
+# so the columnar and scalar paths agree (verify_engine.py checks the bound).
+MAX_DPS = 10 ** 12
+# Most pods, summed over every pool and component, that a node plan packs one by one.
+MAX_NODE_PLAN_PODS = 100_000
+
+
+def _known_profile(selector: Optional[str]) -> Optional[str]:
+    coefficients.resolve(selector)
+    return selector
+
+
+# Name ("prod-eu") or pinned version ("prod-eu@3") of a loaded coefficient profile.
+CoefficientSelector = Annotated[Optional[str], AfterValidator(_known_profile)]
+COEFFICIENTS_DESCRIPTION = "coefficient profile, as name or name@version; the built-in default when omitted"
 
 
 class BasicResources (BaseModel):
@@ -20,6 +40,9 @@ class ResourcesWithStorage (Resources):
 class DatapointsPerSecond(BaseModel):
     dps: int = Field(..., description="data points per second, in ints", gt=0)
 
+class RequestedDps(DatapointsPerSecond):
+    dps: int = Field(..., description="data points per second, in ints", gt=0, le=MAX_DPS)
+
 class DataRetention (BaseModel):
     raw_data: str = Field(..., description="time to store raw metrics", pattern=TIME_WINDOW_REGEX)
     downsample_5m: str = Field(..., description="time to store 5m downsampling metrics", pattern=TIME_WINDOW_REGEX)
@@ -44,6 +67,61 @@ class CollectorResources (Resources, DatapointsPerSecond):
                 "ephemeral_storage": "512Mi"
             }
         }
+class QueryLoad(BaseModel):
+    qps: float = Field(..., description="range queries per second arriving at the query-frontend", gt=0, le=100000)
+    range_hours: float = Field(24, description="typical time range of a query, in hours", gt=0, le=87600)
+    split_interval_hours: int = Field(24, description="query-frontend split interval, in hours", ge=1, le=720)
+    series_per_query: int = Field(1000, description="series a typical query selects", gt=0, le=10000000)
+    distinct_queries: int = Field(500, description="distinct queries in rotation, e.g. across dashboards",
+                                  gt=0, le=10000000)
+    target_hit_ratio: float = Field(0.8, description="share of split queries to answer from the result cache",
+                                    ge=0, lt=1)
+    cache_backend: Literal["in-memory", "memcached", "redis"] = Field(
+        "in-memory", description="result cache backend: in each query-frontend, or a memcached/redis tier")
+    latency_target_seconds: float = Field(2.0, description="target latency of a query that misses the cache",
+                                          gt=0, le=600)
+    max_concurrent: int = Field(20, description="querier --query.max-concurrent", ge=1, le=1000)
+
+    class Config:
+        frozen = True
+        json_schema_extra = {
+            "example": {
+                "qps": 50,
+                "range_hours": 24,
+                "split_interval_hours": 24,
+                "series_per_query": 1000,
+                "distinct_queries": 500,
+                "target_hit_ratio": 0.8,
+                "cache_backend": "memcached",
+                "latency_target_seconds": 2.0,
+                "max_concurrent": 20
+            }
+        }
+
+
+class ResultCache(BaseModel):
+    backend: str = Field(..., description="in-memory, memcached or redis")
+    size: str = Field(..., description="cache capacity; per query-frontend replica for in-memory",
+                      pattern=RESOURCE_PATTERN)
+    entries: int = Field(..., description="split query results the cache holds", ge=0)
+    entry_size: str = Field(..., description="size of one cached split query result", pattern=RESOURCE_PATTERN)
+    resources: Optional[Resources] = Field(None, description="memcached/redis tier; absent for in-memory")
+
+
+class QueryTuning(BaseModel):
+    split_interval: str = Field(..., description="query-frontend split interval", pattern=TIME_WINDOW_REGEX)
+    splits_per_query: int = Field(..., description="split queries per query", gt=0)
+    split_queries_per_second: float = Field(..., description="split queries per second at the query-frontend")
+    querier_queries_per_second: float = Field(..., description="split queries per second that miss the cache")
+    cache_hit_ratio: float = Field(..., description="expected share of split queries answered from cache")
+    result_cache: ResultCache
+    querier_max_concurrent: int = Field(..., description="--query.max-concurrent per querier replica", gt=0)
+    estimated_latency_seconds: float = Field(..., description="expected latency of a query that misses the cache, "
+                                                              "queueing included")
+    latency_target_met: bool
+    notes: List[str] = Field(default_factory=list)
+
+
 class PoolResources (DatapointsPerSecond):
     query: Resources
     query_frontend: Resources
@@ -53,6 +131,8 @@ class PoolResources (DatapointsPerSecond):
     compactor: ResourcesWithStorage
     s3: str = Field(..., description="S3 size in Ki/Mi/Gi", pattern=RESOURCE_PATTERN)
     data_retention: DataRetention
+    query_tuning: Optional[QueryTuning] = Field(None, description="query path sizing; present when the "
+                                                                  "request describes its query load")
 
     class Config:
         json_schema_extra = {
@@ -135,7 +215,7 @@ class PoolResources (DatapointsPerSecond):
             }
         }
 
-class CollectorRequest(DatapointsPerSecond):
+class CollectorRequest(RequestedDps):
     class Config:
         json_schema_extra = {
             "example": {
@@ -144,9 +224,11 @@ class CollectorRequest(DatapointsPerSecond):
         }
 
 
-class PoolRequest(DatapointsPerSecond):
+class PoolQueryParams(RequestedDps):
+    """PoolRequest fields that fit in a query string, for the GET endpoint."""
     scrape_interval: int = Field(..., description="Scrape interval in seconds", gt=0, le=300)
     retention: int = Field(..., description="Retention in days", gt=0, le=3650)
+    coefficients: CoefficientSelector = Field(None, description=COEFFICIENTS_DESCRIPTION)
 
     class Config:
         json_schema_extra = {
@@ -155,4 +237,608 @@ class PoolRequest(DatapointsPerSecond):
                 "scrape_interval": 60,
                 "retention": 14
             }
-        }
\ No newline at end of file
+        }
+
+
+class PoolRequest(PoolQueryParams):
+    query: Optional[QueryLoad] = Field(None, description="query load; sizes the result cache and the "
+                                                         "query path for it when given")
+
+
+class PoolBatchError(BaseModel):
+    index: int = Field(..., description="position of the rejected item in the batch", ge=0)
+    errors: List[Dict[str, Any]] = Field(..., description="pydantic validation errors for the item")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "index": 3,
+                "errors": [
+                    {
+                        "type": "less_than_equal",
+                        "loc": ["scrape_interval"],
+                        "msg": "Input should be less than or equal to 300",
+                        "input": 600
+                    }
+                ]
+            }
+        }
+
+
+class SweepAxis(BaseModel):
+    values: Optional[List[int]] = Field(None, description="explicit values to sweep", min_length=1)
+    start: Optional[int] = Field(None, description="first value of the range")
+    stop: Optional[int] = Field(None, description="last value of the range, inclusive")
+    step: int = Field(1, description="distance between range values", gt=0)
+
+    @model_validator(mode="after")
+    def check_shape(self):
+        has_range = self.start is not None or self.stop is not None
+        if (self.values is None) == (not has_range):
+            raise ValueError("give either 'values' or 'start'/'stop'/'step'")
+        if has_range:
+            if self.start is None or self.stop is None:
+                raise ValueError("a range needs both 'start' and 'stop'")
+            if self.stop < self.start:
+                raise ValueError("'stop' must be >= 'start'")
+        return self
+
+    def as_sequence(self) -> Sequence[int]:
+        """Returns the axis as a lazy range, or the explicit value list."""
+        if self.values is not None:
+            return self.values
+        return range(self.start, self.stop + 1, self.step)
+
+    def bounds(self) -> Tuple[int, int]:
+        if self.values is not None:
+            return min(self.values), max(self.values)
+        return self.start, self.stop - (self.stop - self.start) % self.step
+
+    def size(self) -> int:
+        """Number of points on the axis, computed without materializing the range."""
+        if self.values is not None:
+            return len(self.values)
+        return (self.stop - self.start) // self.step + 1
+
+
+class PoolSweepRequest(BaseModel):
+    dps: SweepAxis
+    scrape_interval: SweepAxis
+    retention: SweepAxis
+    coefficients: CoefficientSelector = Field(None, description=COEFFICIENTS_DESCRIPTION)
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        # Same limits as PoolRequest, applied to every point of each axis.
+        limits = {"dps": (1, MAX_DPS), "scrape_interval": (1, 300), "retention": (1, 3650)}
+        for name, (low, high) in limits.items():
+            axis_min, axis_max = getattr(self, name).bounds()
+            if axis_min < low or axis_max > high:
+                raise ValueError(f"every {name} value must be >= {low} and <= {high}")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "dps": {"start": 1000, "stop": 100000, "step": 1000},
+                "scrape_interval": {"values": [30, 60]},
+                "retention": {"values": [14]}
+            }
+        }
+
+
+class CacheStats(BaseModel):
+    size: int = Field(..., description="entries currently cached")
+    maxsize: int = Field(..., description="maximum number of entries, 0 disables the cache")
+    ttl: float = Field(..., description="entry lifetime in seconds, 0 means no expiry")
+    hits: int
+    misses: int
+    evictions: int = Field(..., description="entries dropped to stay within maxsize")
+    expirations: int = Field(..., description="entries dropped because their ttl passed")
+    hit_rate: float = Field(..., description="hits / (hits + misses)")
+
+
+class SizingCacheStats(BaseModel):
+    pool: CacheStats
+    collector: CacheStats
+
+
+class ProjectionRequest(BaseModel):
+    pool: PoolRequest
+    monthly_growth_rate: float = Field(..., description="compound monthly DPS growth, e.g. 0.05 for 5%",
+                                       gt=-1, le=10)
+    horizon_months: int = Field(..., description="number of months to project", gt=0, le=120)
+    change_points_only: Optional[bool] = Field(
+        None, description="return only month 0, the last month and months with crossings; "
+                          "defaults to true for horizons over 12 months")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "pool": {
+                    "dps": 16667,
+                    "scrape_interval": 60,
+                    "retention": 180
+                },
+                "monthly_growth_rate": 0.05,
+                "horizon_months": 36
+            }
+        }
+
+
+class ThresholdCrossing(BaseModel):
+    field: str = Field(..., description="dotted PoolResources path, e.g. receiver_ingestor.replicas")
+    previous: Union[int, str]
+    current: Union[int, str]
+    threshold: Optional[str] = Field(None, description="power-of-two size tier crossed, for storage fields")
+
+
+class ProjectionPoint(BaseModel):
+    month: int = Field(..., ge=0)
+    dps: int = Field(..., gt=0)
+    crossings: List[ThresholdCrossing] = Field(..., description="thresholds crossed since the previous month")
+    resources: PoolResources
+
+
+class PoolProjection(BaseModel):
+    monthly_growth_rate: float
+    horizon_months: int
+    change_points_only: bool
+    points: List[ProjectionPoint]
+
+
+class ResourceBudget(BaseModel):
+    cpu: Optional[str] = Field(None, description="total CPU requests in cores/millicores", pattern=CPU_PATTERN)
+    memory: Optional[str] = Field(None, description="total memory requests in Ki/Mi/Gi/Ti", pattern=BUDGET_PATTERN)
+    pvc: Optional[str] = Field(None, description="total PVC storage in Ki/Mi/Gi/Ti", pattern=BUDGET_PATTERN)
+    s3: Optional[str] = Field(None, description="S3 size in Ki/Mi/Gi/Ti", pattern=BUDGET_PATTERN)
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        if self.cpu is None and self.memory is None and self.pvc is None and self.s3 is None:
+            raise ValueError("at least one of cpu, memory, pvc or s3 must be set")
+        return self
+
+
+class MaxDpsRequest(BaseModel):
+    scrape_interval: int = Field(..., description="Scrape interval in seconds", gt=0, le=300)
+    retention: int = Field(..., description="Retention in days", gt=0, le=3650)
+    budget: ResourceBudget
+    coefficients: CoefficientSelector = Field(None, description=COEFFICIENTS_DESCRIPTION)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "scrape_interval": 60,
+                "retention": 180,
+                "budget": {
+                    "cpu": "64",
+                    "memory": "256Gi",
+                    "pvc": "2Ti",
+                    "s3": "10Ti"
+                }
+            }
+        }
+
+
+class ResourceTotals(BaseModel):
+    cpu: str = Field(..., description="sum of CPU requests × replicas", pattern=CPU_PATTERN)
+    memory: str = Field(..., description="sum of memory requests × replicas", pattern=RESOURCE_PATTERN)
+    pvc: str = Field(..., description="sum of PVC storage × replicas", pattern=RESOURCE_PATTERN)
+    s3: str = Field(..., description="S3 size", pattern=RESOURCE_PATTERN)
+
+
+class MaxDps(BaseModel):
+    dps: int = Field(..., description="largest dps whose pool fits the budget", gt=0)
+    scrape_interval: int
+    retention: int
+    limiting_resource: Optional[str] = Field(
+        None, description="budget entry exceeded at dps + 1; null when the search cap was reached")
+    limiting_component: Optional[str] = Field(
+        None, description="PoolResources field contributing most to the limiting resource at dps + 1")
+    usage: ResourceTotals = Field(..., description="pool totals at dps")
+    resources: PoolResources
+
+
+class StoreShardRequest(BaseModel):
+    pool: PoolRequest
+    max_memory_per_shard: str = Field("32Gi", description="largest memory request of one store shard",
+                                      pattern=BUDGET_PATTERN)
+    max_index_load_seconds: float = Field(120, description="longest index-header load of one shard at startup",
+                                          gt=0)
+    replicas_per_shard: int = Field(1, description="store replicas serving each shard", ge=1, le=5)
+    max_shards_per_tier: int = Field(64, description="upper bound of hash shards in one time tier", ge=1, le=1024)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "pool": {"dps": 500000, "scrape_interval": 30, "retention": 395},
+                "max_memory_per_shard": "32Gi",
+                "max_index_load_seconds": 120,
+                "replicas_per_shard": 2
+            }
+        }
+
+
+class StoreTier(BaseModel):
+    name: str = Field(..., description="raw, 5m or 1h: the finest resolution the tier still holds")
+    resolutions: List[str] = Field(..., description="block resolutions stored in the tier's time range")
+    min_time: str = Field(..., description="store --min-time, relative to now")
+    max_time: Optional[str] = Field(None, description="store --max-time, relative to now; null means now")
+    blocks: int = Field(..., description="compacted blocks in the tier", ge=0)
+    s3: str = Field(..., description="bucket bytes in the tier's time range", pattern=RESOURCE_PATTERN)
+    shards: int = Field(..., description="hash shards over __block_id within the tier", gt=0)
+    limited_by: Optional[str] = Field(None, description="memory or index_load when max_shards_per_tier could "
+                                                        "not meet that bound; null otherwise")
+    shard: ResourcesWithStorage = Field(..., description="resources of one shard; replicas per shard")
+    index_header_size: str = Field(..., description="index-header bytes one shard loads", pattern=RESOURCE_PATTERN)
+    index_load_seconds: float = Field(..., description="estimated index-header load time of one shard")
+
+
+class StoreShardPlan(BaseModel):
+    unsharded: ResourcesWithStorage = Field(..., description="the single store gateway of the pool sizing")
+    unsharded_index_load_seconds: float
+    tiers: List[StoreTier]
+    total_replicas: int
+    totals: ResourceTotals
+    restart_seconds: float = Field(..., description="slowest shard's index-header load: the tier's restart "
+                                                    "time when shards restart in parallel")
+    notes: List[str] = Field(default_factory=list)
+
+
+class CompactorShardRequest(BaseModel):
+    pool: PoolRequest
+    compact_concurrency: int = Field(1, description="--compact.concurrency of each compactor", ge=1, le=64)
+    downsample_concurrency: int = Field(1, description="--downsample.concurrency of each compactor", ge=1, le=64)
+    max_utilization: float = Field(0.5, description="share of each day a compactor may spend compacting and "
+                                                    "downsampling; the rest absorbs catch-up after outages",
+                                   gt=0, le=1)
+    max_compaction_hours: float = Field(24, description="longest a single block's compaction or downsampling "
+                                                        "may take; concurrency cannot split one block", gt=0)
+    max_shards: int = Field(64, description="upper bound of compactor shards", ge=1, le=1024)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "pool": {"dps": 3000000, "scrape_interval": 30, "retention": 730},
+                "compact_concurrency": 2,
+                "downsample_concurrency": 2,
+                "max_utilization": 0.5
+            }
+        }
+
+
+class CompactionStep(BaseModel):
+    name: str = Field(..., description="compaction level (2h-8h, 8h-2d, 2d-14d) or downsampling pass "
+                                       "(downsample-5m, downsample-1h)")
+    blocks_per_day: float = Field(..., description="blocks one shard produces per day at this step")
+    block_size: str = Field(..., description="bytes one shard reads per block at this step", pattern=RESOURCE_PATTERN)
+    seconds_per_block: float = Field(..., description="time of one block on one concurrency slot")
+    blocks_per_hour: float = Field(..., description="throughput of one shard at its configured concurrency")
+    busy_hours_per_day: float = Field(..., description="hours per day one shard spends on this step")
+
+
+class CompactorShardPlan(BaseModel):
+    unsharded: ResourcesWithStorage = Field(..., description="the single compactor of the pool sizing")
+    unsharded_utilization: float = Field(..., description="busy share of the day of the single compactor at "
+                                                          "the requested concurrency")
+    shards: int = Field(..., description="relabel- or tenant-sharded compactor instances", gt=0)
+    limited_by: Optional[str] = Field(None, description="utilization or compaction_time when max_shards could "
+                                                        "not meet that bound; null otherwise")
+    shard: ResourcesWithStorage = Field(..., description="resources of one shard")
+    steps: List[CompactionStep] = Field(..., description="per-shard work of each compaction level and "
+                                                         "downsampling pass")
+    utilization: float = Field(..., description="busy share of the day of one shard")
+    longest_compaction_hours: float = Field(..., description="time of the shard's slowest single block")
+    largest_block_size: str = Field(..., description="bytes of the largest (14d) block of one shard",
+                                    pattern=RESOURCE_PATTERN)
+    totals: ResourceTotals
+    notes: List[str] = Field(default_factory=list)
+
+
+class TenantLoad(BaseModel):
+    name: str = Field(..., description="tenant ID as sent in the THANOS-TENANT header", min_length=1)
+    dps: int = Field(..., description="data points per second, in ints", gt=0, le=MAX_DPS)
+    scrape_interval: int = Field(..., description="Scrape interval in seconds", gt=0, le=300)
+
+
+class HashringRequest(BaseModel):
+    tenants: List[TenantLoad] = Field(..., min_length=1, max_length=100000)
+    replication_factor: int = Field(3, description="ingestor replicas each series is written to", gt=0, le=7)
+    coefficients: CoefficientSelector = Field(None, description=COEFFICIENTS_DESCRIPTION)
+
+    @model_validator(mode="after")
+    def check_unique_names(self):
+        names = set()
+        for tenant in self.tenants:
+            if tenant.name in names:
+                raise ValueError(f"duplicate tenant name: {tenant.name}")
+            names.add(tenant.name)
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "tenants": [
+                    {"name": "team-a", "dps": 120000, "scrape_interval": 60},
+                    {"name": "team-b", "dps": 1667, "scrape_interval": 30},
+                    {"name": "team-c", "dps": 500, "scrape_interval": 15}
+                ],
+                "replication_factor": 3
+            }
+        }
+
+
+class HashringReplica(BaseModel):
+    replica: int = Field(..., description="ingestor replica index", ge=0)
+    series: int = Field(..., description="active series held, including replicated copies", ge=0)
+    dps: int = Field(..., description="data points per second written, including replicated copies", ge=0)
+    tenants: List[str] = Field(..., description="tenants with at least one shard on this replica")
+    requests: BasicResources
+    limits: BasicResources
+    storage: str = Field(..., description="storage of PVC in Ki/Mi/Gi", pattern=RESOURCE_PATTERN)
+
+
+class HashringSkew(BaseModel):
+    min_series: int
+    max_series: int
+    mean_series: float
+    stddev_series: float
+    max_to_mean: float = Field(..., description="max_series / mean_series; 1.0 is a perfectly even ring")
+
+
+class HashringPlan(BaseModel):
+    replication_factor: int
+    total_series: int = Field(..., description="active series before replication")
+    split_tenants: int = Field(..., description="tenants larger than one replica, split into several shards")
+    min_replicas: int = Field(..., description="lower bound: replicated series / series cap per replica")
+    replicas: List[HashringReplica]
+    skew: HashringSkew
+
+
+class NodeShape(BaseModel):
+    name: str = Field(..., description="instance type, e.g. m6i.4xlarge", min_length=1)
+    cpu: str = Field(..., description="allocatable CPU in cores/millicores", pattern=CPU_PATTERN)
+    memory: str = Field(..., description="allocatable memory in Ki/Mi/Gi/Ti", pattern=BUDGET_PATTERN)
+    overhead_cpu: str = Field("0", description="CPU reserved per node for daemonsets and system pods",
+                              pattern=CPU_PATTERN)
+    overhead_memory: str = Field("0Ki", description="memory reserved per node for daemonsets and system pods",
+                                 pattern=BUDGET_PATTERN)
+
+
+class NodePlanRequest(BaseModel):
+    pools: List[PoolResources] = Field(..., min_length=1, max_length=10000)
+    nodes: List[NodeShape] = Field(..., description="node shapes to plan for, each independently", min_length=1,
+                                   max_length=100)
+
+    @model_validator(mode="after")
+    def check_pods(self):
+        pods = sum(value.replicas for pool in self.pools for _, value in pool if isinstance(value, Resources))
+        if pods > MAX_NODE_PLAN_PODS:
+            raise ValueError(f"pools have {pods} pods in total, the maximum is {MAX_NODE_PLAN_PODS}")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "pools": [{"dps": 1667, **PoolResources.model_config["json_schema_extra"]["example"]}],
+                "nodes": [
+                    {"name": "m6i.2xlarge", "cpu": "8", "memory": "32Gi", "overhead_cpu": "500m",
+                     "overhead_memory": "2Gi"},
+                    {"name": "r6i.4xlarge", "cpu": "16", "memory": "128Gi", "overhead_cpu": "500m",
+                     "overhead_memory": "2Gi"}
+                ]
+            }
+        }
+
+
+class UnschedulablePods(BaseModel):
+    pool: int = Field(..., description="index of the pool in the request", ge=0)
+    component: str
+    replicas: int = Field(..., description="replicas that could not be placed", gt=0)
+
+
+class NodeTypePlan(BaseModel):
+    name: str
+    nodes: int = Field(..., description="nodes needed for every schedulable pod", ge=0)
+    pods: int = Field(..., description="pods placed", ge=0)
+    cpu_requested: str = Field(..., pattern=CPU_PATTERN)
+    memory_requested: str = Field(..., pattern=RESOURCE_PATTERN)
+    cpu_utilization: float = Field(..., description="requested / allocatable CPU over all nodes", ge=0, le=1)
+    memory_utilization: float = Field(..., description="requested / allocatable memory over all nodes", ge=0, le=1)
+    unschedulable: List[UnschedulablePods] = Field(..., description="pods larger than one empty node")
+
+
+class NodePlan(BaseModel):
+    recommended: Optional[str] = Field(
+        None, description="node shape with the fewest nodes that fits every pod; null if none does")
+    plans: List[NodeTypePlan]
+
+
+class Distribution(BaseModel):
+    kind: Literal["normal", "lognormal", "empirical"]
+    mean: Optional[float] = Field(None, description="mean, for normal and lognormal", gt=0, le=MAX_DPS,
+                                  allow_inf_nan=False)
+    stddev: Optional[float] = Field(None, description="standard deviation, for normal and lognormal", ge=0,
+                                    le=MAX_DPS, allow_inf_nan=False)
+    samples: Optional[List[Annotated[float, Field(ge=-MAX_DPS, le=MAX_DPS, allow_inf_nan=False)]]] = Field(
+        None, description="observed values to resample, for empirical", min_length=1, max_length=100000)
+
+    @model_validator(mode="after")
+    def check_parameters(self):
+        if self.kind == "empirical":
+            if self.samples is None:
+                raise ValueError("empirical distributions need samples")
+        elif self.mean is None or self.stddev is None:
+            raise ValueError(f"{self.kind} distributions need mean and stddev")
+        return self
+
+
+class MonteCarloRequest(BaseModel):
+    scrape_interval: int = Field(..., description="Scrape interval in seconds", gt=0, le=300)
+    retention: int = Field(..., description="Retention in days", gt=0, le=3650)
+    dps: Distribution = Field(..., description="data points per second; draws are rounded up to ints >= 1")
+    churn: Optional[Distribution] = Field(
+        None, description="extra active series from churn, as a fraction of dps * scrape_interval; "
+                          "draws below 0 count as 0")
+    samples: int = Field(10000, description="number of draws", gt=0, le=100000)
+    seed: Optional[int] = Field(None, description="random seed, for reproducible results", ge=0)
+    coefficients: CoefficientSelector = Field(None, description=COEFFICIENTS_DESCRIPTION)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "scrape_interval": 60,
+                "retention": 180,
+                "dps": {"kind": "lognormal", "mean": 16667, "stddev": 4000},
+                "churn": {"kind": "normal", "mean": 0.2, "stddev": 0.05},
+                "samples": 10000,
+                "seed": 42
+            }
+        }
+
+
+class MonteCarloPercentiles(BaseModel):
+    p50: PoolResources
+    p90: PoolResources
+    p99: PoolResources
+
+
+class MonteCarloResult(BaseModel):
+    samples: int
+    percentiles: MonteCarloPercentiles = Field(
+        ..., description="each field is a percentile of its own, so a percentile is not one coherent scenario")
+
+
+class AutoscalingRequest(BaseModel):
+    dps: List[int] = Field(..., description="data points per second of each hourly bucket: 24 for one day, or "
+                                            "168 for a week", min_length=24, max_length=168)
+    scrape_interval: int = Field(..., description="Scrape interval in seconds", gt=0, le=300)
+    retention: int = Field(..., description="Retention in days", gt=0, le=3650)
+    qps: Optional[List[Annotated[float, Field(gt=0, le=100000, allow_inf_nan=False)]]] = Field(
+        None, description="range queries per second of each hourly bucket, one per dps bucket")
+    query: Optional[QueryLoad] = Field(None, description="query load shape; its qps is replaced by each "
+                                                         "bucket's qps when a qps curve is given")
+    max_cpu_utilization: int = Field(80, description="highest HPA CPU target to recommend, in percent",
+                                     ge=10, le=100)
+    scale_up_minutes: float = Field(5, description="time from a CPU rise to new ready pods: metrics "
+                                                   "window, HPA sync and pod startup", gt=0, le=60)
+    coefficients: CoefficientSelector = Field(None, description=COEFFICIENTS_DESCRIPTION)
+
+    @model_validator(mode="after")
+    def check_curves(self):
+        if len(self.dps) not in (24, 168):
+            raise ValueError("dps must have 24 (one day) or 168 (one week) hourly buckets")
+        # Same limits as PoolRequest, applied to every bucket.
+        if min(self.dps) < 1 or max(self.dps) > MAX_DPS:
+            raise ValueError(f"every dps value must be >= 1 and <= {MAX_DPS}")
+        if self.qps is not None:
+            if len(self.qps) != len(self.dps):
+                raise ValueError("qps must have one value per dps bucket")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "dps": [25000] * 6 + [50000, 75000] + [100000] * 10 + [75000, 50000] + [25000] * 4,
+                "scrape_interval": 30,
+                "retention": 90,
+                "qps": [5] * 8 + [40] * 10 + [5] * 6,
+                "query": {"qps": 40, "range_hours": 24, "cache_backend": "memcached"},
+                "max_cpu_utilization": 80,
+                "scale_up_minutes": 5
+            }
+        }
+
+
+class AutoscaledComponent(BaseModel):
+    pod: Resources = Field(..., description="per-pod requests and limits of the HPA's target; replicas is "
+                                            "max_replicas")
+    min_replicas: int = Field(..., gt=0)
+    max_replicas: int = Field(..., gt=0)
+    target_cpu_utilization: int = Field(..., description="HPA averageUtilization of CPU, in percent")
+    replicas: List[int] = Field(..., description="replicas needed in each hourly bucket")
+    reclaimable: BasicResources = Field(..., description="requests freed on average by scaling in, compared "
+                                                         "with max_replicas around the clock")
+    reclaimable_share: float = Field(..., description="share of the always-at-peak requests freed")
+
+
+class AutoscalingPlan(BaseModel):
+    buckets: int = Field(..., description="hourly buckets in the curve: 24 or 168")
+    peak_bucket: int = Field(..., description="bucket with the highest dps", ge=0)
+    receiver_router: AutoscaledComponent
+    query: AutoscaledComponent
+    query_frontend: AutoscaledComponent
+    reclaimable: BasicResources = Field(..., description="average requests freed across the three components")
+    reclaimable_share: float = Field(..., description="share of the always-at-peak CPU requests freed")
+    notes: List[str] = Field(default_factory=list)
+
+
+class FleetCluster(BaseModel):
+    name: str = Field(..., description="cluster name, unique within the request", min_length=1)
+    pool: PoolRequest = Field(..., description="the cluster's load; its recommendation is compared with current")
+    current: PoolResources = Field(..., description="what the cluster runs today, in the PoolResources shape")
+
+
+class FleetDiffRequest(BaseModel):
+    clusters: List[FleetCluster] = Field(..., min_length=1, max_length=10000)
+    tolerance: float = Field(0.1, description="relative difference of a component's total CPU, memory or PVC "
+                                              "requests that still counts as right-sized", ge=0, le=10)
+    max_entries: Optional[int] = Field(None, description="return only this many of the highest-ranked "
+                                                         "components; the counts and totals cover all", ge=1)
+
+    @model_validator(mode="after")
+    def check_unique_names(self):
+        names = set()
+        for cluster in self.clusters:
+            if cluster.name in names:
+                raise ValueError(f"duplicate cluster name: {cluster.name}")
+            names.add(cluster.name)
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "clusters": [
+                    {
+                        "name": "prod-eu-1",
+                        "pool": {"dps": 1667, "scrape_interval": 60, "retention": 14},
+                        "current": {"dps": 1667, **PoolResources.model_config["json_schema_extra"]["example"]}
+                    }
+                ],
+                "tolerance": 0.1
+            }
+        }
+
+
+class FleetDiffEntry(BaseModel):
+    cluster: str
+    component: str
+    direction: Literal["over", "under", "mixed"] = Field(..., description="over: more than recommended, "
+                                                                          "under: less, mixed: both")
+    deviation: float = Field(..., description="largest relative difference of total CPU, memory or PVC "
+                                              "requests; the list is ranked by it")
+    current_replicas: int
+    recommended_replicas: int
+    recommended: BasicResources = Field(..., description="recommended per-pod requests")
+    recommended_storage: Optional[str] = Field(None, description="recommended per-pod PVC",
+                                               pattern=RESOURCE_PATTERN)
+    cpu_delta: float = Field(..., description="current minus recommended CPU requests over all replicas, in "
+                                              "cores; positive is over-provisioned")
+    memory_delta: int = Field(..., description="current minus recommended memory requests over all replicas, "
+                                               "in bytes")
+    cpu_limit_delta: float = Field(..., description="the same for CPU limits, in cores")
+    memory_limit_delta: int = Field(..., description="the same for memory limits, in bytes")
+    storage_delta: Optional[int] = Field(None, description="current minus recommended PVC over all "
+                                                           "replicas, in bytes")
+
+
+class FleetDiff(BaseModel):
+    clusters: int
+    components: int = Field(..., description="components compared")
+    flagged: int = Field(..., description="components outside the tolerance")
+    excess: BasicResources = Field(..., description="CPU and memory requested beyond the recommendation, "
+                                                    "summed over the flagged components")
+    shortfall: BasicResources = Field(..., description="CPU and memory requested short of the recommendation, "
+                                                       "summed over the flagged components")
+    entries: List[FleetDiffEntry] = Field(..., description="flagged components, by deviation descending")
@@ -0,0 +1,259 @@
+"""
+Opt-in per-request profiling for production.
+
+A calculator request sent with `?profile=1` or an `X-Profile: 1` header, and with an
+`X-Admin-Token` matching PROFILE_TOKEN, runs under cProfile. The profile covers request
+parsing and validation, the handler body, the sizing stages and serialization. The
+normal response is returned unchanged, plus an X-Profile-Id header. The profile is stored
+in PROFILE_DIR as a pstats dump, next to a JSON summary holding the request's stage
+breakdown and its top functions. Only the newest PROFILE_KEEP profiles are kept.
+
+    curl -H "X-Admin-Token: $PROFILE_TOKEN" "localhost:8000/api/calculate/pool_resources?profile=1&dps=..."
+    curl -H "X-Admin-Token: $PROFILE_TOKEN" -o pool.prof localhost:8000/api/admin/profiles/<id>
+    snakeviz pool.prof    # or: python -m pstats pool.prof, flameprof, gprof2dot
+
+Profiling is disabled unless PROFILE_TOKEN is set, and profiles one request at a time.
+Other requests are refused with 429 while a profile is running. cProfile records
+everything that runs on the profiled threads, so work that other requests do on the
+event loop at the same time can show up in the profile.
+
+Only the standard library is used, like metrics.py, which imports this module.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs
+
+PROFILED_PREFIXES = ("/api/calculate/", "/api/plan/")
+TOP_FUNCTIONS = 25
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+# From 3.12, cProfile is built on sys.monitoring and sees every thread; before that it
+# only sees the thread that enabled it.
+_PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class ProfileSession:
+    """cProfile profiles of one request: the event loop thread plus any worker threads."""
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def stats(self) -> pstats.Stats:
+        """Merged stats of every profile that recorded anything; pstats rejects empty ones."""
+        recorded = []
+        for profile in self.profiles:
+            profile.create_stats()
+            if profile.stats:
+                recorded.append(profile)
+        return pstats.Stats(*recorded)
+
+
+_current_session: ContextVar[Optional[ProfileSession]] = ContextVar("current_profile_session", default=None)
+
+
+def active() -> bool:
+    """True while the current request is being profiled."""
+    return _current_session.get() is not None
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """
+    Profiles the wrapped block when it runs in a worker thread of a profiled request.
+    Sync handlers run in FastAPI's threadpool, which the event loop profile cannot see.
+    """
+    session = _current_session.get()
+    if session is None or _PROFILES_ALL_THREADS:
+        yield
+        return
+    profile = session.start()
+    try:
+        yield
+    finally:
+        profile.disable()
+
+
+def _summary(stats: pstats.Stats) -> List[Dict[str, Any]]:
+    """The TOP_FUNCTIONS functions with the highest cumulative time."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime_ms": tottime * 1000,
+            "cumtime_ms": cumtime * 1000,
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+class ProfileStore:
+    """
+    Settings and storage of request profiles. token=None disables profiling.
+    """
+
+    def __init__(self, token: Optional[str], directory: str, keep: int = 20):
+        if keep < 1:
+            raise ValueError(f"keep must be >= 1, got {keep}")
+        self.token = token
+        self.directory = directory
+        self.keep = keep
+        self._running = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ProfileStore":
+        """Reads PROFILE_TOKEN, PROFILE_DIR and PROFILE_KEEP from the environment."""
+        return cls(
+            token=os.getenv("PROFILE_TOKEN") or None,
+            directory=os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "thanos-calculator-profiles"),
+            keep=int(os.getenv("PROFILE_KEEP", 20)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None
+
+    def authorized(self, token: Optional[str]) -> bool:
+        if self.token is None or token is None:
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def path(self, profile_id: str, suffix: str = ".prof") -> Optional[str]:
+        """Path of a stored profile file, or None when the id is malformed or unknown."""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + suffix)
+        return path if os.path.exists(path) else None
+
+    def save(self, profile_id: str, session: ProfileSession, info: Dict[str, Any]) -> None:
+        """Writes the pstats dump and JSON summary, then drops the oldest profiles."""
+        os.makedirs(self.directory, exist_ok=True)
+        stats = session.stats()
+        stats.dump_stats(os.path.join(self.directory, profile_id + ".prof"))
+        with open(os.path.join(self.directory, profile_id + ".json"), "w") as f:
+            json.dump({**info, "id": profile_id, "top": _summary(stats)}, f, indent=2)
+
+        stored = sorted(
+            (name for name in os.listdir(self.directory)
+             if name.endswith(".prof") and PROFILE_ID_PATTERN.match(name[:-5])),
+            key=lambda name: os.path.getmtime(os.path.join(self.directory, name)),
+        )
+        for name in stored[:-self.keep]:
+            for suffix in (".prof", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name[:-5] + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile" and value.strip() in (b"1", b"true"):
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[-1] in ("1", "true")
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _refuse(send, status: int, detail: str) -> None:
+    """Sends a FastAPI-style {"detail": ...} error response."""
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode("latin-1"))]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware that profiles calculator requests asking for it. Runs inside
+    MetricsMiddleware; timings returns that request's RequestTimings, whose stages go
+    into the profile summary.
+    """
+
+    def __init__(self, app, store: ProfileStore, timings: Callable[[], Any] = lambda: None):
+        self.app = app
+        self.store = store
+        self.timings = timings
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not self.store.enabled
+                or not scope["path"].startswith(PROFILED_PREFIXES) or not _requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.store.authorized(_header(scope, b"x-admin-token")):
+            await _refuse(send, 403, "Profiling requires a valid X-Admin-Token")
+            return
+        if not self.store._running.acquire(blocking=False):
+            await _refuse(send, 429, "Another request is being profiled")
+            return
+
+        profile_id = f"{int(time.time())}-{secrets.token_hex(4)}"
+        session = ProfileSession()
+        token = _current_session.set(session)
+        timings = self.timings()
+        start = time.perf_counter()
+        status = [500]
+        saved = [False]
+
+        def finish() -> None:
+            loop_profile.disable()
+            if saved[0]:
+                return
+            saved[0] = True
+            self.store.save(profile_id, session, {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status[0],
+                "total_ms": (time.perf_counter() - start) * 1000,
+                "stages_ms": {name: seconds * 1000 for name, seconds in timings.durations.items()}
+                if timings is not None else {},
+            })
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Store the profile before the last body chunk goes out, so a client can
+                # fetch it as soon as it has read the response.
+                finish()
+            await send(message)
+
+        loop_profile = session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _current_session.reset(token)
+            self.store._running.release()
@@ -0,0 +1,67 @@
+"""
+Production server entry point.
+
+Runs main:app under uvicorn, using uvloop and httptools when they are installed (both
+come with uvicorn[standard]). Settings are read from the environment, and command-line
+flags override them:
+
+    python serve.py                       # WEB_CONCURRENCY workers (default 1) on HOST:PORT
+    python serve.py --workers 4 --port 8080
+
+Metrics (/metrics) and cache counters (/api/cache/stats) live in each worker process
+and are not aggregated, so with several workers every scrape sees one random worker:
+counters appear to reset and jump. Run one worker per container and scale out with
+replicas when those endpoints matter.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+from typing import List, Optional
+
+import uvicorn
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="worker processes; defaults to WEB_CONCURRENCY or 1. Metrics and cache "
+                             "stats are per worker")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("BACKLOG", "2048")),
+                        help="listen socket backlog")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEP_ALIVE", "5")),
+                        help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--access-log", action="store_true", default=os.getenv("ACCESS_LOG", "0") == "1",
+                        help="log every request (off by default; /metrics counts requests)")
+    args = parser.parse_args(argv)
+
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    print(f"Starting {args.workers} workers on {args.host}:{args.port} (loop={loop}, http={http})",
+          file=sys.stderr)
+    if args.workers > 1:
+        print("Note: /metrics and /api/cache/stats report one worker per request, not the total",
+              file=sys.stderr)
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        access_log=args.access_log,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
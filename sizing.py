@@ -0,0 +1,617 @@
+"""
+Sizing math for the Thanos pool components and the OTel Collector.
+
+Pure functions over ints and floats that build the response models. Kept free of the
+web stack so the CLI and benchmarks can import it without FastAPI; main.py re-exports
+everything here.
+"""
+import math
+from enum import Enum
+from typing import Optional, Tuple
+
+from coefficients import DEFAULT_COEFFICIENTS, Coefficients
+from metrics import stage
+from models import (
+    BasicResources,
+    CollectorResources,
+    DataRetention,
+    PoolResources,
+    QueryLoad,
+    QueryTuning,
+    Resources,
+    ResourcesWithStorage,
+    ResultCache,
+)
+
+DEFAULT_EPHEMERAL_STORAGE = "512Mi"
+# Active series one ingestor replica may hold; shared by _calc_ingestor and the hashring planner.
+INGESTOR_MAX_SERIES_PER_REPLICA = 4000000
+
+# Store gateway and compactor limits, shared with the shard planners. Compactor blocks
+# are compacted 2h -> 8h -> 2d -> 14d; scratch holds the largest block's sources and output.
+STORE_CPU_LIMIT_MULTIPLIER = 1.2
+STORE_MEMORY_LIMIT_MULTIPLIER = 1.35
+COMPACTOR_LARGEST_BLOCK_DAYS = 14
+COMPACTOR_CPU_LIMIT_MULTIPLIER = 1.3
+COMPACTOR_MEMORY_LIMIT_MULTIPLIER = 1.5
+
+# Query path model used when a request describes its query load (see _calc_query_path).
+QUERY_POINTS_PER_RESULT = 250             # points per series a dashboard panel asks for
+QUERY_BYTES_PER_POINT = 16                # timestamp + value of a cached result point
+QUERY_CACHE_ENTRY_OVERHEAD_BYTES = 1024   # cache key, labels and response envelope
+QUERY_CACHE_MEMORY_OVERHEAD = 1.25        # allocator / slab overhead of the cache
+QUERY_FANOUT_SECONDS = 0.02               # store and ingestor round trip of one split query
+QUERIER_SAMPLES_PER_CORE_SECOND = 20e6    # PromQL samples decoded and evaluated per core
+QUERIER_BYTES_PER_SAMPLE = 2              # compressed chunk bytes held per scanned sample
+QUERIER_TARGET_UTILIZATION = 0.7
+QUERY_SLOT_SEARCH_LIMIT = 100000
+FRONTEND_SPLITS_PER_CORE_SECOND = 1000    # cache lookups and merges per frontend core
+FRONTEND_MAX_CORES = 4                    # per replica, before scaling out
+IN_MEMORY_CACHE_MAX_BYTES = 8 * 1024**3   # past this, suggest a shared cache tier
+CACHE_NODE_MAX_BYTES = 32 * 1024**3       # memcached / redis memory per replica
+CACHE_OPS_PER_CORE_SECOND = 50000
+CACHE_MIN_CPU = 0.5
+CACHE_PROCESS_OVERHEAD = 1.1
+
+
+class ResourceType(Enum):
+    CPU = "cpu"
+    MEMORY = "memory"
+
+
+# Helpers
+def format_k8s_resource(bytes_val: float) -> str:
+    """Formats bytes to K8s resource string (Ki, Mi, Gi) matching regex ^[0-9]+[KMG]i$"""
+    if bytes_val <= 0:
+        return "0Gi"
+
+    if bytes_val < 1024 * 1024:
+        val = math.ceil(bytes_val / 1024)
+        return f"{val}Ki"
+    elif bytes_val < 1024 * 1024 * 1024:
+        val = math.ceil(bytes_val / (1024 * 1024))
+        return f"{val}Mi"
+    else:
+        val = math.ceil(bytes_val / (1024 * 1024 * 1024))
+        return f"{val}Gi"
+
+
+def format_cpu(cores: float) -> str:
+    """Formats CPU to '1' (if whole number) or '100m' (if fractional)."""
+    if cores <= 0.1:
+        return "100m"  # fallback minimum
+
+    # Handle int directly or float that is equivalent to int
+    if isinstance(cores, int) or cores.is_integer():
+        return str(int(cores))
+
+    # Fractional - return in millicores
+    millicores = int(cores * 1000)
+    return f"{millicores}m"
+
+
+K8S_UNIT_BYTES = {"Ki": 1024, "Mi": 1024 ** 2, "Gi": 1024 ** 3, "Ti": 1024 ** 4}
+
+
+def parse_k8s_resource(value: str) -> int:
+    """Parses a K8s resource string ('512Mi', '2Gi', '1Ti' or plain bytes) back to bytes."""
+    multiplier = K8S_UNIT_BYTES.get(value[-2:])
+    if multiplier is None:
+        return int(value)
+    return int(value[:-2]) * multiplier
+
+
+def parse_cpu(value: str) -> float:
+    """Parses a CPU string ('2' or '1500m') back to cores."""
+    if value.endswith("m"):
+        return int(value[:-1]) / 1000
+    return float(value)
+
+
+def calculate_limit_multiplier(base_multiplier: float, resource_value: float,
+                                resource_type: ResourceType) -> float:
+    """
+    Adjusts buffer multiplier based on resource scale.
+    - Very low resources: add minimum absolute buffer
+    - Very high resources: reduce percentage buffer (diminishing returns)
+    """
+    if resource_type == ResourceType.CPU:
+        if resource_value < 0.5:
+            min_buffer = 0.3
+            percentage_buffer = resource_value * (base_multiplier - 1)
+            actual_buffer = max(percentage_buffer, min_buffer)
+            return 1 + (actual_buffer / resource_value)
+
+    elif resource_type == ResourceType.MEMORY:
+        memory_gb = resource_value / (1024 ** 3)
+
+        if memory_gb < 2:
+            min_buffer_bytes = 1 * 1024 ** 3
+            percentage_buffer = resource_value * (base_multiplier - 1)
+            actual_buffer = max(percentage_buffer, min_buffer_bytes)
+            return 1 + (actual_buffer / resource_value)
+
+        elif memory_gb > 100:
+            reduced_multiplier = 1 + ((base_multiplier - 1) * 0.7)
+            return reduced_multiplier
+
+    return base_multiplier
+
+
+def create_resources(cpu: float, memory_bytes: float, replicas: int,
+                     cpu_limit_multiplier: float = 1.0,
+                     memory_limit_multiplier: float = 1.0) -> Resources:
+    """
+    Creates a Resources object with calculated requests and limits.
+    """
+    cpu_str = format_cpu(cpu)
+    memory_str = format_k8s_resource(memory_bytes)
+
+    # Apply edge case adjustments
+    adjusted_cpu_mult = calculate_limit_multiplier(cpu_limit_multiplier, cpu, ResourceType.CPU)
+    adjusted_mem_mult = calculate_limit_multiplier(memory_limit_multiplier, memory_bytes, ResourceType.MEMORY)
+
+    # Calculate limit values
+    cpu_limit = cpu * adjusted_cpu_mult
+    memory_limit = memory_bytes * adjusted_mem_mult
+
+    # Validation: ensure limits >= requests
+    assert cpu_limit >= cpu, f"CPU limit ({cpu_limit}) must be >= request ({cpu})"
+    assert memory_limit >= memory_bytes, f"Memory limit ({memory_limit}) must be >= request ({memory_bytes})"
+
+    requests = BasicResources(cpu=cpu_str, memory=memory_str)
+    limits = BasicResources(
+        cpu=format_cpu(cpu_limit),
+        memory=format_k8s_resource(memory_limit)
+    )
+
+    return Resources(
+        requests=requests,
+        limits=limits,
+        replicas=replicas
+    )
+
+
+def create_resources_with_storage(cpu: float, memory_bytes: float, replicas: int,
+                                  storage_bytes: float,
+                                  cpu_limit_multiplier: float = 1.0,
+                                  memory_limit_multiplier: float = 1.0) -> ResourcesWithStorage:
+    """
+    Delegates to create_resources and adds storage to produce a ResourcesWithStorage object.
+    """
+    res = create_resources(cpu, memory_bytes, replicas, cpu_limit_multiplier, memory_limit_multiplier)
+    return ResourcesWithStorage(
+        requests=res.requests,
+        limits=res.limits,
+        replicas=res.replicas,
+        storage=format_k8s_resource(storage_bytes)
+    )
+
+
+def _size_collector(dps: int) -> CollectorResources:
+    """
+    Sizes the OTel Collector for the given DPS.
+    """
+    # Estimate OTel Collector resources from DPS using linear scaling:
+    # ~1 CPU per 25k samples/sec and ~1 GiB RAM per 5k samples/sec, plus a 512 MiB base footprint.
+    otel_cpu = dps / 25000
+    otel_ram_bytes = (512 * 1024 * 1024) + ((dps / 5000) * 1024 * 1024 * 1024)
+
+    with stage("collector", dps):
+        otel_resources = create_resources(
+            otel_cpu,
+            otel_ram_bytes,
+            1,
+            cpu_limit_multiplier=1.2,
+            memory_limit_multiplier=1.3
+        )
+
+    return CollectorResources(
+        requests=otel_resources.requests,
+        limits=otel_resources.limits,
+        replicas=1,
+        dps=dps,
+        ephemeral_storage=DEFAULT_EPHEMERAL_STORAGE
+    )
+
+
+def _calc_router(DPS: int, c: Coefficients = DEFAULT_COEFFICIENTS) -> Resources:
+    """
+    Router: 1 core per 25k DPS, 2 GiB RAM/pod, min 2 replicas HA, cap 4 CPU/pod.
+    """
+    total_cpu = DPS * c.router_cpu_per_dps
+    replicas = max(math.ceil(total_cpu / c.router_max_cpu_per_pod), c.router_min_replicas)
+    cpu_per_pod = total_cpu / replicas
+
+    return create_resources(
+        cpu_per_pod,
+        c.router_memory_per_pod,
+        replicas,
+        cpu_limit_multiplier=1.3,
+        memory_limit_multiplier=1.15
+    )
+
+
+def _calc_ingestor(DPS: int, ACTIVE_TS: float, c: Coefficients = DEFAULT_COEFFICIENTS) -> ResourcesWithStorage:
+    """
+    Ingestor: CPU = DPS/12k + 20% query overhead, RAM = 12 KiB/series + 75% headroom,
+    PVC covers WAL (2h) + blocks (4h), sharded at 4M series/replica, min 5 Gi PVC.
+    """
+    # Receiver keeps 6h of local data; the head block covers the first 2h,
+    # leaving 4h worth of completed blocks on disk (receiver_retention_hours - head_hours).
+    BLOCK_HOURS = 4
+    MAX_SERIES_PER_REPLICA = INGESTOR_MAX_SERIES_PER_REPLICA
+    MIN_PVC_BYTES = 5 * 1024**3
+
+    cpu = DPS * c.ingestor_cpu_per_dps * c.ingestor_query_cpu_overhead           # +20% query cost
+    memory = ACTIVE_TS * c.ingestor_bytes_per_series * c.ingestor_memory_headroom  # +75% query headroom
+
+    wal_bytes = DPS * 7200 * c.ingestor_wal_bytes_per_sample
+    block_bytes = DPS * BLOCK_HOURS * 3600 * c.ingestor_block_bytes_per_sample
+    disk_bytes = max((wal_bytes + block_bytes) * c.ingestor_disk_headroom, MIN_PVC_BYTES)
+
+    replicas = math.ceil(ACTIVE_TS / MAX_SERIES_PER_REPLICA)
+
+    return create_resources_with_storage(
+        cpu,
+        memory,
+        replicas,
+        storage_bytes=disk_bytes,
+        cpu_limit_multiplier=1.25,
+        memory_limit_multiplier=1.4
+    )
+
+
+def _s3_bytes_per_series_day(ACTIVE_TS: float, SCRAPE_INTERVAL: int,
+                             c: Coefficients = DEFAULT_COEFFICIENTS) -> Tuple[float, float, float]:
+    """
+    Bytes one series adds to S3 per day at raw, 5m and 1h resolution. Models storage
+    efficiency gains as cardinality grows (baseline <200k series, up to ~15% compression
+    gain at 2M+ series).
+    """
+    if ACTIVE_TS < 200000:
+        scale_multiplier = 1.0
+    else:
+        scale_factor = min(1.0, (ACTIVE_TS - 200000) / 1800000)
+        scale_multiplier = 0.599 - (scale_factor * 0.0806)
+
+    samples_per_day = 86400 / SCRAPE_INTERVAL
+    raw_bytes_per_series_per_day = samples_per_day * c.s3_raw_bytes_per_sample * scale_multiplier
+    downsample_5m_per_series_per_day = c.s3_5m_bytes_per_series_day * scale_multiplier
+    downsample_1h_per_series_per_day = c.s3_1h_bytes_per_series_day * scale_multiplier
+    return raw_bytes_per_series_per_day, downsample_5m_per_series_per_day, downsample_1h_per_series_per_day
+
+
+def _calc_s3(ACTIVE_TS: float, SCRAPE_INTERVAL: int,
+             RET_RAW_DAYS: int, RET_5M_DAYS: int, RET_1H_DAYS: int,
+             c: Coefficients = DEFAULT_COEFFICIENTS) -> float:
+    """
+    S3 storage: each resolution's daily bytes times its retention. Returns total bytes.
+    """
+    raw_bytes_per_series_per_day, downsample_5m_per_series_per_day, downsample_1h_per_series_per_day = \
+        _s3_bytes_per_series_day(ACTIVE_TS, SCRAPE_INTERVAL, c)
+
+    s3_raw = ACTIVE_TS * raw_bytes_per_series_per_day   * RET_RAW_DAYS
+    s3_5m  = ACTIVE_TS * downsample_5m_per_series_per_day * RET_5M_DAYS
+    s3_1h  = ACTIVE_TS * downsample_1h_per_series_per_day * RET_1H_DAYS
+
+    return s3_raw + s3_5m + s3_1h
+
+
+def _compactor_cpu_and_memory(ACTIVE_TS: float, c: Coefficients = DEFAULT_COEFFICIENTS) -> Tuple[float, float]:
+    """
+    Compactor CPU cores and memory bytes: both scale log10 with active series
+    (base 2 GB/2 CPU, CPU capped at 8).
+    """
+    series_in_thousands = max(10, ACTIVE_TS / 1000)
+    ram_gb = c.compactor_memory_base_gb + (math.log10(series_in_thousands) * c.compactor_memory_gb_per_decade)
+    cpu    = max(0.1, min(c.compactor_max_cpu,
+                          c.compactor_cpu_base + (math.log10(series_in_thousands) * c.compactor_cpu_per_decade)))
+    return cpu, ram_gb * 1024**3
+
+
+def _calc_compactor(DPS: int, ACTIVE_TS: float, c: Coefficients = DEFAULT_COEFFICIENTS) -> ResourcesWithStorage:
+    """
+    Compactor: scratch = the sources and output of one 14d block, i.e. 28 days of
+    daily-generated bytes; RAM/CPU from _compactor_cpu_and_memory.
+    """
+    daily_gen_bytes = DPS * 86400 * c.compactor_bytes_per_sample
+    scratch_bytes = daily_gen_bytes * (2 * COMPACTOR_LARGEST_BLOCK_DAYS)
+
+    cpu, ram_bytes = _compactor_cpu_and_memory(ACTIVE_TS, c)
+
+    return create_resources_with_storage(
+        cpu,
+        ram_bytes,
+        1,
+        storage_bytes=scratch_bytes,
+        cpu_limit_multiplier=COMPACTOR_CPU_LIMIT_MULTIPLIER,
+        memory_limit_multiplier=COMPACTOR_MEMORY_LIMIT_MULTIPLIER
+    )
+
+
+def _store_index_cache_bytes(ACTIVE_TS: float, c: Coefficients = DEFAULT_COEFFICIENTS) -> float:
+    """Per-series index metadata the store gateway keeps in memory (2 KB→1.4 KB per series)."""
+    base_bytes_per_series = c.store_max_bytes_per_series
+    min_bytes_per_series  = c.store_min_bytes_per_series
+
+    series_scale = min(1.0, ACTIVE_TS / 5000000)
+    bytes_per_series = base_bytes_per_series - (
+        series_scale * (base_bytes_per_series - min_bytes_per_series)
+    )
+    return ACTIVE_TS * bytes_per_series
+
+
+def _store_pvc_ratio(ACTIVE_TS: float) -> float:
+    """Share of the bucket the store gateway keeps on its PVC: 10% shrinking to 5% with scale."""
+    return 0.10 - min(0.05, ACTIVE_TS / 10000000 * 0.05)
+
+
+def _calc_store(ACTIVE_TS: float, total_s3_bytes: float,
+                c: Coefficients = DEFAULT_COEFFICIENTS) -> ResourcesWithStorage:
+    """
+    Store Gateway: RAM = 2 GB baseline + per-series index metadata (2 KB→1.4 KB)
+    + 40% headroom. CPU = 1 core/1.5M series. PVC = 5–10% of S3 total.
+    """
+    index_cache_bytes = _store_index_cache_bytes(ACTIVE_TS, c)
+    ram       = (c.store_baseline_bytes + index_cache_bytes) * c.store_memory_headroom
+    cpu       = max(0.1, ACTIVE_TS / c.store_series_per_core)
+    pvc       = total_s3_bytes * _store_pvc_ratio(ACTIVE_TS)
+
+    return create_resources_with_storage(
+        cpu,
+        ram,
+        1,
+        storage_bytes=pvc,
+        cpu_limit_multiplier=STORE_CPU_LIMIT_MULTIPLIER,
+        memory_limit_multiplier=STORE_MEMORY_LIMIT_MULTIPLIER
+    )
+
+
+def _frontend_and_querier_demand(DPS: int, ACTIVE_TS: float, RETENTION: int,
+                                 c: Coefficients = DEFAULT_COEFFICIENTS) -> Tuple[float, float, int, float, float, int]:
+    """
+    Frontend & Querier share hot-window weighted sample count and working_set_scale.
+    Frontend: result-cache heavy, ~1 CPU + scale/3, 1.5 GB + 2× scale RAM.
+    Querier: heavier execution, 2 CPU + 0.7× scale, 2 GB + cardinality + 1.5× scale RAM.
+    Returns (cpu, memory bytes, replicas) of the frontend, then of the querier.
+    """
+    # Hot-window weighting
+    hot_weights = [
+        (1,  0.55),   # 1 day  → 55% of queries
+        (2,  0.25),   # +2 days → 25%
+        (4,  0.15),   # +4 days → 15%
+        (23, 0.05),   # remainder up to 30d → 5%
+    ]
+    remaining = min(RETENTION, 30)
+    weighted_days = 0.0
+    for days, weight in hot_weights:
+        if remaining <= 0:
+            break
+        used = min(days, remaining)
+        weighted_days += used * weight
+        remaining -= used
+
+    hot_samples       = DPS * 86400 * weighted_days
+    working_set_scale = 1.3 * (hot_samples / 1e9) ** 0.5
+
+    # Frontend
+    frontend_replicas = max(1, math.ceil(working_set_scale / 3))
+    frontend_cpu      = c.frontend_cpu_base + (working_set_scale / 3)
+    frontend_ram      = (c.frontend_memory_base_gb + working_set_scale * c.frontend_memory_gb_per_scale) * 1024**3
+
+    # Querier
+    querier_replicas = max(
+        1,
+        math.ceil(working_set_scale / 2),
+        math.ceil(ACTIVE_TS / c.querier_max_series_per_replica)
+    )
+    querier_cpu = c.querier_cpu_base + (working_set_scale * c.querier_cpu_per_scale)
+    querier_ram = (c.querier_memory_base_gb + (ACTIVE_TS / c.querier_series_per_gb)
+                   + (working_set_scale * c.querier_memory_gb_per_scale)) * 1024**3
+
+    return frontend_cpu, frontend_ram, frontend_replicas, querier_cpu, querier_ram, querier_replicas
+
+
+def _frontend_and_querier_resources(frontend_cpu: float, frontend_ram: float, frontend_replicas: int,
+                                    querier_cpu: float, querier_ram: float,
+                                    querier_replicas: int) -> Tuple[Resources, Resources]:
+    frontend_res = create_resources(
+        frontend_cpu,
+        frontend_ram,
+        frontend_replicas,
+        cpu_limit_multiplier=1.1,
+        memory_limit_multiplier=1.4
+    )
+    querier_res = create_resources(
+        querier_cpu,
+        querier_ram,
+        querier_replicas,
+        cpu_limit_multiplier=1.2,
+        memory_limit_multiplier=1.45
+    )
+    return frontend_res, querier_res
+
+
+def _calc_frontend_and_querier(DPS: int, ACTIVE_TS: float, RETENTION: int,
+                               c: Coefficients = DEFAULT_COEFFICIENTS) -> Tuple[Resources, Resources]:
+    """
+    Sizes the frontend and querier from the ingest side alone (see _frontend_and_querier_demand).
+    """
+    return _frontend_and_querier_resources(*_frontend_and_querier_demand(DPS, ACTIVE_TS, RETENTION, c))
+
+
+def _erlang_c_concurrency(arrival_rate: float, service_seconds: float,
+                          latency_target: float) -> Tuple[int, float]:
+    """
+    Smallest number of concurrent query slots c for which an M/M/c queue keeps the mean
+    latency (queueing plus service) within latency_target. Returns (c, latency). When
+    service_seconds alone exceeds the target, or the load is too large to search, the
+    slots keep utilization at QUERIER_TARGET_UTILIZATION instead.
+    """
+    load = arrival_rate * service_seconds
+    if load > QUERY_SLOT_SEARCH_LIMIT:
+        # Queueing delay is negligible this far into the many-server regime.
+        return math.ceil(load / QUERIER_TARGET_UTILIZATION), service_seconds
+
+    min_slots = math.floor(load) + 1
+    if service_seconds >= latency_target:
+        min_slots = max(min_slots, math.ceil(load / QUERIER_TARGET_UTILIZATION))
+
+    # Erlang B by recursion over the slot count, then Erlang C for the waiting probability.
+    erlang_b = 1.0
+    slots = 0
+    while True:
+        slots += 1
+        erlang_b = load * erlang_b / (slots + load * erlang_b)
+        if slots < min_slots:
+            continue
+        erlang_c = slots * erlang_b / (slots - load * (1 - erlang_b))
+        latency = service_seconds + erlang_c / (slots / service_seconds - arrival_rate)
+        if latency <= latency_target or service_seconds >= latency_target:
+            return slots, latency
+
+
+def _calc_query_path(DPS: int, SCRAPE_INTERVAL: int, ACTIVE_TS: float, RETENTION: int,
+                     load: QueryLoad, c: Coefficients = DEFAULT_COEFFICIENTS) -> Tuple[Resources, Resources, QueryTuning]:
+    """
+    Sizes the frontend, querier and result cache for a described query load.
+
+    Each query is split by the frontend into split_interval pieces, which run in parallel.
+    The result cache must hold target_hit_ratio of the distinct split results to answer
+    that share; with uniform popularity under LRU, the hit ratio tracks the cached share
+    of the working set, and skewed dashboards do better. Misses run on the queriers, at
+    QUERIER_SAMPLES_PER_CORE_SECOND plus a fan-out round trip each. The querier
+    concurrency is the smallest M/M/c pool that meets the latency target. Replicas and
+    resources never drop below the ingest-based sizing.
+    """
+    frontend_cpu, frontend_ram, frontend_replicas, querier_cpu, querier_ram, querier_replicas = \
+        _frontend_and_querier_demand(DPS, ACTIVE_TS, RETENTION, c)
+    notes = []
+
+    range_seconds = load.range_hours * 3600
+    split_seconds = min(load.split_interval_hours * 3600, range_seconds)
+    splits = math.ceil(load.range_hours / load.split_interval_hours)
+    split_rate = load.qps * splits
+
+    # Result cache: one entry per (query, split), holding the result points at the panel step.
+    step = max(SCRAPE_INTERVAL, range_seconds / QUERY_POINTS_PER_RESULT)
+    entry_bytes = load.series_per_query * math.ceil(split_seconds / step) * QUERY_BYTES_PER_POINT \
+        + QUERY_CACHE_ENTRY_OVERHEAD_BYTES
+    entries = math.ceil(load.target_hit_ratio * load.distinct_queries * splits)
+    cache_bytes = entries * entry_bytes * QUERY_CACHE_MEMORY_OVERHEAD
+
+    # Queriers: cache misses, each scanning raw samples of one split.
+    miss_rate = split_rate * (1 - load.target_hit_ratio)
+    samples = load.series_per_query * split_seconds / SCRAPE_INTERVAL
+    service_seconds = QUERY_FANOUT_SECONDS + samples / QUERIER_SAMPLES_PER_CORE_SECOND
+    slots, latency = _erlang_c_concurrency(miss_rate, service_seconds, load.latency_target_seconds)
+    latency_met = latency <= load.latency_target_seconds
+    if not latency_met:
+        notes.append(f"A split query needs {service_seconds:.2f}s of querier time, over the "
+                     f"{load.latency_target_seconds}s target; lower split_interval_hours to run smaller "
+                     "pieces in parallel.")
+
+    querier_replicas = max(querier_replicas, math.ceil(slots / load.max_concurrent))
+    busy_cores = miss_rate * service_seconds / querier_replicas
+    querier_cpu = max(querier_cpu, busy_cores / QUERIER_TARGET_UTILIZATION)
+    concurrent_per_replica = min(load.max_concurrent, math.ceil(slots / querier_replicas))
+    query_bytes = samples * QUERIER_BYTES_PER_SAMPLE + entry_bytes
+    querier_ram = querier_ram + concurrent_per_replica * query_bytes
+
+    # Frontend: every split query is a cache lookup plus a merge.
+    frontend_cores = split_rate / FRONTEND_SPLITS_PER_CORE_SECOND
+    frontend_replicas = max(frontend_replicas, math.ceil(frontend_cores / FRONTEND_MAX_CORES))
+    frontend_cpu = max(frontend_cpu, frontend_cores / frontend_replicas)
+
+    cache_resources = None
+    if load.cache_backend == "in-memory":
+        # Every frontend replica fills its own cache.
+        frontend_ram = frontend_ram + cache_bytes
+        if cache_bytes > IN_MEMORY_CACHE_MAX_BYTES:
+            notes.append(f"An in-memory result cache of {format_k8s_resource(cache_bytes)} is duplicated in "
+                         "every query-frontend replica; a memcached or redis tier shares one copy.")
+        cache_size = cache_bytes
+    else:
+        cache_replicas = max(2, math.ceil(cache_bytes / CACHE_NODE_MAX_BYTES))
+        cache_size = cache_bytes / cache_replicas
+        cache_ops = split_rate + miss_rate  # a lookup per split query and a write per miss
+        cache_resources = create_resources(
+            max(CACHE_MIN_CPU, cache_ops / CACHE_OPS_PER_CORE_SECOND / cache_replicas),
+            cache_size * CACHE_PROCESS_OVERHEAD,
+            cache_replicas,
+            cpu_limit_multiplier=1.5,
+            memory_limit_multiplier=1.1
+        )
+
+    frontend_res, querier_res = _frontend_and_querier_resources(
+        frontend_cpu, frontend_ram, frontend_replicas, querier_cpu, querier_ram, querier_replicas)
+    tuning = QueryTuning(
+        split_interval=f"{load.split_interval_hours}h",
+        splits_per_query=splits,
+        split_queries_per_second=round(split_rate, 4),
+        querier_queries_per_second=round(miss_rate, 4),
+        cache_hit_ratio=load.target_hit_ratio,
+        result_cache=ResultCache(
+            backend=load.cache_backend,
+            size=format_k8s_resource(cache_size),
+            entries=entries,
+            entry_size=format_k8s_resource(entry_bytes),
+            resources=cache_resources,
+        ),
+        querier_max_concurrent=concurrent_per_replica,
+        estimated_latency_seconds=round(latency, 4),
+        latency_target_met=latency_met,
+        notes=notes,
+    )
+    return frontend_res, querier_res, tuning
+
+
+def _size_pool(DPS: int, SCRAPE_INTERVAL: int, RETENTION: int,
+               query: Optional[QueryLoad] = None,
+               coefficients: Coefficients = DEFAULT_COEFFICIENTS) -> PoolResources:
+    """
+    Runs every component sizing step for one pool and assembles the PoolResources.
+    With a query load, the frontend and querier are sized for it as well.
+    """
+    c = coefficients
+    ACTIVE_TS       = DPS * SCRAPE_INTERVAL
+    RET_RAW_DAYS    = min(30, RETENTION)
+    RET_5M_DAYS     = RET_RAW_DAYS + max(0, math.ceil((RETENTION - RET_RAW_DAYS) / 2))
+    RET_1H_DAYS     = RETENTION
+
+    with stage("router", DPS):
+        router_res = _calc_router(DPS, c)
+    with stage("ingestor", DPS):
+        ingestor_res = _calc_ingestor(DPS, ACTIVE_TS, c)
+    with stage("s3", DPS):
+        total_s3_bytes = _calc_s3(ACTIVE_TS, SCRAPE_INTERVAL, RET_RAW_DAYS, RET_5M_DAYS, RET_1H_DAYS, c)
+    with stage("compactor", DPS):
+        compactor_res = _calc_compactor(DPS, ACTIVE_TS, c)
+    with stage("store", DPS):
+        store_res = _calc_store(ACTIVE_TS, total_s3_bytes, c)
+    query_tuning = None
+    with stage("frontend_querier", DPS):
+        if query is None:
+            frontend_res, querier_res = _calc_frontend_and_querier(DPS, ACTIVE_TS, RETENTION, c)
+        else:
+            frontend_res, querier_res, query_tuning = _calc_query_path(
+                DPS, SCRAPE_INTERVAL, ACTIVE_TS, RETENTION, query, c)
+
+    with stage("assemble", DPS):
+        return PoolResources(
+            receiver_router=router_res,
+            query=querier_res,
+            query_frontend=frontend_res,
+            receiver_ingestor=ingestor_res,
+            store=store_res,
+            compactor=compactor_res,
+            s3=format_k8s_resource(total_s3_bytes),
+            dps=DPS,
+            data_retention=DataRetention(
+                raw_data=f"{RET_RAW_DAYS}d",
+                downsample_5m=f"{RET_5M_DAYS}d",
+                downsample_1h=f"{RET_1H_DAYS}d"
+            ),
+            query_tuning=query_tuning
+        )
@@ -0,0 +1,235 @@
+"""
+Precomputed pool sizing table.
+
+`python table.py --output sizing.table` sizes every point of a dps × scrape_interval ×
+retention grid with the columnar engine. The results go into a binary file of
+fixed-width records: each quantity is stored as a (value, unit) pair of integers, so
+a record turns back into the exact strings of the scalar path.
+
+The service memory-maps the file (see SIZING_TABLE in main.py). Grid-aligned requests
+are answered by index lookup, and every other request falls back to live sizing.
+Worker processes that map the same file share it through the page cache.
+
+File layout: MAGIC, a little-endian uint32 header length, a JSON header (axes, record
+fields, sizing code fingerprint), padding to a 64-byte boundary, then one record per
+grid point in (dps, scrape_interval, retention) row-major order.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import engine
+from models import PoolResources
+
+MAGIC = b"THNSZTB1"
+ALIGNMENT = 64
+BUILD_CHUNK_SIZE = 1 << 18
+
+DEFAULT_DPS_MAX = 10_000_000
+DEFAULT_DPS_PER_DECADE = 24
+DEFAULT_SCRAPE_INTERVALS = (10, 15, 20, 30, 60, 120, 300)
+DEFAULT_RETENTIONS = (1, 2, 3, 7, 14, 15, 30, 45, 60, 90, 180, 365, 395, 730, 1095, 1825, 3650)
+
+# Sources whose changes invalidate a built table.
+FINGERPRINT_SOURCES = ("sizing.py", "engine.py", "coefficients.py")
+
+QUANTITY_FIELDS = ("requests.memory", "requests.cpu", "limits.memory", "limits.cpu")
+MEMORY_SUFFIXES = tuple(engine.MEMORY_UNITS.tolist())
+STRUCT_CODES = {"<u4": "I", "<u2": "H", "u1": "B"}
+# Same bounds as PoolRequest.
+AXIS_LIMITS = {"dps": (1, None), "scrape_interval": (1, 300), "retention": (1, 3650)}
+
+
+def sizing_fingerprint(sources: Sequence[str] = FINGERPRINT_SOURCES) -> str:
+    """Hash of the sizing code, stored in the table so stale tables are refused."""
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sources:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def log_dps_axis(dps_max: int = DEFAULT_DPS_MAX, per_decade: int = DEFAULT_DPS_PER_DECADE) -> List[int]:
+    """Distinct integers 10 ** (k / per_decade), rounded, from 1 up to dps_max."""
+    steps = int(np.floor(np.log10(dps_max) * per_decade)) + 1
+    values = np.unique(np.rint(10 ** (np.arange(steps) / per_decade)).astype(np.int64))
+    return values[values <= dps_max].tolist()
+
+
+def _record_fields() -> List[Tuple[str, str]]:
+    """(name, dtype) of every record field, in PoolResources order."""
+    fields = []
+    for name in engine.COMPONENTS:
+        for quantity in QUANTITY_FIELDS:
+            fields += [(f"{name}.{quantity}", "<u4"), (f"{name}.{quantity}.unit", "u1")]
+        fields.append((f"{name}.replicas", "<u4"))
+        if name in engine.STORAGE_COMPONENTS:
+            fields += [(f"{name}.storage", "<u4"), (f"{name}.storage.unit", "u1")]
+    fields += [("s3", "<u4"), ("s3.unit", "u1")]
+    fields += [("ret_raw_days", "<u2"), ("ret_5m_days", "<u2"), ("ret_1h_days", "<u2")]
+    return fields
+
+
+def _fill(rows: np.ndarray, cols: Dict[str, Any]) -> None:
+    """Writes a size_pool result into a block of records, checking every value fits."""
+    def put(field: str, values: np.ndarray) -> None:
+        limit = np.iinfo(rows.dtype[field]).max
+        if values.size and values.max() > limit:
+            raise OverflowError(f"{field} exceeds {limit}; shrink the dps axis")
+        rows[field] = values
+
+    def put_quantity(field: str, quantity: Tuple[np.ndarray, np.ndarray]) -> None:
+        put(field, quantity[0])
+        put(f"{field}.unit", quantity[1])
+
+    for name in engine.COMPONENTS:
+        res = cols[name]
+        put_quantity(f"{name}.requests.memory", engine.memory_quantity(res["memory"]))
+        put_quantity(f"{name}.requests.cpu", engine.cpu_quantity(res["cpu"]))
+        put_quantity(f"{name}.limits.memory", engine.memory_quantity(res["memory_limit"]))
+        put_quantity(f"{name}.limits.cpu", engine.cpu_quantity(res["cpu_limit"]))
+        put(f"{name}.replicas", res["replicas"])
+        if name in engine.STORAGE_COMPONENTS:
+            put_quantity(f"{name}.storage", engine.memory_quantity(res["storage"]))
+    put_quantity("s3", engine.memory_quantity(cols["s3"]))
+    for field in ("ret_raw_days", "ret_5m_days", "ret_1h_days"):
+        put(field, cols[field])
+
+
+def build(path: str, dps: Sequence[int], scrape_intervals: Sequence[int], retentions: Sequence[int]) -> int:
+    """Sizes the full grid and writes the table file. Returns the number of records."""
+    axes = [sorted(set(int(v) for v in axis)) for axis in (dps, scrape_intervals, retentions)]
+    for (name, (low, high)), axis in zip(AXIS_LIMITS.items(), axes):
+        if not axis or axis[0] < low or (high is not None and axis[-1] > high):
+            raise ValueError(f"{name} axis must be non-empty with values in [{low}, {high or 'inf'}]")
+    header = json.dumps({
+        "version": 1,
+        "fingerprint": sizing_fingerprint(),
+        "dps": axes[0],
+        "scrape_interval": axes[1],
+        "retention": axes[2],
+        "fields": _record_fields(),
+    }).encode("utf-8")
+    offset = len(MAGIC) + 4 + len(header)
+    padding = -offset % ALIGNMENT
+
+    dtype = np.dtype(_record_fields())
+    shape = tuple(len(axis) for axis in axes)
+    total = int(np.prod(shape))
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header) + padding) + header + b" " * padding)
+        for start in range(0, total, BUILD_CHUNK_SIZE):
+            i, j, k = np.unravel_index(np.arange(start, min(start + BUILD_CHUNK_SIZE, total)), shape)
+            cols = engine.size_pool(np.take(axes[0], i), np.take(axes[1], j), np.take(axes[2], k))
+            rows = np.zeros(i.size, dtype=dtype)
+            _fill(rows, cols)
+            f.write(rows.tobytes())
+    return total
+
+
+class SizingTable:
+    """
+    Read-only view of a table file. lookup() is a dict probe per axis plus one record
+    read from the memory map; the response model is only built on a hit.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a sizing table")
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length))
+        if header["fingerprint"] != sizing_fingerprint():
+            raise ValueError(f"{path} was built from different sizing code; rebuild it with table.py")
+
+        self.path = path
+        self.axes = (header["dps"], header["scrape_interval"], header["retention"])
+        self._index = tuple({value: i for i, value in enumerate(axis)} for axis in self.axes)
+        self._strides = (len(self.axes[1]) * len(self.axes[2]), len(self.axes[2]))
+        # Records are packed little-endian, so struct reads them straight from the map.
+        self._record_struct = struct.Struct("<" + "".join(STRUCT_CODES[dtype] for _, dtype in header["fields"]))
+        self._offset = len(MAGIC) + 4 + header_length
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = (len(self._map) - self._offset) // self._record_struct.size
+        if self._count != len(self.axes[0]) * self._strides[0]:
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def lookup(self, dps: int, scrape_interval: int, retention: int) -> Optional[PoolResources]:
+        """
+        Returns the stored sizing for a grid point, or None when the input is off-grid.
+        The record goes through model_validate on purpose: with pydantic 2 the compiled
+        validator is faster than assembling the nested models with model_construct.
+        """
+        i = self._index[0].get(dps)
+        j = self._index[1].get(scrape_interval)
+        k = self._index[2].get(retention)
+        if i is None or j is None or k is None:
+            return None
+        position = self._offset + (i * self._strides[0] + j * self._strides[1] + k) * self._record_struct.size
+        return PoolResources.model_validate(self._record(dps, self._record_struct.unpack_from(self._map, position)))
+
+    @staticmethod
+    def _record(dps: int, v: Tuple[int, ...]) -> Dict[str, Any]:
+        """Turns the flat field values of one record back into a PoolResources dict."""
+        record: Dict[str, Any] = {"dps": dps}
+        p = 0
+        for name in engine.COMPONENTS:
+            component = {
+                "requests": {"memory": f"{v[p]}{MEMORY_SUFFIXES[v[p + 1]]}",
+                             "cpu": f"{v[p + 2]}m" if v[p + 3] else str(v[p + 2])},
+                "limits": {"memory": f"{v[p + 4]}{MEMORY_SUFFIXES[v[p + 5]]}",
+                           "cpu": f"{v[p + 6]}m" if v[p + 7] else str(v[p + 6])},
+                "replicas": v[p + 8],
+            }
+            p += 9
+            if name in engine.STORAGE_COMPONENTS:
+                component["storage"] = f"{v[p]}{MEMORY_SUFFIXES[v[p + 1]]}"
+                p += 2
+            record[name] = component
+        record["s3"] = f"{v[p]}{MEMORY_SUFFIXES[v[p + 1]]}"
+        record["data_retention"] = {
+            "raw_data": f"{v[p + 2]}d",
+            "downsample_5m": f"{v[p + 3]}d",
+            "downsample_1h": f"{v[p + 4]}d",
+        }
+        return record
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="table file to write")
+    parser.add_argument("--dps", type=_int_list, help="explicit comma-separated dps axis; overrides the log axis")
+    parser.add_argument("--dps-max", type=int, default=DEFAULT_DPS_MAX, help="largest dps of the log axis")
+    parser.add_argument("--dps-per-decade", type=int, default=DEFAULT_DPS_PER_DECADE,
+                        help="log axis resolution")
+    parser.add_argument("--scrape-intervals", type=_int_list, default=list(DEFAULT_SCRAPE_INTERVALS),
+                        help="comma-separated scrape_interval axis")
+    parser.add_argument("--retentions", type=_int_list, default=list(DEFAULT_RETENTIONS),
+                        help="comma-separated retention axis")
+    args = parser.parse_args(argv)
+
+    dps = args.dps or log_dps_axis(args.dps_max, args.dps_per_decade)
+    count = build(args.output, dps, args.scrape_intervals, args.retentions)
+    size = os.path.getsize(args.output)
+    print(f"Wrote {count} records ({size / 1024 / 1024:.1f} MiB) to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
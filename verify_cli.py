@@ -0,0 +1,193 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import calibrate
+import cli
+import coefficients
+import numpy as np
+import pyarrow.ipc
+import pyarrow.parquet
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+def _run(argv, stdin=""):
+    """Runs cli.main in-process with the given stdin; returns (exit code, output records)."""
+    old_stdin = sys.stdin
+    sys.stdin = io.StringIO(stdin)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "out.jsonl")
+            code = cli.main(argv + ["-o", output])
+            with open(output) as f:
+                return code, [json.loads(line) for line in f]
+    finally:
+        sys.stdin = old_stdin
+
+
+def test_cli_jsonl():
+    print("Testing CLI with JSONL input...")
+    rows = [
+        {"dps": 1667},
+        {"dps": 1667, "scrape_interval": 60, "retention": 180},
+        {"dps": 250000, "scrape_interval": 30, "retention": 14},
+        {"dps": 0, "scrape_interval": 60, "retention": 180},
+    ]
+    stdin = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+    code, results = _run(["--chunk-size", "2"], stdin)
+
+    assert code == 1, f"Rejected rows must give exit code 1, got {code}"
+    assert len(results) == len(rows) + 1, f"Expected {len(rows) + 1} results, got {len(results)}"
+    assert results[0] == client.post("/api/calculate/collector_resources", json=rows[0]).json(), \
+        "Collector row differs from the collector endpoint"
+    for index in (1, 2):
+        expected = client.post("/api/calculate/pool_resources", json=rows[index]).json()
+        assert results[index] == expected, f"Row {index} differs from the pool endpoint"
+    assert results[3]["index"] == 3 and results[3]["errors"][0]["loc"] == ["dps"], "Row 3 should be rejected"
+    assert results[4]["errors"][0]["type"] == "json_invalid", "Row 4 should be rejected as invalid JSON"
+
+    loaded = dict(rows[1], query={"qps": 20, "cache_backend": "redis"})
+    code, results = _run([], json.dumps(loaded) + "\n")
+    assert code == 0, f"Expected exit code 0, got {code}"
+    assert results[0] == client.post("/api/calculate/pool_resources", json=loaded).json(), \
+        "Row with a query load differs from the pool endpoint"
+    print(f"{len(results)} rows match the API.")
+
+
+def test_cli_csv_workers():
+    print("\nTesting CLI with CSV input and worker processes...")
+    rows = [(dps, 60, 90) for dps in range(1000, 60000, 1000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pools.csv")
+        with open(path, "w") as f:
+            f.write("dps,scrape_interval,retention\n")
+            f.writelines(f"{d},{s},{r}\n" for d, s, r in rows)
+
+        code, single = _run([path])
+        assert code == 0, f"Expected exit code 0, got {code}"
+        code, parallel = _run([path, "--workers", "2", "--chunk-size", "7"])
+        assert code == 0, f"Expected exit code 0, got {code}"
+
+    assert single == parallel, "Worker processes must not change the output or its order"
+    assert [r["dps"] for r in single] == [d for d, _, _ in rows], "Output must keep the input order"
+    print(f"{len(single)} CSV rows sized in order.")
+
+
+def test_cli_parquet():
+    print("\nTesting CLI Parquet and Arrow output...")
+    rows = [{"dps": dps, "scrape_interval": 30, "retention": 400} for dps in range(500, 90000, 900)]
+    rows.insert(3, {"dps": 0, "scrape_interval": 30, "retention": 400})
+    stdin = "\n".join(json.dumps(row) for row in rows) + "\n"
+    code, expected = _run(["--chunk-size", "16"], stdin)
+    assert code == 1, f"The rejected row must give exit code 1, got {code}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tables = {}
+        for fmt in ("parquet", "arrow"):
+            path = os.path.join(tmp, f"out.{fmt}")
+            sys.stdin = io.StringIO(stdin)
+            try:
+                code = cli.main(["--output-format", fmt, "--chunk-size", "16", "--workers", "2", "-o", path])
+            finally:
+                sys.stdin = sys.__stdin__
+            assert code == 1, f"{fmt}: the rejected row must give exit code 1, got {code}"
+            if fmt == "parquet":
+                tables[fmt] = pyarrow.parquet.read_table(path)
+            else:
+                with open(path, "rb") as f:
+                    tables[fmt] = pyarrow.ipc.open_stream(f).read_all()
+
+    assert tables["parquet"].equals(tables["arrow"]), "Parquet and Arrow output must hold the same table"
+    table = tables["parquet"].to_pylist()
+    assert [row["index"] for row in table] == [i for i in range(len(rows)) if i != 3], \
+        "Only the rejected row may be missing, and the order must be kept"
+    for row in table:
+        record = expected[row["index"]]
+        assert row["store.storage"] == record["store"]["storage"], "store.storage differs from JSONL"
+        assert row["query.limits.cpu"] == record["query"]["limits"]["cpu"], "query.limits.cpu differs from JSONL"
+    print(f"{len(table)} rows written as Parquet and Arrow.")
+
+
+def test_calibrate():
+    print("\nTesting calibration and coefficient profiles in the CLI...")
+    rng = np.random.default_rng(7)
+    lines = ["component,dps,active_series,cpu,memory,disk"]
+    for dps in rng.integers(1000, 500000, 60).tolist():
+        series = dps * 30
+        memory = series * 12 * 1024 * 1.3 * rng.normal(1, 0.03)
+        lines.append(f"ingestor,{dps},{series},{dps / 9000 * rng.normal(1, 0.03):.3f},{memory:.0f},")
+        lines.append(f"store,{dps},{series},{round(series / 1000):d}m,,")
+    lines.append("router,1000,30000,100m,,")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = os.path.join(tmp, "usage.csv")
+        with open(samples, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        profiles = os.path.join(tmp, "profiles")
+        os.mkdir(profiles)
+        path = os.path.join(profiles, "measured.json")
+        assert calibrate.main([samples, "--name", "measured", "--version", "4", "-o", path]) == 0, \
+            "Calibration should succeed"
+
+        profile = coefficients.read_profile(path)
+        fitted = profile.coefficients
+        assert abs(fitted.ingestor_bytes_per_series / (12 * 1024 * 1.3) - 1) < 0.02, \
+            f"Fitted {fitted.ingestor_bytes_per_series} bytes/series, expected ~{12 * 1024 * 1.3}"
+        assert abs(fitted.ingestor_cpu_per_dps * 1.2 * 9000 - 1) < 0.02, "Ingestor CPU per dps was not recovered"
+        assert abs(fitted.store_series_per_core / 1000000 - 1) < 0.01, "Store series per core was not recovered"
+        assert fitted.router_cpu_per_dps == coefficients.DEFAULT_COEFFICIENTS.router_cpu_per_dps, \
+            "A group with too few samples must keep its coefficients"
+
+        coefficients.load_profiles(profiles)
+        os.environ["COEFFICIENT_PROFILES"] = profiles
+        try:
+            rows = [{"dps": dps, "scrape_interval": 30, "retention": 60, **extra}
+                    for dps in range(2000, 40000, 3000) for extra in ({}, {"coefficients": "measured@4"})]
+            code, results = _run(["--chunk-size", "5", "--workers", "2"], "\n".join(map(json.dumps, rows)) + "\n")
+            assert code == 0, f"Expected exit code 0, got {code}"
+            for row, result in zip(rows, results):
+                assert result == client.post("/api/calculate/pool_resources", json=row).json(), \
+                    f"Row {row} differs from the pool endpoint"
+            assert results[0] != results[1], "The profile must change the sizing"
+
+            path = os.path.join(tmp, "out.parquet")
+            sys.stdin = io.StringIO("\n".join(map(json.dumps, rows)) + "\n")
+            try:
+                code = cli.main(["--output-format", "parquet", "--chunk-size", "5", "-o", path])
+            finally:
+                sys.stdin = sys.__stdin__
+            assert code == 0, f"Expected exit code 0, got {code}"
+            table = pyarrow.parquet.read_table(path).to_pylist()
+            assert sorted(row["index"] for row in table) == list(range(len(rows))), "Every row must be written once"
+            for row in table:
+                assert row["receiver_ingestor.requests.memory"] == \
+                    results[row["index"]]["receiver_ingestor"]["requests"]["memory"], "Parquet differs from JSONL"
+        finally:
+            del os.environ["COEFFICIENT_PROFILES"]
+            coefficients.load_profiles(None)
+    print(f"Fitted {fitted.ingestor_bytes_per_series:.0f} ingestor bytes/series; {len(rows)} rows sized with it.")
+
+
+def test_cli_imports():
+    print("\nTesting CLI startup imports...")
+    script = ("import sys, cli; cli.main(['-']); "
+              "print(sorted(m for m in ('fastapi', 'starlette', 'uvicorn', 'main') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script], input='{"dps": 1667}\n',
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]", f"CLI imported the web stack: {result.stdout}"
+    print("No web modules imported.")
+
+
+if __name__ == "__main__":
+    test_cli_jsonl()
+    test_cli_csv_workers()
+    test_cli_parquet()
+    test_calibrate()
+    test_cli_imports()
+    print("\nAll assertions passed.")
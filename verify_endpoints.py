@@ -1,6 +1,18 @@
 from fastapi.testclient import TestClient
+import engine
+import export
+import main
 from main import app
+from cache import LRUCache
+import coefficients
+import table
+import inspect
 import json
+import os
+import pstats
+import pyarrow.ipc
+import tempfile
+import time
 
 client = TestClient(app)
 
@@ -58,7 +70,848 @@ def test_pool():
     print(json.dumps(data, indent=2))
 
 
+def test_pool_query_load():
+    print("\nTesting Pool Query Load Sizing...")
+    pool = {"dps": 16667, "scrape_interval": 60, "retention": 180}
+    base = client.post("/api/calculate/pool_resources", json=pool).json()
+    assert "query_tuning" not in base, "query_tuning must only appear with a query load"
+
+    load = {"qps": 2000, "range_hours": 168, "series_per_query": 5000, "distinct_queries": 5000}
+    data = client.post("/api/calculate/pool_resources", json={**pool, "query": load}).json()
+    tuning = data["query_tuning"]
+    assert tuning["splits_per_query"] == 7, f"168h at a 24h split is 7 splits, got {tuning['splits_per_query']}"
+    assert tuning["split_queries_per_second"] == 14000, "Every query fans out into its splits"
+    assert tuning["latency_target_met"] is True, f"Expected the default target to be met: {tuning}"
+    assert tuning["querier_max_concurrent"] <= 20, "Concurrency must respect max_concurrent"
+    assert data["query"]["replicas"] > base["query"]["replicas"], "Queriers must scale with the load"
+    assert main.parse_k8s_resource(data["query_frontend"]["requests"]["memory"]) > \
+        main.parse_k8s_resource(base["query_frontend"]["requests"]["memory"]), \
+        "An in-memory cache must be added to the frontend memory"
+    assert tuning["notes"], "A large in-memory cache should suggest a shared tier"
+    for name in ("receiver_router", "receiver_ingestor", "store", "compactor", "s3"):
+        assert data[name] == base[name], f"{name} must not depend on the query load"
+    assert client.post("/api/calculate/pool_resources", json=pool).json() == base, \
+        "The cache key must include the query load"
+
+    shared = client.post("/api/calculate/pool_resources",
+                         json={**pool, "query": {**load, "cache_backend": "memcached"}}).json()
+    cache = shared["query_tuning"]["result_cache"]
+    assert cache["backend"] == "memcached" and cache["resources"]["replicas"] >= 2, "Expected a cache tier"
+    assert shared["query_frontend"]["requests"]["memory"] == base["query_frontend"]["requests"]["memory"], \
+        "A shared tier must not grow the frontend memory"
+    assert not shared["query_tuning"]["notes"], "A shared tier needs no note"
+
+    lighter = client.post("/api/calculate/pool_resources",
+                          json={**pool, "query": {**load, "target_hit_ratio": 0.95}}).json()
+    assert lighter["query"]["replicas"] < data["query"]["replicas"], "More cache hits must need fewer queriers"
+
+    slow = {"qps": 1, "range_hours": 720, "split_interval_hours": 720, "series_per_query": 100000}
+    tuning = client.post("/api/calculate/pool_resources", json={**pool, "query": slow}).json()["query_tuning"]
+    assert tuning["latency_target_met"] is False and "split_interval_hours" in tuning["notes"][0], \
+        "An unreachable target must be reported"
+
+    batch = client.post("/api/calculate/pool_resources/batch", json=[{**pool, "query": load}]).json()
+    assert batch[0] == data, "Batch items with a query load must match the single-pool endpoint"
+    response = client.post("/api/calculate/pool_resources", json={**pool, "query": {**load, "target_hit_ratio": 1}})
+    assert response.status_code == 422, f"Expected 422 for a hit ratio of 1, got {response.status_code}"
+
+    print(f"Query load sizing: {data['query']['replicas']} queriers, "
+          f"{data['query_tuning']['result_cache']['size']} result cache.")
+
+
+def test_pool_batch():
+    print("\nTesting Pool Batch Endpoint...")
+    payload = [
+        {"dps": 1667, "scrape_interval": 60, "retention": 180},
+        {"dps": 1667, "scrape_interval": 600, "retention": 180},
+        "not-a-pool",
+        {"dps": 250000, "scrape_interval": 30, "retention": 14},
+    ]
+    response = client.post("/api/calculate/pool_resources/batch", json=payload)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert len(data) == len(payload), f"Expected {len(payload)} results, got {len(data)}"
+
+    for index in (0, 3):
+        single = client.post("/api/calculate/pool_resources", json=payload[index]).json()
+        assert data[index] == single, f"Item {index} differs from the single-pool endpoint"
+
+    for index in (1, 2):
+        assert data[index]["index"] == index, f"Item {index}: wrong error index"
+        assert data[index]["errors"], f"Item {index}: missing validation errors"
+    assert data[1]["errors"][0]["loc"] == ["scrape_interval"], "Item 1: error should point at scrape_interval"
+
+    print("Pool Batch Response (errors only):")
+    print(json.dumps([data[1], data[2]], indent=2))
+
+
+def test_pool_sweep():
+    print("\nTesting Pool Sweep Endpoint...")
+    payload = {
+        "dps": {"start": 1000, "stop": 9000, "step": 4000},
+        "scrape_interval": {"values": [30, 60]},
+        "retention": {"values": [14, 180]}
+    }
+    response = client.post("/api/calculate/pool_resources/sweep", json=payload)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    assert response.headers["content-type"].startswith("application/x-ndjson"), "Sweep must stream NDJSON"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 3 * 2 * 2, f"Expected 12 grid points, got {len(lines)}"
+    assert [line["dps"] for line in lines[:3]] == [1000, 5000, 9000], "dps must vary fastest"
+
+    for line in (lines[0], lines[-1]):
+        point = {key: line.pop(key) for key in ("scrape_interval", "retention")}
+        single = client.post("/api/calculate/pool_resources", json={"dps": line["dps"], **point}).json()
+        assert line == single, f"Sweep point {point} differs from the single-pool endpoint"
+
+    bad = dict(payload, scrape_interval={"start": 60, "stop": 600, "step": 60})
+    response = client.post("/api/calculate/pool_resources/sweep", json=bad)
+    assert response.status_code == 422, f"Expected 422 for out-of-range axis, got {response.status_code}"
+    for axis in ({"start": 1, "stop": 10 ** 19}, {"values": [10 ** 19]}):
+        response = client.post("/api/calculate/pool_resources/sweep", json=dict(payload, dps=axis))
+        assert response.status_code == 422, f"Expected 422 for dps axis {axis}, got {response.status_code}"
+    huge = dict(payload, dps={"start": 1, "stop": main.MAX_DPS})
+    response = client.post("/api/calculate/pool_resources/sweep", json=huge)
+    assert response.status_code == 413, f"Expected 413 for an oversized sweep, got {response.status_code}"
+
+    print(f"Pool Sweep streamed {len(lines)} points.")
+
+
+def test_pool_sweep_arrow():
+    print("\nTesting Pool Sweep Arrow Output...")
+    payload = {
+        "dps": {"start": 1000, "stop": 900000, "step": 7000},
+        "scrape_interval": {"values": [15, 60]},
+        "retention": {"values": [14, 3650]}
+    }
+    lines = [json.loads(line) for line in
+             client.post("/api/calculate/pool_resources/sweep", json=payload).text.splitlines()]
+    response = client.post("/api/calculate/pool_resources/sweep", json=payload,
+                           headers={"Accept": export.ARROW_STREAM_MEDIA_TYPE})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    assert response.headers["content-type"] == export.ARROW_STREAM_MEDIA_TYPE, "Expected an Arrow stream"
+    rows = pyarrow.ipc.open_stream(response.content).read_all().to_pylist()
+    assert len(rows) == len(lines), f"Expected {len(lines)} rows, got {len(rows)}"
+
+    for row, line in zip(rows, lines):
+        assert (row["dps"], row["scrape_interval"], row["retention"]) == \
+            (line["dps"], line["scrape_interval"], line["retention"]), "Rows must follow the NDJSON order"
+        for name in engine.COMPONENTS:
+            for kind in ("requests", "limits"):
+                memory, cpu = line[name][kind]["memory"], line[name][kind]["cpu"]
+                assert row[f"{name}.{kind}.memory"] == memory and row[f"{name}.{kind}.cpu"] == cpu, \
+                    f"{name}.{kind} strings differ from NDJSON"
+                assert row[f"{name}.{kind}.memory_bytes"] == main.parse_k8s_resource(memory), \
+                    f"{name}.{kind}.memory_bytes does not match {memory}"
+                assert row[f"{name}.{kind}.cpu_millicores"] == round(main.parse_cpu(cpu) * 1000), \
+                    f"{name}.{kind}.cpu_millicores does not match {cpu}"
+            assert row[f"{name}.replicas"] == line[name]["replicas"], f"{name}.replicas differs"
+            if "storage" in line[name]:
+                assert row[f"{name}.storage_bytes"] == main.parse_k8s_resource(line[name]["storage"]), \
+                    f"{name}.storage_bytes differs"
+        assert row["s3"] == line["s3"], "s3 differs"
+        assert f"{row['data_retention.downsample_5m_days']}d" == line["data_retention"]["downsample_5m"], \
+            "Retention windows differ"
+
+    print(f"Arrow sweep matches {len(rows)} NDJSON points.")
+
+
+def test_pool_projection():
+    print("\nTesting Pool Projection Endpoint...")
+    pool = {"dps": 16667, "scrape_interval": 60, "retention": 180}
+    payload = {"pool": pool, "monthly_growth_rate": 0.05, "horizon_months": 6}
+    response = client.post("/api/calculate/pool_resources/projection", json=payload)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert data["change_points_only"] is False, "Short horizons should return every month"
+    assert [point["month"] for point in data["points"]] == list(range(7)), "Expected months 0..6"
+    assert data["points"][0]["resources"] == client.post("/api/calculate/pool_resources", json=pool).json(), \
+        "Month 0 must match the single-pool endpoint"
+
+    for point in data["points"][1:]:
+        expected = client.post("/api/calculate/pool_resources", json={**pool, "dps": point["dps"]}).json()
+        assert point["resources"] == expected, f"Month {point['month']} differs from the single-pool endpoint"
+
+    payload = {"pool": pool, "monthly_growth_rate": 0.05, "horizon_months": 36}
+    data = client.post("/api/calculate/pool_resources/projection", json=payload).json()
+    months = [point["month"] for point in data["points"]]
+    assert data["change_points_only"] is True, "Long horizons should default to change points only"
+    assert months[0] == 0 and months[-1] == 36, "Change points must include the first and last month"
+    assert all(point["crossings"] for point in data["points"][1:-1]), "Intermediate points must have crossings"
+    replicas = [c for point in data["points"] for c in point["crossings"] if c["field"].endswith(".replicas")]
+    assert replicas, "36 months at 5% growth should add replicas"
+
+    response = client.post("/api/calculate/pool_resources/projection",
+                           json={"pool": pool, "monthly_growth_rate": -1, "horizon_months": 6})
+    assert response.status_code == 422, f"Expected 422 for a -100% growth rate, got {response.status_code}"
+
+    print("Pool Projection Change Points:")
+    print(json.dumps([{"month": p["month"], "crossings": p["crossings"]} for p in data["points"]], indent=2))
+
+
+def test_max_dps():
+    print("\nTesting Max DPS Endpoint...")
+    payload = {"scrape_interval": 60, "retention": 180, "budget": {"cpu": "64", "memory": "256Gi", "s3": "10Ti"}}
+    response = client.post("/api/calculate/max_dps", json=payload)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert data["limiting_resource"] in ("cpu", "memory", "s3"), f"Unexpected limit: {data['limiting_resource']}"
+    assert data["limiting_component"], "The limiting component must be named"
+
+    pool = {"dps": data["dps"], "scrape_interval": 60, "retention": 180}
+    assert data["resources"] == client.post("/api/calculate/pool_resources", json=pool).json(), \
+        "Reported resources must match the single-pool endpoint"
+    assert main.parse_cpu(data["usage"]["cpu"]) <= 64, "Solution must fit the CPU budget"
+    assert main.parse_k8s_resource(data["usage"]["memory"]) <= 256 * 1024 ** 3, "Solution must fit the memory budget"
+
+    over = main._size_pool(data["dps"] + 1, 60, 180)
+    limits = {"cpu": 64000, "memory": 256 * 1024 ** 3, "s3": 10 * 1024 ** 4}
+    assert main._exceeded(main._pool_usage(over), limits) == data["limiting_resource"], \
+        "dps + 1 must exceed the reported limiting resource"
+
+    response = client.post("/api/calculate/max_dps",
+                           json={"scrape_interval": 60, "retention": 180, "budget": {"cpu": "100m"}})
+    assert response.status_code == 422, f"Expected 422 for a budget below dps=1, got {response.status_code}"
+    response = client.post("/api/calculate/max_dps", json={"scrape_interval": 60, "retention": 180, "budget": {}})
+    assert response.status_code == 422, f"Expected 422 for an empty budget, got {response.status_code}"
+
+    print("Max DPS Response (without resources):")
+    print(json.dumps({k: v for k, v in data.items() if k != "resources"}, indent=2))
+
+
+def test_hashring_plan():
+    print("\nTesting Hashring Planner Endpoint...")
+    tenants = [{"name": f"tenant-{i}", "dps": 50 + 37 * i, "scrape_interval": 30} for i in range(200)]
+    tenants.append({"name": "huge", "dps": 300000, "scrape_interval": 60})
+    payload = {"tenants": tenants, "replication_factor": 3}
+    response = client.post("/api/plan/hashring", json=payload)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    total_series = sum(t["dps"] * t["scrape_interval"] for t in tenants)
+    assert data["total_series"] == total_series, "Wrong total series"
+    assert data["split_tenants"] == 1, "Only the 18M-series tenant should be split"
+    assert len(data["replicas"]) >= data["min_replicas"], "Cannot use fewer replicas than the lower bound"
+
+    replicas = data["replicas"]
+    assert sum(r["series"] for r in replicas) == 3 * total_series, "Every series must be placed 3 times"
+    assert all(r["series"] <= 4000000 for r in replicas), "A replica exceeds the 4M series cap"
+    for tenant in tenants[:200]:
+        holders = [r["replica"] for r in replicas if tenant["name"] in r["tenants"]]
+        assert len(holders) == 3, f"{tenant['name']}: expected 3 distinct replicas, got {holders}"
+
+    sized = main._calc_ingestor(replicas[0]["dps"], replicas[0]["series"])
+    assert replicas[0]["requests"] == sized.requests.model_dump(), "Replica sizing must follow _calc_ingestor"
+
+    huge = {"tenants": [{"name": "huge", "dps": 10 ** 9, "scrape_interval": 300}]}
+    response = client.post("/api/plan/hashring", json=huge)
+    assert response.status_code == 413, f"Expected 413 for an oversized hashring, got {response.status_code}"
+
+    response = client.post("/api/plan/hashring", json={"tenants": tenants[:1] * 2})
+    assert response.status_code == 422, f"Expected 422 for duplicate tenants, got {response.status_code}"
+
+    print("Hashring Plan Summary:")
+    print(json.dumps({"replicas": len(replicas), "min_replicas": data["min_replicas"], "skew": data["skew"]},
+                     indent=2))
+
+
+def test_node_plan():
+    print("\nTesting Node Plan Endpoint...")
+    # Anti-affinity: three small replicas of one component still need three nodes,
+    # and a second component can share them.
+    nodes, pods, unschedulable = main._pack_nodes(
+        [(0, "store", 1000, 1024 ** 3, 3), (0, "query", 1000, 1024 ** 3, 3)], 8000, 32 * 1024 ** 3
+    )
+    assert (nodes, pods, unschedulable) == (3, 6, []), f"Unexpected packing: {nodes} nodes, {pods} pods"
+
+    pool = client.post("/api/calculate/pool_resources",
+                       json={"dps": 16667, "scrape_interval": 60, "retention": 180}).json()
+    payload = {
+        "pools": [pool, pool],
+        "nodes": [
+            {"name": "large", "cpu": "32", "memory": "256Gi", "overhead_cpu": "500m", "overhead_memory": "2Gi"},
+            {"name": "tiny", "cpu": "1", "memory": "2Gi"},
+        ],
+    }
+    response = client.post("/api/plan/nodes", json=payload)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    large, tiny = data["plans"]
+
+    total_pods = 2 * sum(pool[name]["replicas"] for name in engine.COMPONENTS)
+    assert large["pods"] == total_pods and not large["unschedulable"], "Every pod should fit the large node"
+    assert large["nodes"] >= max(pool[name]["replicas"] for name in engine.COMPONENTS), "Anti-affinity violated"
+    assert 0 < large["cpu_utilization"] <= 1 and 0 < large["memory_utilization"] <= 1, "Utilization out of range"
+    assert tiny["unschedulable"], "Some pods cannot fit a 1-core node"
+    assert data["recommended"] == "large", f"Expected 'large', got {data.get('recommended')}"
+
+    crowded = dict(pool, store=dict(pool["store"], replicas=10 ** 9))
+    response = client.post("/api/plan/nodes", json={"pools": [crowded], "nodes": payload["nodes"]})
+    assert response.status_code == 422, f"Expected 422 above the pod limit, got {response.status_code}"
+
+    for shape in ({"name": "none", "cpu": "0", "memory": "2Gi"},
+                  {"name": "reserved", "cpu": "4", "memory": "2Gi", "overhead_memory": "2Gi"}):
+        response = client.post("/api/plan/nodes", json={"pools": [pool], "nodes": [shape]})
+        assert response.status_code == 422, f"{shape['name']}: expected 422, got {response.status_code}"
+
+    print("Node Plan (large):")
+    print(json.dumps(large, indent=2))
+
+
+def test_store_shards():
+    print("\nTesting Store Shard Plan Endpoint...")
+    small = {"dps": 1667, "scrape_interval": 60, "retention": 14}
+    data = client.post("/api/plan/store_shards", json={"pool": small}).json()
+    store = client.post("/api/calculate/pool_resources", json=small).json()["store"]
+    assert data["unsharded"] == store, "unsharded must match the pool's store gateway"
+    assert [tier["name"] for tier in data["tiers"]] == ["raw"], "14d retention only has a raw tier"
+    assert data["tiers"][0]["shard"] == store and data["tiers"][0]["shards"] == 1, \
+        "A single-tier, single-shard plan must equal the unsharded store"
+
+    large = {"dps": 3000000, "scrape_interval": 30, "retention": 730}
+    payload = {"pool": large, "max_memory_per_shard": "16Gi", "max_index_load_seconds": 120, "replicas_per_shard": 2}
+    response = client.post("/api/plan/store_shards", json=payload)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    tiers = data["tiers"]
+    assert [tier["name"] for tier in tiers] == ["raw", "5m", "1h"], "Expected raw, 5m and 1h tiers"
+    assert [(tier["max_time"], tier["min_time"]) for tier in tiers] == \
+        [(None, "-30d"), ("-30d", "-380d"), ("-380d", "-730d")], "Tiers must follow the retention windows"
+    for tier in tiers:
+        assert main.parse_k8s_resource(tier["shard"]["requests"]["memory"]) <= 16 * 1024 ** 3, \
+            f"{tier['name']} shard exceeds the memory bound"
+        assert tier["index_load_seconds"] <= 120 and tier["limited_by"] is None, \
+            f"{tier['name']} shard exceeds the load bound"
+        assert tier["shard"]["replicas"] == 2, "Each shard must have replicas_per_shard replicas"
+    assert data["total_replicas"] == 2 * sum(tier["shards"] for tier in tiers), "total_replicas is off"
+    assert data["restart_seconds"] < data["unsharded_index_load_seconds"], "Sharding must shorten the restart"
+    s3 = client.post("/api/calculate/pool_resources", json=large).json()["s3"]
+    assert data["totals"]["s3"] == s3, "Tier totals must cover the pool's bucket"
+
+    bound = dict(payload, max_index_load_seconds=1, max_shards_per_tier=2)
+    data = client.post("/api/plan/store_shards", json=bound).json()
+    assert all(tier["limited_by"] is not None for tier in data["tiers"]), "Unmet bounds must be reported"
+    assert data["notes"], "Unmet bounds must be explained"
+
+    print(f"Store sharded into {[tier['shards'] for tier in tiers]} shards per tier.")
+
+
+def test_compactor_shards():
+    print("\nTesting Compactor Shard Plan Endpoint...")
+    small = {"dps": 1667, "scrape_interval": 60, "retention": 180}
+    data = client.post("/api/plan/compactor_shards", json={"pool": small}).json()
+    compactor = client.post("/api/calculate/pool_resources", json=small).json()["compactor"]
+    assert data["unsharded"] == compactor, "unsharded must match the pool's compactor"
+    assert data["shards"] == 1 and data["shard"] == compactor, "A small pool keeps its single compactor"
+    assert [step["name"] for step in data["steps"]] == \
+        ["2h-8h", "8h-2d", "2d-14d", "downsample-5m", "downsample-1h"], "Expected every level and pass"
+
+    large = {"dps": 10000000, "scrape_interval": 30, "retention": 730}
+    response = client.post("/api/plan/compactor_shards", json={"pool": large})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert data["unsharded_utilization"] > 0.5 and data["shards"] > 1, "A single compactor must fall behind"
+    assert data["utilization"] <= 0.5 and data["longest_compaction_hours"] <= 24 and data["limited_by"] is None, \
+        "Each shard must fit the time budget"
+    scratch = main.parse_k8s_resource(data["shard"]["storage"])
+    assert abs(scratch - 2 * main.parse_k8s_resource(data["largest_block_size"])) <= 2 * 1024 ** 3, \
+        "Scratch must hold the sources and output of the shard's largest block"
+    assert scratch < main.parse_k8s_resource(data["unsharded"]["storage"]), "Sharding must shrink scratch"
+    step = data["steps"][0]
+    assert abs(step["blocks_per_hour"] * step["seconds_per_block"] - 3600) < 1, \
+        "blocks_per_hour must follow seconds_per_block at concurrency 1"
+
+    concurrent = {"pool": large, "compact_concurrency": 4, "downsample_concurrency": 4, "max_compaction_hours": 48}
+    faster = client.post("/api/plan/compactor_shards", json=concurrent).json()
+    assert faster["shards"] < data["shards"], "More concurrency must need fewer shards"
+
+    bound = client.post("/api/plan/compactor_shards", json={"pool": large, "max_shards": 2}).json()
+    assert bound["limited_by"] == "utilization" and bound["notes"], "Unmet bounds must be reported"
+
+    print(f"Compactor sharded {data['shards']} ways at {data['utilization']:.0%} utilization.")
+
+
+def test_autoscaling():
+    print("\nTesting Autoscaling Plan Endpoint...")
+    flat = {"dps": [100000] * 24, "scrape_interval": 30, "retention": 90}
+    data = client.post("/api/plan/autoscaling", json=flat).json()
+    pool = client.post("/api/calculate/pool_resources",
+                       json={"dps": 100000, "scrape_interval": 30, "retention": 90}).json()
+    for name in ("receiver_router", "query", "query_frontend"):
+        component = data[name]
+        assert component["pod"]["requests"] == pool[name]["requests"], f"{name} pod must be sized for the peak"
+        assert component["min_replicas"] == component["max_replicas"] >= pool[name]["replicas"], \
+            f"A flat curve must not scale {name}"
+        assert component["reclaimable"]["cpu"] == "0" and component["reclaimable_share"] == 0, \
+            f"A flat curve frees nothing in {name}"
+    assert data["reclaimable_share"] == 0 and data["notes"], "A flat curve must say an HPA saves nothing"
+
+    # 4x between day and night, over a week.
+    day = [25000] * 7 + [50000, 75000] + [100000] * 10 + [75000, 50000] + [25000] * 3
+    diurnal = dict(flat, dps=day * 7)
+    response = client.post("/api/plan/autoscaling", json=diurnal)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    data = response.json()
+    assert data["buckets"] == 168 and data["peak_bucket"] == 9, "Expected a week of buckets peaking at 09:00"
+    for name in ("receiver_router", "query", "query_frontend"):
+        component = data[name]
+        assert len(component["replicas"]) == 168, f"{name} needs one replica count per bucket"
+        assert component["min_replicas"] < component["max_replicas"] == max(component["replicas"]), \
+            f"{name} must scale in at night"
+        assert 0 < component["target_cpu_utilization"] <= 80, f"{name} CPU target out of range"
+    assert data["reclaimable_share"] > 0.2, "A 4x swing must free a large share of the peak"
+
+    queried = dict(diurnal, dps=day, qps=[5] * 8 + [200] * 10 + [5] * 6,
+                   query={"qps": 1, "range_hours": 24, "cache_backend": "memcached"})
+    data = client.post("/api/plan/autoscaling", json=queried).json()
+    peak_query = client.post("/api/calculate/pool_resources", json={
+        "dps": 100000, "scrape_interval": 30, "retention": 90,
+        "query": {"qps": 200, "range_hours": 24, "cache_backend": "memcached"}}).json()["query"]
+    assert data["query"]["pod"]["requests"] == peak_query["requests"], "The querier pod must fit the peak qps"
+    assert data["query"]["max_replicas"] >= peak_query["replicas"], "max_replicas must cover the peak"
+
+    response = client.post("/api/plan/autoscaling", json=dict(flat, dps=[1000] * 23))
+    assert response.status_code == 422, "Curves must have 24 or 168 buckets"
+    response = client.post("/api/plan/autoscaling", json=dict(flat, dps=[10 ** 19] * 24))
+    assert response.status_code == 422, "Every bucket must be within the PoolRequest dps bound"
+    response = client.post("/api/plan/autoscaling", json=dict(flat, qps=[1.0] * 168))
+    assert response.status_code == 422, "qps must match the dps buckets"
+    response = client.post("/api/plan/autoscaling", content=json.dumps(dict(flat, qps=[float("nan")] * 24)),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 422, f"Expected 422 for a NaN qps curve, got {response.status_code}"
+
+    print(f"Diurnal curve frees {data['reclaimable_share']:.0%} of peak CPU.")
+
+
+def test_fleet_diff():
+    print("\nTesting Fleet Diff Planner...")
+    pool = {"dps": 60000, "scrape_interval": 30, "retention": 90}
+    loaded = dict(pool, query={"qps": 30, "cache_backend": "memcached"})
+    right = client.post("/api/calculate/pool_resources", json=pool).json()
+    right_loaded = client.post("/api/calculate/pool_resources", json=loaded).json()
+
+    over = json.loads(json.dumps(right))
+    ingestor = over["receiver_ingestor"]
+    doubled = main.parse_k8s_resource(ingestor["requests"]["memory"]) * 2
+    ingestor["requests"]["memory"] = main.format_k8s_resource(doubled)
+    under = json.loads(json.dumps(right))
+    under["receiver_router"]["replicas"] = right["receiver_router"]["replicas"] // 2
+
+    clusters = [
+        {"name": "right", "pool": pool, "current": right},
+        {"name": "loaded", "pool": loaded, "current": right_loaded},
+        {"name": "under", "pool": pool, "current": under},
+        {"name": "over", "pool": pool, "current": over},
+    ]
+    response = client.post("/api/plan/fleet_diff", json={"clusters": clusters})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    diff = response.json()
+    assert diff["clusters"] == 4 and diff["components"] == 24, f"Unexpected counts: {diff}"
+    assert [(e["cluster"], e["component"]) for e in diff["entries"]] == \
+        [("over", "receiver_ingestor"), ("under", "receiver_router")], f"Unexpected ranking: {diff['entries']}"
+
+    first, second = diff["entries"]
+    memory = main.parse_k8s_resource(right["receiver_ingestor"]["requests"]["memory"])
+    assert first["direction"] == "over" and first["deviation"] == 1.0, f"Unexpected over entry: {first}"
+    assert first["memory_delta"] == memory * right["receiver_ingestor"]["replicas"], "Memory delta is off"
+    assert first["cpu_delta"] == 0 and first["storage_delta"] == 0, "Only memory differs"
+    assert first["recommended"] == right["receiver_ingestor"]["requests"], "Recommendation differs from the pool"
+    assert first["recommended_storage"] == right["receiver_ingestor"]["storage"]
+    assert second["direction"] == "under" and second["cpu_delta"] < 0, f"Unexpected under entry: {second}"
+    assert "recommended_storage" not in second, "Stateless components have no storage"
+    assert diff["excess"]["memory"] == main.format_k8s_resource(first["memory_delta"])
+    assert diff["excess"]["cpu"] == "0", "Nothing requests more CPU than recommended"
+
+    top = client.post("/api/plan/fleet_diff", json={"clusters": clusters, "max_entries": 1}).json()
+    assert top["flagged"] == 2 and len(top["entries"]) == 1, "max_entries limits the entries, not the counts"
+    loose = client.post("/api/plan/fleet_diff", json={"clusters": clusters, "tolerance": 0.75}).json()
+    assert [e["cluster"] for e in loose["entries"]] == ["over"], "Deviations within tolerance are not flagged"
+
+    response = client.post("/api/plan/fleet_diff", json={"clusters": clusters[:1] * 2})
+    assert response.status_code == 422, f"Expected 422 for duplicate names, got {response.status_code}"
+
+    fleet = [{"name": f"cluster-{i}", "pool": dict(pool, dps=1000 * (i % 100 + 1)), "current": None}
+             for i in range(2000)]
+    sized = {item["pool"]["dps"]: client.post("/api/calculate/pool_resources", json=item["pool"]).json()
+             for item in fleet[:100]}
+    for item in fleet:
+        item["current"] = sized[item["pool"]["dps"]]
+    start = time.perf_counter()
+    response = client.post("/api/plan/fleet_diff", json={"clusters": fleet})
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200 and response.json()["flagged"] == 0, "Right-sized clusters must not be flagged"
+    print(f"Fleet diff ranked {diff['flagged']} components; 2000 right-sized clusters took {elapsed * 1000:.0f}ms.")
+
+
+def test_monte_carlo():
+    print("\nTesting Monte Carlo Endpoint...")
+    pool = {"dps": 16667, "scrape_interval": 60, "retention": 180}
+    payload = {"scrape_interval": 60, "retention": 180, "dps": {"kind": "empirical", "samples": [16667]},
+               "samples": 100}
+    response = client.post("/api/calculate/pool_resources/monte_carlo", json=payload)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+    single = client.post("/api/calculate/pool_resources", json=pool).json()
+    for name, resources in response.json()["percentiles"].items():
+        assert resources == single, f"{name}: a point distribution must match the single-pool endpoint"
+
+    payload = {"scrape_interval": 60, "retention": 180, "dps": {"kind": "lognormal", "mean": 16667, "stddev": 8000},
+               "churn": {"kind": "normal", "mean": 0.3, "stddev": 0.1}, "samples": 100000, "seed": 7}
+    data = client.post("/api/calculate/pool_resources/monte_carlo", json=payload).json()
+    assert data == client.post("/api/calculate/pool_resources/monte_carlo", json=payload).json(), \
+        "The same seed must give the same result"
+    p50, p90, p99 = (data["percentiles"][p] for p in ("p50", "p90", "p99"))
+    assert p50["dps"] <= p90["dps"] <= p99["dps"], "dps percentiles out of order"
+    assert (main.parse_k8s_resource(p50["s3"]) <= main.parse_k8s_resource(p90["s3"])
+            <= main.parse_k8s_resource(p99["s3"])), "s3 percentiles out of order"
+    assert main.parse_k8s_resource(p50["receiver_ingestor"]["requests"]["memory"]) > \
+        main.parse_k8s_resource(single["receiver_ingestor"]["requests"]["memory"]), \
+        "30% churn should raise ingestor memory above the no-churn pool"
+
+    payload["dps"] = {"kind": "normal", "mean": 16667}
+    response = client.post("/api/calculate/pool_resources/monte_carlo", json=payload)
+    assert response.status_code == 422, f"Expected 422 without stddev, got {response.status_code}"
+    for dps in ({"kind": "empirical", "samples": [16667, float("nan")]},
+                {"kind": "normal", "mean": float("inf"), "stddev": 1},
+                {"kind": "lognormal", "mean": 16667, "stddev": 1e300}):
+        response = client.post("/api/calculate/pool_resources/monte_carlo",
+                               content=json.dumps(dict(payload, dps=dps)), headers={"Content-Type": "application/json"})
+        assert response.status_code == 422, f"{dps}: expected 422, got {response.status_code}"
+
+    extreme = dict(payload, samples=1000, dps={"kind": "lognormal", "mean": 1e-300, "stddev": 1e12},
+                   churn={"kind": "normal", "mean": 1e12, "stddev": 1e12})
+    response = client.post("/api/calculate/pool_resources/monte_carlo", json=extreme)
+    assert response.status_code == 200, f"Extreme but valid draws must be clipped, got {response.status_code}"
+
+    print("Monte Carlo P99 ingestor:")
+    print(json.dumps(p99["receiver_ingestor"], indent=2))
+
+
+def test_coefficient_profiles():
+    print("\nTesting Coefficient Profiles...")
+    pool = {"dps": 50000, "scrape_interval": 30, "retention": 90}
+    measured = coefficients.CoefficientProfile(
+        name="measured", version="2", description="ingestors use 30% more memory per series",
+        coefficients=coefficients.Coefficients(ingestor_bytes_per_series=12 * 1024 * 1.3)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        coefficients.write_profile(os.path.join(tmp, "measured.json"), measured)
+        with open(os.path.join(tmp, "measured.json")) as f:
+            assert json.load(f)["coefficients"] == {"ingestor_bytes_per_series": 12 * 1024 * 1.3}, \
+                "Profile files must list only the coefficients they change"
+        coefficients.load_profiles(tmp)
+    try:
+        listed = client.get("/api/coefficients").json()
+        assert [p["name"] for p in listed] == ["default", "measured"], f"Unexpected profiles: {listed}"
+        assert listed[1]["coefficients"]["ingestor_bytes_per_series"] == 12 * 1024 * 1.3
+        assert listed[1]["coefficients"]["router_cpu_per_dps"] == 1 / 25000, "Unset coefficients keep defaults"
+
+        default = client.post("/api/calculate/pool_resources", json=pool).json()
+        for selector in ("measured", "measured@2"):
+            res = client.post("/api/calculate/pool_resources", json=dict(pool, coefficients=selector)).json()
+            memory = main.parse_k8s_resource(res["receiver_ingestor"]["requests"]["memory"])
+            expected = main.parse_k8s_resource(default["receiver_ingestor"]["requests"]["memory"]) * 1.3
+            assert abs(memory - expected) <= 1024**3, f"{selector}: ingestor memory {memory} is not ~{expected}"
+            assert res["store"] == default["store"], f"{selector}: other components must not change"
+
+        for selector in ("missing", "measured@1", "default@9"):
+            response = client.post("/api/calculate/pool_resources", json=dict(pool, coefficients=selector))
+            assert response.status_code == 422, f"{selector}: expected 422, got {response.status_code}"
+
+        batch = client.post("/api/calculate/pool_resources/batch",
+                            json=[dict(pool, coefficients="measured"), dict(pool, coefficients="missing")]).json()
+        assert batch[0] == res, "Batch items must honour their profile"
+        assert batch[1]["index"] == 1, "An unknown profile must fail only its own batch item"
+
+        sweep = {"dps": {"values": [pool["dps"]]}, "scrape_interval": {"values": [30]},
+                 "retention": {"values": [90]}, "coefficients": "measured"}
+        line = json.loads(client.post("/api/calculate/pool_resources/sweep", json=sweep).text.splitlines()[0])
+        assert line["receiver_ingestor"] == res["receiver_ingestor"], "Sweep must honour its profile"
+
+        tenants = {"tenants": [{"name": "team-a", "dps": pool["dps"], "scrape_interval": pool["scrape_interval"]}],
+                   "replication_factor": 1}
+        replica = client.post("/api/plan/hashring", json=dict(tenants, coefficients="measured")).json()["replicas"][0]
+        assert replica["requests"] == res["receiver_ingestor"]["requests"], "Hashring must honour its profile"
+
+        tags = {client.get("/api/calculate/pool_resources", params=dict(pool, **extra)).headers["etag"]
+                for extra in ({}, {"coefficients": "measured"})}
+        assert len(tags) == 2, "Profiles must give their results their own ETags"
+    finally:
+        coefficients.load_profiles(None)
+    print(f"Profile measured@2 sizes ingestors at {res['receiver_ingestor']['requests']['memory']} "
+          f"instead of {default['receiver_ingestor']['requests']['memory']}.")
+
+
+def test_conditional_get():
+    print("\nTesting GET Variants with ETags...")
+    pool = {"dps": 16667, "scrape_interval": 60, "retention": 180}
+    for path, params in (("/api/calculate/collector_resources", {"dps": 16667}),
+                         ("/api/calculate/pool_resources", pool)):
+        response = client.get(path, params=params)
+        assert response.status_code == 200, f"{path}: expected 200, got {response.status_code}: {response.text}"
+        assert response.json() == client.post(path, json=params).json(), f"{path}: GET differs from POST"
+        assert response.headers["cache-control"] == "no-cache", f"{path}: results must be revalidated"
+
+        etag = response.headers["etag"]
+        response = client.get(path, params=params, headers={"If-None-Match": etag})
+        assert response.status_code == 304 and not response.content, f"{path}: expected an empty 304"
+        assert response.headers["etag"] == etag, f"{path}: 304 must repeat the ETag"
+
+        changed = client.get(path, params={**params, "dps": 16668})
+        assert changed.headers["etag"] != etag, f"{path}: other inputs need another ETag"
+
+    parameters = app.openapi()["paths"]["/api/calculate/pool_resources"]["get"]["parameters"]
+    assert "query" not in {p["name"] for p in parameters}, "GET cannot take a query load"
+
+    response = client.get("/api/calculate/pool_resources", params={**pool, "dps": 0})
+    assert response.status_code == 422, f"Expected 422 for dps=0, got {response.status_code}"
+    response = client.post("/api/calculate/pool_resources", json={**pool, "dps": main.MAX_DPS + 1})
+    assert response.status_code == 422, f"Expected 422 above MAX_DPS, got {response.status_code}"
+
+    assert main.SIZING_VERSION == table.sizing_fingerprint(table.FINGERPRINT_SOURCES + ("models.py", "main.py"))[:16], \
+        "ETags must change with the response models and handlers too"
+
+    print(f"Pool ETag: {etag}")
+
+
+def test_sizing_cache():
+    print("\nTesting Sizing Cache...")
+    payload = {"dps": 4242, "scrape_interval": 15, "retention": 30}
+    before = client.get("/api/cache/stats").json()["pool"]
+
+    first = client.post("/api/calculate/pool_resources", json=payload).json()
+    second = client.post("/api/calculate/pool_resources", json=payload).json()
+    assert first == second, "Cached response differs from the computed one"
+
+    after = client.get("/api/cache/stats").json()["pool"]
+    assert after["misses"] == before["misses"] + 1, "First request should miss"
+    assert after["hits"] == before["hits"] + 1, "Second request should hit"
+
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None, "Least recently used entry should be evicted"
+    assert cache.stats()["evictions"] == 1, "Eviction should be counted"
+
+    print("Pool Cache Stats:")
+    print(json.dumps(after, indent=2))
+
+
+def test_sizing_table():
+    print("\nTesting Precomputed Sizing Table...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sizing.table")
+        table.build(path, [1667, 16667], [60], [14, 180])
+        main.pool_table = table.SizingTable(path)
+        main.pool_cache.clear()
+        try:
+            on_grid = {"dps": 16667, "scrape_interval": 60, "retention": 180}
+            response = client.post("/api/calculate/pool_resources", json=on_grid)
+            stages = response.headers["server-timing"]
+            assert "table;" in stages and "router;" not in stages, f"Expected a table hit: {stages}"
+            assert response.json() == main._size_pool(16667, 60, 180).model_dump(exclude_none=True), \
+                "Table result differs from live sizing"
+
+            off_grid = {"dps": 16668, "scrape_interval": 60, "retention": 180}
+            stages = client.post("/api/calculate/pool_resources", json=off_grid).headers["server-timing"]
+            assert "router;" in stages, f"Off-grid requests must fall back to live sizing: {stages}"
+        finally:
+            main.pool_table = None
+            main.pool_cache.clear()
+
+    print("Grid-aligned requests served from the table.")
+
+
+def test_fast_responses():
+    print("\nTesting Fast Response Path...")
+    requests = [
+        ("/api/calculate/collector_resources", {"dps": 1667}),
+        ("/api/calculate/pool_resources", {"dps": 1667, "scrape_interval": 60, "retention": 180}),
+        ("/api/calculate/pool_resources/batch", [{"dps": 1667, "scrape_interval": 60, "retention": 180},
+                                                 {"dps": 0, "scrape_interval": 60, "retention": 180}]),
+    ]
+    app.openapi_schema = None
+    default_schema = app.openapi()
+    default = [client.post(path, json=payload).json() for path, payload in requests]
+
+    main.FAST_RESPONSES = True
+    try:
+        app.openapi_schema = None
+        assert app.openapi() == default_schema, "FAST_RESPONSES must not change the OpenAPI schema"
+        for (path, payload), expected in zip(requests, default):
+            response = client.post(path, json=payload)
+            assert response.status_code == 200, f"{path}: expected 200, got {response.status_code}"
+            assert response.headers["content-type"] == "application/json", f"{path}: wrong content type"
+            assert response.json() == expected, f"{path}: fast response differs from the default path"
+    finally:
+        main.FAST_RESPONSES = False
+        app.openapi_schema = None
+
+    print("Fast responses match the default path.")
+
+
+def test_threadpool_handlers():
+    print("\nTesting Threadpool Handlers...")
+    for handler in (main.calculate_pool_batch, main.calculate_pool_projection, main.calculate_max_dps,
+                    main.plan_hashring, main.plan_nodes, main.calculate_pool_monte_carlo):
+        assert not inspect.iscoroutinefunction(handler), f"{handler.__name__} should run in the threadpool"
+
+    # Stage timings are recorded from the worker thread into the request's Server-Timing.
+    response = client.post("/api/calculate/pool_resources/batch",
+                           json=[{"dps": 1667, "scrape_interval": 60, "retention": 180}])
+    stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+    for name in ("router", "serialize", "total"):
+        assert name in stages, f"Server-Timing is missing '{name}': {stages}"
+
+    print(f"Batch Server-Timing stages: {stages}")
+
+
+def test_static_assets():
+    print("\nTesting Static Assets...")
+    response = client.get("/")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["cache-control"] == "no-cache", "index.html must be revalidated"
+
+    hashed_js = main.static_assets.hashed_names["main.js"]
+    assert f'src="./{hashed_js}"' in response.text, "index.html must reference the hashed main.js"
+
+    response = client.get(f"/{hashed_js}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["content-encoding"] == "gzip", "Expected the precompressed gzip variant"
+    assert "immutable" in response.headers["cache-control"], "Hashed assets must be immutable"
+    assert response.text == open("main.js").read(), "Decompressed body must match main.js"
+
+    etag = response.headers["etag"]
+    response = client.get(f"/{hashed_js}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304, f"Expected 304 for a matching ETag, got {response.status_code}"
+
+    for header, encoding in (("gzip;q=1.2.3", "gzip"), ("gzip;q=0.000", None), ("gzip;q=0.001", "gzip")):
+        response = client.get(f"/{hashed_js}", headers={"Accept-Encoding": header})
+        assert response.status_code == 200, f"{header}: expected 200, got {response.status_code}"
+        assert response.headers.get("content-encoding") == encoding, f"{header}: expected {encoding}"
+
+    response = client.get("/style.css", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers, "identity must get the uncompressed body"
+    assert response.headers["etag"] != etag, "Each representation needs its own strong ETag"
+
+    for path in ("/main.py", "/requests.jsonl", "/models.py", "/../main.py"):
+        response = client.get(path)
+        assert response.status_code == 404, f"{path}: expected 404, got {response.status_code}"
+
+    print(f"Static assets served; main.js published as {hashed_js}.")
+
+
+def test_metrics():
+    print("\nTesting Metrics and Server-Timing...")
+    payload = {"dps": 73313, "scrape_interval": 30, "retention": 90}
+    response = client.post("/api/calculate/pool_resources", json=payload)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+
+    server_timing = response.headers["server-timing"]
+    stages = [part.split(";")[0] for part in server_timing.split(", ")]
+    for name in ("router", "ingestor", "s3", "compactor", "store", "frontend_querier", "serialize", "total"):
+        assert name in stages, f"Server-Timing is missing '{name}': {server_timing}"
+
+    response = client.get("/metrics")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4"), "Wrong metrics content type"
+    body = response.text
+    assert 'thanos_calculator_stage_duration_seconds_count{stage="router",dps_range="1e4"}' in body, \
+        "Missing router stage histogram"
+    assert 'thanos_calculator_http_requests_total{method="POST",path="/api/calculate/pool_resources",status="200"}' \
+        in body, "Missing request counter for the pool endpoint"
+    assert 'thanos_calculator_http_request_duration_seconds_bucket{method="POST",' \
+           'path="/api/calculate/pool_resources",le="+Inf"}' in body, "Missing request latency histogram"
+
+    print(f"Server-Timing: {server_timing}")
+
+
+def test_profiling():
+    print("\nTesting Request Profiling...")
+    payload = {"dps": 1667, "scrape_interval": 60, "retention": 180}
+    response = client.post("/api/calculate/pool_resources?profile=1", json=payload)
+    assert "x-profile-id" not in response.headers, "Profiling must be off without PROFILE_TOKEN"
+
+    store = main.profile_store
+    saved = (store.token, store.directory, store.keep)
+    with tempfile.TemporaryDirectory() as directory:
+        store.token, store.directory, store.keep = "secret", directory, 2
+        try:
+            response = client.post("/api/calculate/pool_resources?profile=1", json=payload,
+                                   headers={"X-Admin-Token": "wrong"})
+            assert response.status_code == 403, f"Expected 403 for a bad token, got {response.status_code}"
+
+            admin = {"X-Admin-Token": "secret"}
+            plain = client.post("/api/calculate/pool_resources", json=payload).json()
+            response = client.post("/api/calculate/pool_resources", json=payload,
+                                   headers={**admin, "X-Profile": "1"})
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+            assert response.json() == plain, "Profiling must not change the response"
+            profile_id = response.headers["x-profile-id"]
+
+            response = client.get(f"/api/admin/profiles/{profile_id}")
+            assert response.status_code == 403, "Profile downloads must require the admin token"
+            response = client.get(f"/api/admin/profiles/{profile_id}", headers=admin)
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+            path = os.path.join(directory, "download.prof")
+            with open(path, "wb") as f:
+                f.write(response.content)
+            functions = {name for _, _, name in pstats.Stats(path).stats}
+            for name in ("_size_pool", "_calc_router", "create_resources"):
+                assert name in functions, f"Profile is missing {name}"
+
+            summary = client.get(f"/api/admin/profiles/{profile_id}/summary", headers=admin).json()
+            assert "router" in summary["stages_ms"], f"Summary is missing stages: {summary['stages_ms']}"
+            assert summary["top"], "Summary must list the top functions"
+
+            # Sync handlers run in the threadpool and are profiled there.
+            response = client.post("/api/calculate/max_dps?profile=1", headers=admin, json={
+                "scrape_interval": 60, "retention": 180, "budget": {"memory": "64Gi"}})
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+            summary = client.get(f"/api/admin/profiles/{response.headers['x-profile-id']}/summary",
+                                 headers=admin).json()
+            assert any("_size_pool" in row["function"] for row in summary["top"]), \
+                "Threadpool handler work is missing from the profile"
+
+            client.post("/api/calculate/pool_resources?profile=1", json=payload, headers=admin)
+            assert len([n for n in os.listdir(directory) if n.endswith(".json")]) == 2, \
+                "Only the newest PROFILE_KEEP profiles are kept"
+            response = client.get("/api/admin/profiles/..%2Fmain", headers=admin)
+            assert response.status_code == 404, f"Expected 404, got {response.status_code}"
+        finally:
+            store.token, store.directory, store.keep = saved
+
+    print(f"Profiled request {profile_id}; top function: {summary['top'][0]['function']}")
+
+
 if __name__ == "__main__":
     test_collector()
     test_pool()
+    test_pool_query_load()
+    test_pool_batch()
+    test_pool_sweep()
+    test_pool_sweep_arrow()
+    test_pool_projection()
+    test_max_dps()
+    test_hashring_plan()
+    test_node_plan()
+    test_store_shards()
+    test_compactor_shards()
+    test_autoscaling()
+    test_fleet_diff()
+    test_monte_carlo()
+    test_coefficient_profiles()
+    test_conditional_get()
+    test_sizing_cache()
+    test_sizing_table()
+    test_fast_responses()
+    test_threadpool_handlers()
+    test_static_assets()
+    test_metrics()
+    test_profiling()
     print("\nAll assertions passed.")
@@ -0,0 +1,121 @@
+import itertools
+import os
+import tempfile
+
+import numpy as np
+
+import engine
+import table
+from coefficients import DEFAULT_COEFFICIENTS, Coefficients
+from models import MAX_DPS
+from sizing import _size_pool, format_cpu, format_k8s_resource
+
+DPS_VALUES = [1, 2, 7, 99, 1000, 1667, 4999, 5000, 16667, 25000, 99999, 100000,
+              250000, 1000000, 3333333, 10000000]
+SCRAPE_INTERVALS = [1, 5, 15, 30, 60, 120, 300]
+RETENTIONS = [1, 2, 3, 6, 7, 14, 29, 30, 31, 45, 90, 180, 365, 730, 3650]
+
+
+def _assert_parity(dps, scrape_interval, retention, coefficients=DEFAULT_COEFFICIENTS):
+    cols = engine.size_pool(dps, scrape_interval, retention, coefficients=coefficients)
+    records = list(engine.iter_pool_resources(cols))
+    assert len(records) == len(dps), f"Expected {len(dps)} records, got {len(records)}"
+
+    for record, d, s, r in zip(records, dps, scrape_interval, retention):
+        expected = _size_pool(int(d), int(s), int(r), coefficients=coefficients).model_dump(exclude_none=True)
+        assert record == expected, f"Engine differs from scalar path for dps={d}, scrape_interval={s}, retention={r}"
+
+
+def test_engine_parity_grid():
+    print("Testing engine parity on a fixed grid...")
+    grid = list(itertools.product(DPS_VALUES, SCRAPE_INTERVALS, RETENTIONS))
+    dps, scrape_interval, retention = (list(axis) for axis in zip(*grid))
+    _assert_parity(dps, scrape_interval, retention)
+    print(f"{len(grid)} grid points match.")
+
+
+def test_engine_parity_bound():
+    print("\nTesting engine parity at the largest accepted dps...")
+    grid = list(itertools.product([MAX_DPS - 1, MAX_DPS], SCRAPE_INTERVALS, RETENTIONS))
+    dps, scrape_interval, retention = (list(axis) for axis in zip(*grid))
+    _assert_parity(dps, scrape_interval, retention)
+    print(f"{len(grid)} points at dps={MAX_DPS} match.")
+
+
+def test_engine_parity_random():
+    print("\nTesting engine parity on random inputs...")
+    rng = np.random.default_rng(20240611)
+    n = 5000
+    dps = np.exp(rng.uniform(0, np.log(5e7), n)).astype(np.int64) + 1
+    scrape_interval = rng.integers(1, 301, n)
+    retention = rng.integers(1, 3651, n)
+    _assert_parity(dps.tolist(), scrape_interval.tolist(), retention.tolist())
+    print(f"{n} random points match.")
+
+
+def test_engine_parity_coefficients():
+    print("\nTesting engine parity under a non-default coefficient profile...")
+    changed = {name: value * 1.37 for name, value in DEFAULT_COEFFICIENTS.model_dump().items()
+               if isinstance(value, float)}
+    coefficients = Coefficients(**changed, router_min_replicas=3)
+    grid = list(itertools.product(DPS_VALUES, SCRAPE_INTERVALS, RETENTIONS[::3]))
+    dps, scrape_interval, retention = (list(axis) for axis in zip(*grid))
+    _assert_parity(dps, scrape_interval, retention, coefficients)
+
+    default = engine.size_pool(dps, scrape_interval, retention)
+    scaled = engine.size_pool(dps, scrape_interval, retention, coefficients=coefficients)
+    assert (scaled["receiver_ingestor"]["memory"] > default["receiver_ingestor"]["memory"]).all(), \
+        "Scaled coefficients must change the sizing"
+    print(f"{len(grid)} grid points match.")
+
+
+def test_engine_formatting():
+    print("\nTesting array-wide formatting...")
+    cores = [0.01, 0.1, 0.10001, 0.5, 1.0, 1.5, 2.0000001, 3.999, 8, 12.75]
+    byte_values = [-1, 0, 1, 1023, 1024, 1025, 1024**2 - 1, 1024**2, 1.5 * 1024**2,
+                   1024**3 - 1, 1024**3, 2 * 1024**3 + 1, 5.5 * 1024**4]
+
+    assert engine.format_cpu(np.array(cores)).tolist() == [format_cpu(c) for c in cores]
+    assert engine.format_k8s_resource(np.array(byte_values)).tolist() == [
+        format_k8s_resource(b) for b in byte_values
+    ]
+    print("Formatting matches.")
+
+
+def test_sizing_table():
+    print("\nTesting precomputed sizing table...")
+    dps_axis = table.log_dps_axis(10000000, 6) + [1667, 16667]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sizing.table")
+        count = table.build(path, dps_axis, SCRAPE_INTERVALS, RETENTIONS)
+        sizing_table = table.SizingTable(path)
+        assert len(sizing_table) == count == len(set(dps_axis)) * len(SCRAPE_INTERVALS) * len(RETENTIONS)
+
+        for d, s, r in itertools.product(sizing_table.axes[0], SCRAPE_INTERVALS, RETENTIONS):
+            assert sizing_table.lookup(d, s, r) == _size_pool(d, s, r), \
+                f"Table differs from scalar path for dps={d}, scrape_interval={s}, retention={r}"
+        assert sizing_table.lookup(1668, 60, 180) is None, "Off-grid dps must miss"
+        assert sizing_table.lookup(1667, 61, 180) is None, "Off-grid scrape_interval must miss"
+
+        with open(path, "r+b") as f:
+            f.seek(len(table.MAGIC) + 4)
+            header = f.read(200)
+            f.seek(len(table.MAGIC) + 4 + header.index(b'"fingerprint": "') + 16)
+            f.write(b"0" * 8)
+        try:
+            table.SizingTable(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("A table built from other sizing code must be refused")
+    print(f"{count} table records match.")
+
+
+if __name__ == "__main__":
+    test_engine_parity_grid()
+    test_engine_parity_bound()
+    test_engine_parity_random()
+    test_engine_parity_coefficients()
+    test_engine_formatting()
+    test_sizing_table()
+    print("\nAll assertions passed.")